@@ -0,0 +1,44 @@
+"""Benchmark extension style lookups as the number of file types grows.
+
+Run with ``python benchmarks/bench_styles.py``. The per-lookup cost should
+stay flat from the built-in categories up to thousands of registered ones.
+"""
+
+import timeit
+
+from richpyls import styles
+from richpyls.styles import register_file_type, resolve_style_and_icon
+
+CATEGORY_COUNTS = (5, 50, 500, 5000)
+NAMES = ("main.py", "notes.md", "photo.jpeg", "data.ext4999", "Makefile")
+LOOKUPS = 200_000
+
+
+def time_lookup(category_count: int) -> float:
+    """Return the best mean lookup time in nanoseconds with some extra categories."""
+    styles.EXTENSION_STYLES = {
+        extension: style
+        for extensions, style in styles.FILE_TYPES
+        for extension in extensions
+    }
+    for number in range(category_count - len(styles.FILE_TYPES)):
+        register_file_type([f".ext{number}"], "cyan", "🧮")
+
+    mode = 0o100644
+    seconds = timeit.repeat(
+        lambda: [resolve_style_and_icon(name, mode, is_dir=False) for name in NAMES],
+        number=LOOKUPS // len(NAMES),
+        repeat=5,
+    )
+    return min(seconds) / LOOKUPS * 1e9
+
+
+def main() -> None:
+    """Print the per-lookup cost for each category count."""
+    print(f"{'categories':>10}  {'ns/lookup':>9}")
+    for category_count in CATEGORY_COUNTS:
+        print(f"{category_count:>10}  {time_lookup(category_count):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic directory trees for the benchmark suite.
+
+The trees are generated once per session with fixed names, sizes and
+layouts, so timings from different runs and machines are comparable. Set
+``RICHPYLS_BENCH_SCALE`` (default ``1``) to shrink or grow every tree.
+"""
+
+import os
+import stat
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+SCALE = float(os.environ.get("RICHPYLS_BENCH_SCALE", "1"))
+
+WIDE_FILES = max(1, int(100_000 * SCALE))
+DEEP_LEVELS = max(1, int(500 * SCALE))
+MIXED_DIRECTORIES = max(1, int(20 * SCALE))
+MIXED_FILES_PER_DIRECTORY = 250
+
+SUFFIXES = (".py", ".txt", ".json", ".png", ".tar", ".md", "", ".sh")
+
+
+def write_file(path: Path, number: int) -> None:
+    """Write a file whose size and suffix are derived from its number."""
+    path.write_bytes(b"x" * (number * 37 % 4096))
+
+
+def build_wide_tree(root: Path) -> None:
+    """Put every file of the tree directly in one directory."""
+    root.mkdir()
+    for number in range(WIDE_FILES):
+        write_file(root / f"file{number:06d}{SUFFIXES[number % 8]}", number)
+
+
+def build_deep_tree(root: Path) -> None:
+    """Nest directories one per level, each holding a single file."""
+    directory = root
+    for level in range(DEEP_LEVELS):
+        directory /= "d"
+        directory.mkdir(parents=True)
+        write_file(directory / f"level{level}.txt", level)
+
+
+def build_mixed_tree(root: Path) -> list[Path]:
+    """Mix files, hidden entries, symlinks and unreadable directories.
+
+    Returns the unreadable directories so their permissions can be restored.
+    """
+    unreadable: list[Path] = []
+    for index in range(MIXED_DIRECTORIES):
+        directory = root / f"dir{index:03d}"
+        (directory / "nested").mkdir(parents=True)
+        for number in range(MIXED_FILES_PER_DIRECTORY):
+            name = f"file{number:04d}{SUFFIXES[number % 8]}"
+            if number % 10 == 0:
+                name = f".{name}"
+            write_file(directory / name, number)
+            write_file(directory / "nested" / name, number + index)
+
+        (directory / "link_to_file").symlink_to(directory / "file0001.txt")
+        # The tree view follows directory links, so never point one upwards
+        (directory / "link_to_nested").symlink_to(directory / "nested")
+        (directory / "broken_link").symlink_to(directory / "missing")
+        if index % 5 == 0:
+            locked = directory / "locked"
+            locked.mkdir()
+            write_file(locked / "secret.bin", index)
+            locked.chmod(0)
+            unreadable.append(locked)
+    return unreadable
+
+
+@pytest.fixture(scope="session")
+def wide_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A single directory holding ``WIDE_FILES`` files."""
+    root = tmp_path_factory.mktemp("trees") / "wide"
+    build_wide_tree(root)
+    return root
+
+
+@pytest.fixture(scope="session")
+def deep_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A chain of ``DEEP_LEVELS`` nested directories."""
+    root = tmp_path_factory.mktemp("trees") / "deep"
+    build_deep_tree(root)
+    return root
+
+
+@pytest.fixture(scope="session")
+def mixed_tree(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Path]:
+    """Directories mixing symlinks, hidden files and unreadable directories."""
+    root = tmp_path_factory.mktemp("trees") / "mixed"
+    unreadable = build_mixed_tree(root)
+    yield root
+    # Let pytest clean the temporary directory up again
+    for directory in unreadable:
+        directory.chmod(stat.S_IRWXU)
+
+
+@pytest.fixture(params=["wide", "deep", "mixed"])
+def synthetic_tree(request: pytest.FixtureRequest) -> Path:
+    """Each of the synthetic trees in turn."""
+    return request.getfixturevalue(f"{request.param}_tree")
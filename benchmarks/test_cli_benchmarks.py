@@ -0,0 +1,115 @@
+"""Time every listing mode of the CLI on the synthetic trees.
+
+Run with ``pytest benchmarks``. Besides the timings, each benchmark records
+in ``extra_info`` the peak Python memory of one run and the syscalls it
+made: per syscall when ``strace`` is installed, otherwise the read and
+write syscall counters of ``/proc/self/io``.
+"""
+
+import re
+import shutil
+import subprocess  # nosec B404
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import pytest
+from click.testing import CliRunner
+
+from richpyls import cli
+
+MODES = {
+    "default": [],
+    "long": ["-l"],
+    "all": ["-a"],
+    "tree": ["-t"],
+    "size": ["-s", "20"],
+    "ndjson": ["--format", "ndjson"],
+}
+
+# One per-syscall row of ``strace -c``: time, seconds, usecs/call, calls,
+# optional errors, then the syscall name
+_STRACE_ROW = re.compile(
+    r"^\s*[\d.]+\s+[\d.]+\s+\d+\s+(?P<calls>\d+)\s+(?:\d+\s+)?(?P<name>\w+)\s*$"
+)
+
+
+def run_cli(args: list[str]) -> None:
+    """Run the CLI in-process and fail the benchmark if it errors."""
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+
+
+def read_proc_io() -> dict[str, int]:
+    """Return this process's syscall counters from ``/proc/self/io``."""
+    counters: dict[str, int] = {}
+    with Path("/proc/self/io").open(encoding="ascii") as proc_io:
+        for line in proc_io:
+            key, _, value = line.partition(":")
+            counters[key] = int(value)
+    return counters
+
+
+def parse_strace_summary(summary: str) -> dict[str, int]:
+    """Extract the call count of each syscall from ``strace -c`` output."""
+    calls: dict[str, int] = {}
+    for line in summary.splitlines():
+        match = _STRACE_ROW.match(line)
+        if match and match["name"] != "total":
+            calls[match["name"]] = int(match["calls"])
+    return calls
+
+
+def count_syscalls(args: list[str]) -> dict[str, Any]:
+    """Count the syscalls of one CLI run, as precisely as this box allows."""
+    strace = shutil.which("strace")
+    if strace is None:
+        before = read_proc_io()
+        run_cli(args)
+        after = read_proc_io()
+        return {
+            "source": "/proc/self/io",
+            "read": after["syscr"] - before["syscr"],
+            "write": after["syscw"] - before["syscw"],
+        }
+
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as summary:
+        command = [strace, "-f", "-c", "-o", summary.name]
+        command += [sys.executable, "-m", "richpyls", *args]
+        subprocess.run(command, check=True, capture_output=True)  # nosec B603
+        calls = parse_strace_summary(summary.read())
+    return {"source": "strace", "total": sum(calls.values()), "calls": calls}
+
+
+def measure_peak_memory(args: list[str]) -> int:
+    """Return the peak Python memory, in bytes, allocated by one CLI run."""
+    tracemalloc.start()
+    try:
+        run_cli(args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_cli_mode(benchmark, synthetic_tree, mode):
+    args = [*MODES[mode], str(synthetic_tree)]
+
+    benchmark.extra_info["syscalls"] = count_syscalls(args)
+    benchmark.extra_info["peak_memory_bytes"] = measure_peak_memory(args)
+    benchmark.pedantic(run_cli, args=(args,), rounds=3, iterations=1)
+
+
+def test_parse_strace_summary():
+    summary = """\
+% time     seconds  usecs/call     calls    errors syscall
+------ ----------- ----------- --------- --------- ----------------
+ 61.54    0.000016           1        12           newfstatat
+ 38.46    0.000010           2         4         1 getdents64
+------ ----------- ----------- --------- --------- ----------------
+100.00    0.000026           1        16         1 total
+"""
+    assert parse_strace_summary(summary) == {"newfstatat": 12, "getdents64": 4}
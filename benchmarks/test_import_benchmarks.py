@@ -0,0 +1,64 @@
+"""Track CLI startup cost with ``python -X importtime``.
+
+Each benchmark times a whole interpreter run of one command and records in
+``extra_info`` the cumulative import time of the package and of its CLI
+module, and the heaviest modules that were imported, as reported by
+``-X importtime``.
+"""
+
+import subprocess  # nosec B404
+import sys
+
+import pytest
+
+COMMANDS = {
+    "import": "import richpyls",
+    "version": "from richpyls import cli; cli(['--version'])",
+    "redirected": "from richpyls import cli; cli(['{tree}'])",
+    "ndjson": "from richpyls import cli; cli(['--format', 'ndjson', '{tree}'])",
+    "long": "from richpyls import cli; cli(['-l', '{tree}'])",
+    "size": "from richpyls import cli; cli(['-s', '5', '{tree}'])",
+}
+
+HEAVIEST_MODULES = 10
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess[str]:
+    """Run a snippet in a fresh interpreter and capture its output."""
+    command = [sys.executable, *options, "-c", code]
+    return subprocess.run(command, capture_output=True, text=True, check=False)  # nosec B603
+
+
+def parse_importtime(report: str) -> dict[str, int]:
+    """Return the cumulative import time, in microseconds, of every module."""
+    cumulative: dict[str, int] = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line.removeprefix("import time:").split("|")
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+@pytest.mark.parametrize("command", COMMANDS)
+def test_startup(benchmark, tmp_path, command):
+    (tmp_path / "file.txt").write_text("x")
+    code = COMMANDS[command].format(tree=tmp_path)
+
+    imports = parse_importtime(run_python(code, "-X", "importtime").stderr)
+    heaviest = sorted(imports.items(), key=lambda item: item[1], reverse=True)
+    benchmark.extra_info["package_import_us"] = imports.get("richpyls", 0)
+    benchmark.extra_info["cli_import_us"] = imports.get("richpyls.__main__", 0)
+    benchmark.extra_info["heaviest_imports_us"] = dict(heaviest[:HEAVIEST_MODULES])
+    benchmark.extra_info["rich_imported"] = "rich" in imports
+
+    benchmark.pedantic(run_python, args=(code,), rounds=5, iterations=1)
+
+
+def test_parse_importtime():
+    report = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2221 |      11567 | richpyls
+"""
+    assert parse_importtime(report) == {"_io": 120, "richpyls": 11567}
@@ -9,7 +9,19 @@ __version__ = "0.1.3"
 __author__ = "Leodanis Pozo Ramos"
 __email__ = "lpozor78@gmail.com"
 
-# Import the main CLI function from __main__ module
-from .__main__ import cli
+# Avoid importing typing at startup; type checkers treat this as typing's
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .__main__ import cli
 
 __all__ = ["cli"]
+
+
+def __getattr__(name: str) -> object:
+    """Import the CLI on first use, so ``import richpyls`` stays cheap."""
+    if name == "cli":
+        from .__main__ import cli
+
+        return cli
+    message = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(message)
@@ -1,89 +1,238 @@
 #!/usr/bin/env python3
-import grp
-import pwd
+"""Command line interface.
+
+Rich, SQLite, asyncio and the output format modules are imported by the
+code paths that use them rather than here, so scripted runs that redirect
+a short listing or ask for ``--format`` never load Rich at all.
+"""
+
+from __future__ import annotations
+
+import os
 import stat
+import sys
 import time
-from os import stat_result
-from pathlib import Path
+from functools import cache
+from itertools import batched
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
 
 import click
-from rich.console import Console
-from rich.table import Table
-from rich.text import Text
-
-from . import __version__
-
-# Initialize Rich console
-console = Console()
-error_console = Console(stderr=True)
-
-
-def get_file_style_and_icon(path: Path) -> tuple[str, str]:
-    """Get Rich style and icon for a file based on its type and extension."""
-    # File type mappings
-    file_types = {
-        # Python files
-        (".py", ".pyx", ".pyi"): ("green", "🐍"),
-        # Configuration files
-        (".toml", ".json", ".yaml", ".yml", ".ini", ".cfg", ".conf"): ("yellow", "⚙️"),
-        # Documentation files
-        (".md", ".rst", ".txt", ".doc", ".docx", ".pdf"): ("magenta", "📄"),
-        # Archive files
-        (".zip", ".tar", ".gz", ".bz2", ".xz", ".7z", ".rar"): ("red", "📦"),
-        # Image files
-        (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".ico"): (
-            "bright_magenta",
-            "🖼️",
-        ),
-    }
-
-    if path.is_dir():
-        return "bold blue", "📁"
-    if path.is_symlink():
-        return "cyan", "🔗"
-    if path.stat().st_mode & stat.S_IXUSR:  # Executable
-        return "bold green", "⚡"
-    if path.name.startswith("."):  # Hidden files
-        return "dim white", "🫣"
-
-    # Check file extension
-    extension = path.suffix.lower()
-    for extensions, (style, icon) in file_types.items():
-        if extension in extensions:
-            return style, icon
-
-    # Default files
-    return "white", "📄"
-
-
-def format_filename_with_style(path: Path) -> Text:
-    """Format filename with Rich styling and icons."""
-    style, icon = get_file_style_and_icon(path)
 
-    # Create Rich Text object with styling
-    text = Text()
-    text.append(f"{icon} ", style="white")
-    text.append(path.name, style=style)
+from . import __version__, entries, sizes
+from .entries import FileEntry, format_size_human_readable, resolve_style_and_icon
+from .scanner import scan_directory
+from .sizes import SizeMap, TopN, build_size_map, get_usage, iter_file_sizes
+from .styles import load_file_types_config
 
-    return text
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Mapping, Sequence
+
+    from rich.console import Console, RenderableType
+    from rich.table import Table
+    from rich.text import Text
+
+    from .filters import TreeFilter
+    from .gitignore import GitIgnore
+    from .index import MetadataIndex
+    from .parallel import TreeReader
+    from .profiling import Profiler
+    from .records import RecordWriter
+    from .snapshot import Change, DiffSummary
+
+OUTPUT_FORMATS = ("ndjson", "csv", "tsv")
+
+# Streamed output is flushed after this many lines or seconds, whichever first
+OUTPUT_BATCH_SIZE = 512
+OUTPUT_FLUSH_INTERVAL = 0.1
+
+# Long listings of directories with more entries than this are printed in
+# pages of LONG_LISTING_PAGE_SIZE rows. Rich renders roughly a row per
+# millisecond, so a page shows up about a tenth of a second after the last
+# one; keep the page size even so the alternating row styles carry on.
+LONG_LISTING_PAGING_THRESHOLD = 1000
+LONG_LISTING_PAGE_SIZE = 100
+
+# With --stat-concurrency, entries are stat'ed this many at a time
+STAT_CHUNK_SIZE = 1024
 
+# --diff shows this many entries per section unless -s says otherwise
+DIFF_LIMIT = 10
 
-def format_size_human_readable(size: int) -> str:
-    """Convert file size to human-readable format."""
-    kilobyte = 1024.0
-    size_float = float(size)
+# --watch redraws at most this often, however fast the directory changes
+WATCH_REFRESH_INTERVAL = 0.1
+# Lines of a watched long listing that aren't rows: title, borders, header
+# and the caption counting the rows that didn't fit
+WATCH_TABLE_LINES = 6
 
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size_float < kilobyte:
-            if unit == "B":
-                return f"{size_float:>3.0f}{unit}"
-            return f"{size_float:>6.1f}{unit}"
-        size_float /= kilobyte
-    return f"{size_float:>6.1f}PB"
+# The click context object of runs richpyls-client forwarded to --serve,
+# which answers one request at a time and so can't run anything that never ends
+FORWARDED = "forwarded"
 
 
-def create_long_listing_table(entries: list[Path]) -> Table:
+@cache
+def get_console() -> Console:
+    """Return the Rich console for standard output, creating it on first use."""
+    from rich.console import Console
+
+    return Console()
+
+
+@cache
+def get_error_console() -> Console:
+    """Return the Rich console for standard error, creating it on first use."""
+    from rich.console import Console
+
+    return Console(stderr=True)
+
+
+def print_access_error(path: str | os.PathLike[str], os_error: OSError) -> None:
+    """Report a path that could not be read, like ls does."""
+    get_error_console().print(
+        f"[red]ls: cannot access '{os.fspath(path)}': {os_error.strerror}[/red]"
+    )
+
+
+def iter_entries(
+    entries: Iterable[os.DirEntry[str]],
+    stat_concurrency: int = 1,
+) -> Iterator[FileEntry]:
+    """Build a FileEntry for each scanned entry, reporting the unreadable ones.
+
+    With ``stat_concurrency`` above 1 the entries are read in chunks, each
+    with that many stat calls in flight; records still come out in order.
+    """
+    if stat_concurrency > 1:
+        from .metadata import gather_entries
+
+        for chunk in batched(entries, STAT_CHUNK_SIZE, strict=False):
+            results = gather_entries(chunk, stat_concurrency)
+            for entry, result in zip(chunk, results, strict=True):
+                if isinstance(result, OSError):
+                    print_access_error(entry, result)
+                else:
+                    yield result
+        return
+
+    for entry in entries:
+        try:
+            yield FileEntry.from_dir_entry(entry)
+        except OSError as os_error:
+            # Print error message for files we can't access
+            print_access_error(entry, os_error)
+
+
+def load_entries(
+    entries: Iterable[os.DirEntry[str]],
+    stat_concurrency: int = 1,
+) -> list[FileEntry]:
+    """Build the FileEntry list of some scanned entries."""
+    return list(iter_entries(entries, stat_concurrency))
+
+
+def open_index(use_index: bool) -> MetadataIndex | None:
+    """Open the metadata index if requested, warning when it's unavailable."""
+    if not use_index:
+        return None
+
+    import sqlite3
+
+    from .index import MetadataIndex
+
+    try:
+        return MetadataIndex.open()
+    except (OSError, sqlite3.Error) as error:
+        get_error_console().print(
+            f"[yellow]richpyls: metadata index unavailable: {error}[/yellow]"
+        )
+        return None
+
+
+def load_user_file_types() -> None:
+    """Load extra file types from the config file, warning when it's invalid."""
+    try:
+        load_file_types_config()
+    except (OSError, ValueError) as error:
+        get_error_console().print(
+            f"[yellow]richpyls: ignoring config file: {error}[/yellow]"
+        )
+
+
+def start_profiler() -> Profiler:
+    """Instrument the functions behind each phase of a listing."""
+    from .index import MetadataIndex
+    from .profiling import Profiler
+    from .records import RecordWriter
+
+    profiler = Profiler()
+    module = sys.modules[__name__]
+    profiler.instrument(module, "scan_directory", "scan")
+    profiler.instrument(sizes, "walk", "scan", iterator=True)
+    profiler.instrument(MetadataIndex, "_scan", "scan")
+    profiler.instrument(FileEntry, "from_dir_entry", "stat")
+    profiler.instrument(FileEntry, "from_path", "stat")
+    profiler.instrument(sizes, "get_file_size", "stat")
+    profiler.instrument(module, "iter_file_sizes", "stat", iterator=True)
+    profiler.instrument(entries, "get_owner_name", "name resolution")
+    profiler.instrument(entries, "get_group_name", "name resolution")
+    profiler.instrument(entries, "resolve_style_and_icon", "style lookup")
+    profiler.instrument(module, "resolve_style_and_icon", "style lookup")
+    profiler.instrument(module, "create_long_listing_table", "render")
+    profiler.instrument(module, "create_long_listing_page", "render")
+    profiler.instrument(module, "format_file_info", "render")
+    profiler.instrument(get_console(), "print", "render")
+    profiler.instrument(module, "write_plain_lines", "render")
+    profiler.instrument(RecordWriter, "write", "render")
+    return profiler
+
+
+def get_size_map(
+    roots: Sequence[str],
+    jobs: int = 1,
+    index: MetadataIndex | None = None,
+    gitignore: GitIgnore | None = None,
+    allocated: bool = False,
+) -> SizeMap:
+    """Build a size map for some directories, through the index when open.
+
+    The index holds whole-tree sizes, so it isn't used with ``gitignore``.
+    With ``allocated``, the map holds disk usage instead of apparent sizes.
+    """
+    if index is not None and gitignore is None:
+        return index.build_size_map(roots, allocated=allocated)
+    return build_size_map(roots, jobs, gitignore, allocated=allocated)
+
+
+def get_permission_style(mode: str) -> str:
+    """Get the Rich style for a permissions string based on the file type."""
+    if mode.startswith("d"):
+        return "bold blue"
+    if mode.startswith("l"):
+        return "cyan"
+    if "x" in mode[7:]:  # Check if executable by others
+        return "bold green"
+    return "white"
+
+
+def format_filename_with_style(entry: FileEntry, label: str | None = None) -> Text:
+    """Format filename with Rich styling and icons.
+
+    ``label`` replaces the displayed name, e.g. with a relative path.
+    """
+    from rich.text import Text
+
+    # Create Rich Text object with styling
+    text = Text()
+    text.append(f"{entry.icon} ", style="white")
+    text.append(entry.name if label is None else label, style=entry.style)
+
+    return text
+
+
+def create_long_listing_table(entries: Iterable[FileEntry]) -> Table:
     """Create a Rich table for long listing format."""
+    from rich.table import Table
+
     table = Table(
         title="📁 Directory Listing",
         show_header=True,
@@ -103,86 +252,97 @@ def create_long_listing_table(entries: list[Path]) -> Table:
     table.add_column("Modified", style="green", width=12)
     table.add_column("Name", style="white", min_width=15)
 
-    # Add rows for each file
-    for entry_path in entries:
-        try:
-            file_stat: stat_result = entry_path.lstat()
-        except OSError as os_error:
-            # Print error message for files we can't access
-            error_console.print(
-                f"[red]ls: cannot access '{entry_path}': {os_error.strerror}[/red]"
-            )
-            continue
-
-        # Get file info
-        mode: str = stat.filemode(file_stat.st_mode)
-        nlink: int = file_stat.st_nlink
-        owner: str = pwd.getpwuid(file_stat.st_uid).pw_name
-        group: str = grp.getgrgid(file_stat.st_gid).gr_name
-        size_human: str = format_size_human_readable(file_stat.st_size)
-        mtime: str = time.strftime(
-            "%b %d %H:%M",
-            time.localtime(file_stat.st_mtime),
-        )
+    add_long_listing_rows(table, entries)
+    return table
 
-        # Get file styling and icon
-        file_style, icon = get_file_style_and_icon(entry_path)
 
-        # Style the permissions based on file type
-        if mode.startswith("d"):
-            perm_style = "bold blue"
-        elif mode.startswith("l"):
-            perm_style = "cyan"
-        elif "x" in mode[7:]:
-            perm_style = "bold green"
-        else:
-            perm_style = "white"
+def add_long_listing_rows(table: Table, entries: Iterable[FileEntry]) -> None:
+    """Add a long listing row to the table for each entry."""
+    from rich.text import Text
 
-        # Create filename with icon and styling
-        filename_text = Text()
-        filename_text.append(f"{icon} ", style="white")
-        filename_text.append(entry_path.name, style=file_style)
+    for entry in entries:
+        fields = entry.long_fields
 
         # Add row to table
         table.add_row(
-            icon,
-            Text(mode, style=perm_style),
-            str(nlink),
-            owner,
-            group,
-            size_human,
-            mtime,
-            filename_text,
+            entry.icon,
+            Text(fields.mode, style=get_permission_style(fields.mode)),
+            str(fields.nlink),
+            fields.owner,
+            fields.group,
+            fields.size,
+            fields.mtime,
+            format_filename_with_style(entry),
         )
 
+
+def get_name_column_width(names: Iterable[str]) -> int:
+    """Return the width of the longest owner or group name, up to 15."""
+    return min(max((len(name) for name in names), default=0), 15)
+
+
+def create_long_listing_page(
+    entries: Sequence[FileEntry],
+    owner_width: int,
+    group_width: int,
+    first_page: bool,
+) -> Table:
+    """Create one page of a paged long listing.
+
+    Every column but the name has a fixed width and the name column takes
+    the rest of the line, so Rich never measures the rows and consecutive
+    pages line up. Pages have no outer edge, so they read as one table; only
+    the first one has the title and header.
+    """
+    from rich.table import Table
+
+    table = Table(
+        title="📁 Directory Listing" if first_page else None,
+        show_header=first_page,
+        header_style="bold cyan",
+        border_style="bright_black",
+        row_styles=["", "dim"],
+        expand=True,
+        show_edge=False,
+    )
+
+    table.add_column("Type", style="white", width=2, justify="center")
+    table.add_column("Permissions", style="white", width=11)
+    table.add_column("Links", style="dim white", width=5, justify="right")
+    table.add_column("Owner", style="yellow", width=max(owner_width, 5))
+    table.add_column("Group", style="blue", width=max(group_width, 5))
+    table.add_column("Size", style="magenta", width=8, justify="right")
+    table.add_column("Modified", style="green", width=12)
+    table.add_column("Name", style="white", min_width=15, ratio=1)
+
+    add_long_listing_rows(table, entries)
     return table
 
 
-def get_directory_size(path: Path) -> int:
-    """Calculate the total size of a directory and its contents."""
-    if not path.is_dir():
-        return 0
+def print_long_listing_pages(entries: Iterable[FileEntry]) -> None:
+    """Print a long listing page by page, keeping one page in memory.
 
-    total_size = 0
-    try:
-        for item in path.rglob("*"):
-            try:
-                if item.is_file():
-                    total_size += item.stat().st_size
-            except (OSError, PermissionError):
-                # Skip files we can't access
-                continue
-    except (OSError, PermissionError):
-        # Skip directories we can't access
-        pass
+    The owner and group widths are fixed from the first page; longer names
+    further down are truncated like in the regular table.
+    """
+    first_page = True
+    owner_width = group_width = 0
+    for page in batched(entries, LONG_LISTING_PAGE_SIZE, strict=False):
+        if first_page:
+            owner_width = get_name_column_width(e.long_fields.owner for e in page)
+            group_width = get_name_column_width(e.long_fields.group for e in page)
+        get_console().print(
+            create_long_listing_page(page, owner_width, group_width, first_page)
+        )
+        first_page = False
 
-    return total_size
 
+def create_size_table(title: str) -> Table:
+    """Create an empty Rich table for size-ranked listings."""
+    from rich.table import Table
 
-def create_size_sorted_table(entries: list[Path], limit: int) -> Table:
-    """Create a Rich table for size-sorted listing."""
     table = Table(
-        title=f"📊 Top {limit} Files/Directories by Size",
+        title=title,
         show_header=True,
         header_style="bold cyan",
         border_style="bright_black",
@@ -195,52 +355,122 @@ def create_size_sorted_table(entries: list[Path], limit: int) -> Table:
     table.add_column("Name", style="white", min_width=20)
     table.add_column("Size", style="magenta", width=10, justify="right")
 
-    # Get file sizes and sort by size (descending)
-    entries_with_size = []
-    for entry_path in entries:
-        try:
-            if entry_path.is_dir():
-                size = get_directory_size(entry_path)
-                file_type = "DIR"
-            else:
-                size = entry_path.stat().st_size
-                file_type = "FILE"
+    return table
+
+
+def add_size_row(
+    table: Table,
+    entry: FileEntry,
+    size: int,
+    label: str | None = None,
+) -> None:
+    """Add one ranked entry to a size table."""
+    from rich.text import Text
+
+    size_human = format_size_human_readable(size)
+
+    # Style the type column
+    file_type = "DIR" if entry.is_dir else "FILE"
+    type_style = "bold blue" if entry.is_dir else "white"
+
+    table.add_row(
+        Text(file_type, style=type_style),
+        format_filename_with_style(entry, label),
+        size_human,
+    )
 
-            entries_with_size.append((entry_path, size, file_type))
-        except OSError as os_error:
-            # Print error message for files we can't access
-            error_console.print(
-                f"[red]ls: cannot access '{entry_path}': {os_error.strerror}[/red]"
-            )
-            continue
 
-    # Sort by size (descending) and take top N
-    entries_with_size.sort(key=lambda x: x[1], reverse=True)
-    top_entries = entries_with_size[:limit]
+def create_size_sorted_table(
+    entries: Sequence[FileEntry],
+    limit: int,
+    size_map: Mapping[str, int] | None = None,
+    allocated: bool = False,
+) -> Table:
+    """Create a Rich table for size-sorted listing.
+
+    Directory sizes are read from ``size_map``, which is built from the
+    directories in ``entries`` when not given. With ``allocated``, files
+    are ranked by the space allocated to them, which ``size_map`` must
+    then hold too.
+    """
+    measure = "Disk Usage" if allocated else "Size"
+    table = create_size_table(f"📊 Top {limit} Files/Directories by {measure}")
+
+    if size_map is None:
+        size_map = build_size_map(
+            [entry.path for entry in entries if entry.is_dir], allocated=allocated
+        )
+
+    # Keep the top N entries by size (descending) without sorting them all
+    top_entries: TopN[FileEntry] = TopN(limit)
+    for entry in entries:
+        if entry.is_dir:
+            top_entries.add(entry, size_map.get(entry.path, 0))
+        else:
+            top_entries.add(entry, get_usage(entry.lstat, allocated))
 
     # Add rows to table
-    for entry_path, size, file_type in top_entries:
-        # Get file styling and icon
-        file_style, icon = get_file_style_and_icon(entry_path)
-        size_human = format_size_human_readable(size)
+    for entry, size in top_entries.results():
+        add_size_row(table, entry, size)
 
-        # Create filename with icon and styling
-        filename_text = Text()
-        filename_text.append(f"{icon} ", style="white")
-        filename_text.append(entry_path.name, style=file_style)
+    return table
 
-        # Style the type column
-        type_style = "bold blue" if file_type == "DIR" else "white"
 
-        table.add_row(
-            Text(file_type, style=type_style),
-            filename_text,
-            size_human,
+def create_largest_files_table(
+    path_obj: str | os.PathLike[str],
+    show_all: bool,
+    limit: int,
+    gitignore: GitIgnore | None = None,
+    allocated: bool = False,
+) -> Table:
+    """Create a Rich table of the largest files anywhere below a directory.
+
+    Every file of the tree is streamed through a bounded ranking in a single
+    walk, so memory depends on ``limit`` rather than on the tree size.
+    Records are only built for the files that make the cut. With
+    ``allocated``, files are ranked by the space allocated to them.
+    """
+    title = "Files by Disk Usage" if allocated else "Largest Files"
+    table = create_size_table(f"📊 Top {limit} {title}")
+
+    def report_error(os_error: OSError) -> None:
+        print_access_error(os_error.filename, os_error)
+
+    top_files: TopN[os.DirEntry[str]] = TopN(limit)
+    top_files.extend(
+        iter_file_sizes(
+            path_obj, show_all, report_error, gitignore, allocated=allocated
         )
+    )
+
+    # Add rows to table, named by their path below the listed directory
+    for dir_entry, size in top_files.results():
+        try:
+            entry = FileEntry.from_dir_entry(dir_entry)
+        except OSError as os_error:
+            print_access_error(dir_entry, os_error)
+            continue
+        add_size_row(table, entry, size, os.path.relpath(entry.path, path_obj))
 
     return table
 
 
+def start_server(ctx: click.Context, _param: click.Parameter, value: bool) -> None:
+    """Run the --serve server instead of listing anything."""
+    if not value or ctx.resilient_parsing:
+        return
+    if ctx.obj == FORWARDED:
+        message = "--serve can't be used through richpyls-client"
+        raise click.UsageError(message, ctx)
+    from .daemon import serve
+
+    try:
+        serve()
+    except FileExistsError as error:
+        raise click.ClickException(str(error)) from error
+    ctx.exit()
+
+
 @click.command("richpyls", epilog="Thanks for using richpyls!")
 @click.version_option(__version__)
 @click.option(
@@ -267,6 +497,118 @@ def create_size_sorted_table(entries: list[Path], limit: int) -> Table:
     type=int,
     help="show top N files/directories sorted by size (descending)",
 )
+@click.option(
+    "-R",
+    "recursive",
+    is_flag=True,
+    help="with -s, rank individual files anywhere below each directory",
+)
+@click.option(
+    "--dir-sizes",
+    is_flag=True,
+    help="with -t, show the cumulative size of each directory",
+)
+@click.option(
+    "-L",
+    "max_depth",
+    type=click.IntRange(min=1),
+    help="with -t, descend at most N directory levels",
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    metavar="PATTERN",
+    help="with -t, leave out entries whose name matches a glob, or a regex "
+    "given as re:PATTERN; excluded directories are never read (repeatable)",
+)
+@click.option(
+    "--prune",
+    multiple=True,
+    metavar="PATTERN",
+    help="with -t, show directories whose name matches PATTERN but don't "
+    "descend into them (repeatable)",
+)
+@click.option(
+    "--gitignore",
+    "use_gitignore",
+    is_flag=True,
+    help="with -t and -s, skip what .gitignore files ignore without reading it",
+)
+@click.option(
+    "--disk-usage",
+    is_flag=True,
+    help="with -s and -t, count the space allocated on disk instead of "
+    "apparent sizes, so sparse files count what they really use",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="number of worker processes used to read trees for -t and to "
+    "compute directory sizes for -s and --dir-sizes",
+)
+@click.option(
+    "--stat-concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="keep up to N stat calls in flight when listing a directory, "
+    "for network filesystems",
+)
+@click.option(
+    "--index",
+    "use_index",
+    is_flag=True,
+    help="cache directory metadata under ~/.cache/richpyls to speed up "
+    "repeated -s and -t runs",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    help="write one machine-readable record per entry instead of Rich output",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="print the time spent in each phase of the listing to stderr",
+)
+@click.option(
+    "--profile-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="format of the --profile summary",
+)
+@click.option(
+    "--save-snapshot",
+    type=click.Path(dir_okay=False, writable=True),
+    help="save the paths, sizes, mtimes and inodes of every file below the "
+    "directory to a snapshot file for --diff",
+)
+@click.option(
+    "--diff",
+    type=click.Path(exists=True, dir_okay=False),
+    help="show the largest files added, removed and grown since a snapshot, "
+    "comparing it with the directory or with a second snapshot given as PATH",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="keep the listing of a directory on screen, updated as entries "
+    "change (Linux only)",
+)
+@click.option(
+    "--serve",
+    is_flag=True,
+    is_eager=True,
+    expose_value=False,
+    callback=start_server,
+    help="run a background server on $RICHPYLS_SOCKET that richpyls-client "
+    "forwards to, keeping imports and caches warm",
+)
 @click.argument(
     "paths",
     nargs=-1,
@@ -277,12 +619,42 @@ def cli(
     show_all: bool,
     tree: bool,
     sort_by_size: int | None,
+    recursive: bool,
+    dir_sizes: bool,
+    max_depth: int | None,
+    exclude: tuple[str, ...],
+    prune: tuple[str, ...],
+    use_gitignore: bool,
+    disk_usage: bool,
+    jobs: int,
+    stat_concurrency: int,
+    use_index: bool,
+    output_format: str | None,
+    profile: bool,
+    profile_format: str,
+    save_snapshot: str | None,
+    diff: str | None,
+    watch: bool,
     paths: tuple[str, ...],
 ) -> None:
     """List information about the FILEs (the current directory by default).
 
     Supports long format listing (-l), hidden files (-a), tree view (-t),
-    and size-sorted listing (-s N) to show top N files by size.
+    and size-sorted listing (-s N) to show top N files by size; with -R,
+    -s ranks individual files across the whole tree. Directory
+    sizes for -s can be computed in parallel with --jobs, which also splits
+    tree views across processes, and --dir-sizes adds sizes to the tree
+    view. -L, --exclude and --prune trim the tree view before anything
+    below the trimmed entries is read; --gitignore skips ignored entries the
+    same way in tree and size listings, and --disk-usage makes them count
+    allocated blocks. --index keeps directory metadata
+    between runs so unchanged subtrees aren't walked again.
+    --stat-concurrency overlaps stat calls on high-latency filesystems.
+    --format writes NDJSON, CSV or TSV records for scripts. --profile
+    reports where the time went. --save-snapshot and --diff report what grew between two
+    points in time. --watch keeps a directory listing up to date on screen.
+    --serve starts a server for richpyls-client so repeated runs skip the
+    startup cost.
     """
     if not paths:
         paths_list: list[str] = ["."]
@@ -291,209 +663,858 @@ def cli(
 
     # Convert string paths to Path objects
     path_objects: list[Path] = [Path(p) for p in paths_list]
+    check_option_conflicts(
+        path_objects,
+        tree=tree,
+        sort_by_size=sort_by_size,
+        output_format=output_format,
+        watch=watch,
+        save_snapshot=save_snapshot,
+        diff=diff,
+        forwarded=click.get_current_context().obj == FORWARDED,
+    )
+    gitignore = open_gitignore(use_gitignore)
+    tree_filter = make_tree_filter(max_depth, exclude, prune, gitignore)
     multiple_paths: bool = len(path_objects) > 1
+    profiler = start_profiler() if profile else None
+    load_user_file_types()
+    index = open_index(use_index)
 
-    for path_obj in path_objects:
-        if multiple_paths:
-            click.echo(f"{path_obj}:")
-
-        if path_obj.is_dir():
-            if tree:
-                list_directory_tree(path_obj, show_all, long)
-            elif sort_by_size is not None:
-                list_directory_by_size(path_obj, show_all, sort_by_size)
+    try:
+        if output_format is not None:
+            from .records import RecordWriter
+
+            writer = RecordWriter(output_format, sys.stdout)
+            write_records(path_objects, show_all, writer, stat_concurrency)
+            return
+
+        if run_single_path_mode(
+            path_objects[0],
+            show_all=show_all,
+            long_format=long,
+            sort_by_size=sort_by_size,
+            stat_concurrency=stat_concurrency,
+            watch=watch,
+            save_snapshot=save_snapshot,
+            diff=diff,
+        ):
+            return
+
+        for path_obj in path_objects:
+            if multiple_paths:
+                click.echo(f"{path_obj}:")
+
+            if path_obj.is_dir():
+                list_directory(
+                    path_obj,
+                    show_all=show_all,
+                    long_format=long,
+                    tree=tree,
+                    sort_by_size=sort_by_size,
+                    recursive=recursive,
+                    dir_sizes=dir_sizes,
+                    tree_filter=tree_filter,
+                    gitignore=gitignore,
+                    allocated=disk_usage,
+                    jobs=jobs,
+                    index=index,
+                    stat_concurrency=stat_concurrency,
+                )
             else:
-                list_directory_entries(path_obj, show_all, long)
-        else:
-            list_single_file(path_obj, long)
+                list_single_file(path_obj, long)
+
+            if multiple_paths:
+                click.echo()
+    finally:
+        if index is not None:
+            index.close()
+        if profiler is not None:
+            profiler.restore()
+            from .profiling import format_summary
+
+            click.echo(format_summary(profiler.summary(), profile_format), err=True)
+
+
+def open_gitignore(use_gitignore: bool) -> GitIgnore | None:
+    """Create the --gitignore matcher if requested."""
+    if not use_gitignore:
+        return None
+    from .gitignore import GitIgnore
+
+    return GitIgnore()
+
+
+def make_tree_filter(
+    max_depth: int | None,
+    exclude: Sequence[str],
+    prune: Sequence[str],
+    gitignore: GitIgnore | None = None,
+) -> TreeFilter | None:
+    """Compile -L, --exclude and --prune, returning None if nothing filters."""
+    if max_depth is None and not exclude and not prune and gitignore is None:
+        return None
+    import re
+
+    from .filters import TreeFilter
+
+    try:
+        return TreeFilter(exclude, prune, max_depth, gitignore)
+    except re.error as regex_error:
+        message = f"invalid pattern: {regex_error}"
+        raise click.BadParameter(message) from regex_error
+
+
+def check_option_conflicts(
+    path_objects: Sequence[Path],
+    *,
+    tree: bool,
+    sort_by_size: int | None,
+    output_format: str | None,
+    watch: bool,
+    save_snapshot: str | None,
+    diff: str | None,
+    forwarded: bool = False,
+) -> None:
+    """Reject option combinations that can't be honoured together.
+
+    --format, --watch, --save-snapshot and --diff each replace the listing,
+    so only one of them can be used at a time, and none of them with -t.
+    -s only goes with --diff, where it sets the number of rows per section.
+    --watch never finishes, so it can't be forwarded to the server.
+    """
+    modes = [
+        option
+        for option, used in (
+            ("--format", output_format is not None),
+            ("--watch", watch),
+            ("--save-snapshot", save_snapshot is not None),
+            ("--diff", diff is not None),
+        )
+        if used
+    ]
+    if not modes:
+        return
+    mode = modes[0]
+    if len(modes) > 1:
+        message = f"{mode} can't be combined with {modes[1]}"
+        raise click.UsageError(message)
+    if tree or (sort_by_size is not None and mode != "--diff"):
+        message = f"{mode} can't be combined with -t or -s"
+        raise click.UsageError(message)
+    if mode == "--format":
+        return
+    if mode == "--watch" and forwarded:
+        message = "--watch can't be used through richpyls-client"
+        raise click.UsageError(message)
+    if len(path_objects) != 1:
+        message = f"{mode} takes a single path"
+        raise click.UsageError(message)
+    if mode != "--diff" and not path_objects[0].is_dir():
+        message = f"{mode} takes a directory"
+        raise click.UsageError(message)
+
+
+def run_single_path_mode(
+    path_obj: Path,
+    *,
+    show_all: bool,
+    long_format: bool,
+    sort_by_size: int | None,
+    stat_concurrency: int,
+    watch: bool,
+    save_snapshot: str | None,
+    diff: str | None,
+) -> bool:
+    """Run --watch, --save-snapshot or --diff, returning False if none was given."""
+    if watch:
+        watch_directory(path_obj, show_all, long_format, stat_concurrency)
+    elif save_snapshot is not None:
+        save_tree_snapshot(path_obj, show_all, Path(save_snapshot))
+    elif diff is not None:
+        limit = DIFF_LIMIT if sort_by_size is None else sort_by_size
+        show_snapshot_diff(Path(diff), path_obj, show_all, limit)
+    else:
+        return False
+    return True
 
-        if multiple_paths:
-            click.echo()
 
+def list_directory(
+    path_obj: Path,
+    *,
+    show_all: bool,
+    long_format: bool,
+    tree: bool,
+    sort_by_size: int | None,
+    recursive: bool,
+    dir_sizes: bool,
+    jobs: int,
+    index: MetadataIndex | None,
+    stat_concurrency: int,
+    tree_filter: TreeFilter | None = None,
+    gitignore: GitIgnore | None = None,
+    allocated: bool = False,
+) -> None:
+    """List a directory in the mode selected on the command line."""
+    if tree:
+        size_map = (
+            get_size_map([str(path_obj)], jobs, index, gitignore, allocated)
+            if dir_sizes
+            else None
+        )
+        list_directory_tree(
+            path_obj,
+            show_all,
+            long_format,
+            size_map=size_map,
+            index=index,
+            jobs=jobs,
+            tree_filter=tree_filter,
+            allocated=allocated,
+        )
+    elif sort_by_size is not None and recursive:
+        list_largest_files(path_obj, show_all, sort_by_size, gitignore, allocated)
+    elif sort_by_size is not None:
+        list_directory_by_size(
+            path_obj, show_all, sort_by_size, jobs, index, gitignore, allocated
+        )
+    else:
+        list_directory_entries(path_obj, show_all, long_format, stat_concurrency)
 
-def list_directory_entries(path_obj: Path, show_all: bool, long_format: bool) -> None:
+
+def list_directory_entries(
+    path_obj: Path,
+    show_all: bool,
+    long_format: bool,
+    stat_concurrency: int = 1,
+) -> None:
     """List entries in a directory."""
     try:
-        entries: list[Path] = sorted(path_obj.iterdir())
+        # Hidden files are filtered unless show_all is True
+        dir_entries = scan_directory(path_obj, show_all)
     except OSError as os_error:
-        error_console.print(
-            f"[red]ls: cannot access '{path_obj}': {os_error.strerror}[/red]"
-        )
+        print_access_error(path_obj, os_error)
         return
 
-    # Filter hidden files unless show_all is True
-    entries = [entry for entry in entries if show_all or not entry.name.startswith(".")]
+    if long_format and len(dir_entries) > LONG_LISTING_PAGING_THRESHOLD:
+        # Stat and render huge directories one page at a time
+        print_long_listing_pages(iter_entries(dir_entries, stat_concurrency))
+        return
 
+    entries = load_entries(dir_entries, stat_concurrency)
     if long_format:
         # Create and display the long listing table
         table = create_long_listing_table(entries)
-        console.print(table)
+        get_console().print(table)
+    elif is_plain_output():
+        write_plain_lines(f"{entry.icon} {entry.name}" for entry in entries)
     else:
-        for entry_path in entries:
-            styled_name = format_filename_with_style(entry_path)
-            console.print(styled_name)
+        print_in_batches(format_filename_with_style(entry) for entry in entries)
 
 
-def list_single_file(path_obj: Path, long_format: bool) -> None:
-    """List information for a single file."""
+def render_watched_entries(
+    entries: Sequence[FileEntry],
+    long_format: bool,
+) -> RenderableType:
+    """Render the part of a watched listing that fits on the screen.
+
+    Rows past the bottom of the terminal would only be cropped by ``Live``
+    after being rendered, so they're counted in a caption instead.
+    """
+    from rich.console import Group
+    from rich.text import Text
+
+    height = get_console().size.height
+    visible = max(height - (WATCH_TABLE_LINES if long_format else 1), 1)
+    shown = entries[:visible]
+    hidden = len(entries) - len(shown)
+    caption = f"… and {hidden} more" if hidden else None
+
     if long_format:
+        table = create_long_listing_table(shown)
+        table.caption = caption
+        return table
+    lines = [format_filename_with_style(entry) for entry in shown]
+    if caption is not None:
+        lines.append(Text(caption, style="dim"))
+    return Group(*lines)
+
+
+def watch_directory(
+    path_obj: Path,
+    show_all: bool,
+    long_format: bool,
+    stat_concurrency: int = 1,
+) -> None:
+    """Show a directory listing and keep it current until interrupted.
+
+    After the first read, only the entries inotify reports as changed are
+    stat'ed again.
+    """
+    from rich.live import Live
+
+    from .watch import DirectoryWatch
+
+    def load(dir_entries: list[os.DirEntry[str]]) -> list[FileEntry]:
+        return load_entries(dir_entries, stat_concurrency)
+
+    try:
+        watch = DirectoryWatch(path_obj, show_all, load)
+    except OSError as os_error:
+        print_access_error(path_obj, os_error)
+        return
+
+    with (
+        watch,
+        Live(
+            render_watched_entries(watch.entries, long_format),
+            console=get_console(),
+            auto_refresh=False,
+        ) as live,
+    ):
         try:
-            # Check if we can access the file first
-            path_obj.lstat()
-            # Create table with single file
-            table = create_long_listing_table([path_obj])
-            console.print(table)
+            while True:
+                watch.update(WATCH_REFRESH_INTERVAL)
+                live.update(
+                    render_watched_entries(watch.entries, long_format), refresh=True
+                )
+        except KeyboardInterrupt:
+            pass
         except OSError as os_error:
-            error_console.print(
-                f"[red]ls: cannot access '{path_obj}': {os_error.strerror}[/red]"
-            )
-    else:
-        styled_name = format_filename_with_style(path_obj)
-        console.print(styled_name)
-
-
-def format_file_info(file_stat: stat_result, file_name: str) -> Text:
-    """Format file information for long listing display with Rich styling."""
-    mode: str = stat.filemode(file_stat.st_mode)
-    nlink: int = file_stat.st_nlink
-    owner: str = pwd.getpwuid(file_stat.st_uid).pw_name
-    group: str = grp.getgrgid(file_stat.st_gid).gr_name
-    size_human: str = format_size_human_readable(file_stat.st_size)
-    mtime: str = time.strftime(
-        "%b %d %H:%M",
-        time.localtime(file_stat.st_mtime),
+            print_access_error(path_obj, os_error)
+
+
+def save_tree_snapshot(path_obj: Path, show_all: bool, snapshot_path: Path) -> None:
+    """Write a snapshot of every file below a directory."""
+    from .snapshot import iter_tree, write_snapshot
+
+    def report_error(os_error: OSError) -> None:
+        print_access_error(os_error.filename, os_error)
+
+    try:
+        with snapshot_path.open("wb", buffering=1 << 20) as stream:
+            count = write_snapshot(stream, iter_tree(path_obj, show_all, report_error))
+    except OSError as os_error:
+        report_error(os_error)
+        return
+    click.echo(f"📸 Saved {count} files below {path_obj} to {snapshot_path}")
+
+
+def add_snapshot_row(table: Table, path: str, mode: int, size: str) -> None:
+    """Add one path of a snapshot diff to a size table."""
+    from rich.text import Text
+
+    is_dir = stat.S_ISDIR(mode)
+    style, icon = resolve_style_and_icon(PurePosixPath(path).name, mode, is_dir)
+    name = Text()
+    name.append(f"{icon} ", style="white")
+    name.append(path, style=style)
+    table.add_row(
+        Text("DIR" if is_dir else "FILE", style="bold blue" if is_dir else "white"),
+        name,
+        size,
+    )
+
+
+def format_size_change(delta: int) -> str:
+    """Format a size difference with its sign, e.g. ``+1.5MB``."""
+    sign = "-" if delta < 0 else "+"
+    return sign + format_size_human_readable(abs(delta)).strip()
+
+
+def create_diff_tables(summary: DiffSummary, limit: int) -> list[Table]:
+    """Create a size table for each kind of change that has entries."""
+    sections: list[tuple[str, list[tuple[Change, int]], int]] = [
+        (f"🆕 Top {limit} Added Files", summary.added.results(), 1),
+        (f"🗑️ Top {limit} Removed Files", summary.removed.results(), -1),
+        (f"📈 Top {limit} Grown Files", summary.grown.results(), 1),
+    ]
+    tables = []
+    for title, ranked, sign in sections:
+        if not ranked:
+            continue
+        table = create_size_table(title)
+        for change, size in ranked:
+            record = change.new or change.old
+            if record is not None:
+                add_snapshot_row(
+                    table, record.path, record.mode, format_size_change(sign * size)
+                )
+        tables.append(table)
+
+    grown_directories = summary.grown_directories.results()
+    if grown_directories:
+        table = create_size_table(f"📂 Top {limit} Grown Directories")
+        for path, size in grown_directories:
+            add_snapshot_row(table, path, stat.S_IFDIR, format_size_change(size))
+        tables.append(table)
+    return tables
+
+
+def show_snapshot_diff(
+    snapshot_path: Path,
+    path_obj: Path,
+    show_all: bool,
+    limit: int,
+) -> None:
+    """Compare a snapshot with a directory or a second snapshot.
+
+    Both sides are streamed through a merge, so memory doesn't grow with the
+    number of files compared.
+    """
+    from .snapshot import (
+        SnapshotError,
+        diff_records,
+        iter_tree,
+        read_snapshot,
+        summarize_changes,
     )
 
+    def report_error(os_error: OSError) -> None:
+        print_access_error(os_error.filename, os_error)
+
+    try:
+        with snapshot_path.open("rb", buffering=1 << 20) as old_stream:
+            if path_obj.is_dir():
+                summary = summarize_changes(
+                    diff_records(
+                        read_snapshot(old_stream),
+                        iter_tree(path_obj, show_all, report_error),
+                    ),
+                    limit,
+                )
+            else:
+                with path_obj.open("rb", buffering=1 << 20) as new_stream:
+                    summary = summarize_changes(
+                        diff_records(
+                            read_snapshot(old_stream), read_snapshot(new_stream)
+                        ),
+                        limit,
+                    )
+    except SnapshotError as snapshot_error:
+        message = f"invalid snapshot: {snapshot_error}"
+        raise click.ClickException(message) from None
+    except OSError as os_error:
+        report_error(os_error)
+        return
+
+    console = get_console()
+    for table in create_diff_tables(summary, limit):
+        console.print(table)
+    console.print(
+        f"{summary.changed_count} changed files, "
+        f"{format_size_change(summary.total_delta)} in total"
+    )
+
+
+def write_records(
+    path_objects: Iterable[Path],
+    show_all: bool,
+    writer: RecordWriter,
+    stat_concurrency: int = 1,
+) -> None:
+    """Write a record per listed entry, streaming each as it is stat'ed."""
+    for path_obj in path_objects:
+        if path_obj.is_dir():
+            try:
+                dir_entries = scan_directory(path_obj, show_all)
+            except OSError as os_error:
+                print_access_error(path_obj, os_error)
+                continue
+            for entry in iter_entries(dir_entries, stat_concurrency):
+                writer.write(entry)
+        else:
+            try:
+                writer.write(FileEntry.from_path(path_obj))
+            except OSError as os_error:
+                print_access_error(path_obj, os_error)
+
+
+def list_single_file(path_obj: Path, long_format: bool) -> None:
+    """List information for a single file."""
+    try:
+        entry = FileEntry.from_path(path_obj)
+    except OSError as os_error:
+        print_access_error(path_obj, os_error)
+        return
+
+    if long_format:
+        # Create table with single file
+        table = create_long_listing_table([entry])
+        get_console().print(table)
+    elif is_plain_output():
+        write_plain_lines([f"{entry.icon} {entry.name}"])
+    else:
+        styled_name = format_filename_with_style(entry)
+        get_console().print(styled_name)
+
+
+def format_file_info(entry: FileEntry, size: int | None = None) -> Text:
+    """Format file information for long listing display with Rich styling.
+
+    ``size`` replaces the entry's own size, e.g. with a directory total.
+    """
+    from rich.text import Text
+
+    fields = entry.long_fields
+    size_human = fields.size if size is None else format_size_human_readable(size)
+
     # Create Rich Text object with styling
     text = Text()
 
     # Style permissions based on type
-    if mode.startswith("d"):
-        text.append(mode, style="bold blue")
-    elif mode.startswith("l"):
-        text.append(mode, style="cyan")
-    elif "x" in mode[7:]:  # Check if executable by others
-        text.append(mode, style="bold green")
-    else:
-        text.append(mode, style="white")
-
-    text.append(f" {nlink:>2} ", style="dim white")
-    text.append(f"{owner} ", style="yellow")
-    text.append(f"{group} ", style="blue")
+    text.append(fields.mode, style=get_permission_style(fields.mode))
+    text.append(f" {fields.nlink:>2} ", style="dim white")
+    text.append(f"{fields.owner} ", style="yellow")
+    text.append(f"{fields.group} ", style="blue")
     text.append(f"{size_human:>8} ", style="magenta")
-    text.append(f"{mtime} ", style="green")
+    text.append(f"{fields.mtime} ", style="green")
 
     # Add styled filename
-    path_obj = Path(file_name)
-    _, icon = get_file_style_and_icon(path_obj)
-    file_style, _ = get_file_style_and_icon(path_obj)
-    text.append(f"{icon} ", style="white")
-    text.append(file_name, style=file_style)
+    text.append(f"{entry.icon} ", style="white")
+    text.append(entry.name, style=entry.style)
 
     return text
 
 
-def list_directory_tree(
-    path_obj: Path,
+def is_plain_output() -> bool:
+    """Return True when stdout isn't a terminal, so styles would be dropped.
+
+    This is answered without Rich so redirected listings don't import it.
+    Like Rich, a non-empty ``FORCE_COLOR`` counts as a terminal.
+    """
+    if os.environ.get("FORCE_COLOR"):
+        return False
+    try:
+        return not sys.stdout.isatty()
+    except ValueError:
+        # Closed or detached stream
+        return True
+
+
+def write_plain_lines(lines: Iterable[str]) -> None:
+    """Write unstyled lines to stdout with a single buffered write.
+
+    This skips building and rendering a ``Text`` per line, which is most of
+    the cost of a short listing once the output is redirected.
+    """
+    output = "\n".join(lines)
+    if output:
+        sys.stdout.write(output + "\n")
+
+
+def print_in_batches(lines: Iterable[Text]) -> None:
+    """Print lines as they are produced, grouping them into batched writes.
+
+    Each batch is rendered with a single ``console.print`` call instead of
+    one per line. A batch is flushed once it is full or once it has waited
+    ``OUTPUT_FLUSH_INTERVAL`` seconds, so slow producers still show output
+    right away.
+    """
+    from rich.text import Text
+
+    newline = Text("\n")
+    batch: list[Text] = []
+    last_flush = time.monotonic()
+
+    for line in lines:
+        batch.append(line)
+        now = time.monotonic()
+        if len(batch) >= OUTPUT_BATCH_SIZE or now - last_flush >= OUTPUT_FLUSH_INTERVAL:
+            get_console().print(newline.join(batch))
+            batch.clear()
+            last_flush = now
+
+    if batch:
+        get_console().print(newline.join(batch))
+
+
+def read_tree_level(
+    path: str | os.PathLike[str],
     show_all: bool,
-    long_format: bool,
-    prefix: str = "",
-) -> None:
-    """Display directory contents in a tree-like format with Rich styling."""
+    index: MetadataIndex | None = None,
+    tree_filter: TreeFilter | None = None,
+    listed_as: FileEntry | None = None,
+) -> list[FileEntry]:
+    """Read one directory of a tree, directories first, then files.
+
+    Entries ``tree_filter`` excludes are dropped before they are stat'ed.
+    With the index, ``listed_as``, the entry the directory was listed as in
+    its parent, gets the stat taken to revalidate it, since the parent's
+    cached copy isn't updated when only the directory's own entries change.
+    """
     try:
-        entries: list[Path] = sorted(path_obj.iterdir())
+        if index is not None:
+            ignore = None if tree_filter is None else tree_filter.excludes
+            dir_stat, entries = index.get_listing(os.fspath(path), ignore)
+            entries = [
+                entry for entry in entries if show_all or not entry.name.startswith(".")
+            ]
+            if listed_as is not None and not stat.S_ISLNK(listed_as.lstat.st_mode):
+                listed_as.lstat = dir_stat
+        else:
+            # Hidden files are filtered unless show_all is True
+            dir_entries = scan_directory(path, show_all)
+            if tree_filter is not None:
+                dir_entries = tree_filter.filter_entries(os.fspath(path), dir_entries)
+            entries = load_entries(dir_entries)
     except OSError as os_error:
-        error_console.print(
-            f"[red]ls: cannot access '{path_obj}': {os_error.strerror}[/red]"
+        print_access_error(path, os_error)
+        return []
+
+    # Sort entries: directories first, then files, both alphabetically
+    entries.sort(key=lambda entry: (not entry.is_dir, entry.name.lower()))
+    return entries
+
+
+def read_parallel_tree_level(
+    reader: TreeReader,
+    path: str | os.PathLike[str],
+) -> list[FileEntry]:
+    """Take one directory of a tree from a parallel reader, already sorted."""
+    from .parallel import expand_stat
+
+    level = reader.get(path)
+    for os_error in level.errors:
+        print_access_error(os_error.filename, os_error)
+    directory = os.fspath(path)
+    return [
+        FileEntry(
+            entry.name,
+            os.path.join(directory, entry.name),  # noqa: PTH118 - as DirEntry.path
+            expand_stat(entry.lstat),
+            entry.is_dir,
         )
-        return
+        for entry in level.entries
+    ]
 
-    # Filter hidden files unless show_all is True
-    entries = [entry for entry in entries if show_all or not entry.name.startswith(".")]
 
-    # Sort entries: directories first, then files, both alphabetically
-    entries.sort(key=lambda p: (not p.is_dir(), p.name.lower()))
+def iter_tree_lines(
+    path_obj: str | os.PathLike[str],
+    show_all: bool,
+    long_format: bool,
+    prefix: str = "",
+    size_map: Mapping[str, int] | None = None,
+    index: MetadataIndex | None = None,
+    reader: TreeReader | None = None,
+    tree_filter: TreeFilter | None = None,
+    allocated: bool = False,
+) -> Iterator[Text]:
+    """Yield the lines of a tree listing one at a time.
+
+    The walk keeps an explicit stack of open directories rather than
+    recursing, so arbitrarily deep trees can't hit the recursion limit, and
+    each directory is read only when the walk reaches it. With a ``reader``,
+    directories are taken from it instead, as worker processes read them.
+    ``tree_filter`` decides which entries are shown and which directories
+    are descended into; the rest are never read. With ``allocated``, long
+    listings show the space allocated to each file.
+    """
+    from rich.text import Text
+
+    def read_level(path: str | os.PathLike[str]) -> list[FileEntry]:
+        if reader is not None:
+            return read_parallel_tree_level(reader, path)
+        return read_tree_level(path, show_all, index, tree_filter=tree_filter)
+
+    # Each level holds a directory's entries, the next position, its prefix
+    # and the depth of its entries
+    stack: list[tuple[list[FileEntry], int, str, int]] = [
+        (read_level(path_obj), 0, prefix, 1)
+    ]
+
+    while stack:
+        entries, position, level_prefix, depth = stack[-1]
+        if position == len(entries):
+            stack.pop()
+            continue
+        stack[-1] = (entries, position + 1, level_prefix, depth)
 
-    for i, entry_path in enumerate(entries):
-        is_last_entry = i == len(entries) - 1
+        entry = entries[position]
+        is_last_entry = position == len(entries) - 1
+        descends = entry.is_dir and (
+            tree_filter is None or tree_filter.descends(entry.name, depth)
+        )
+
+        children: list[FileEntry] | None = None
+        if index is not None and entry.is_dir:
+            children = revalidate_subdirectory(
+                entry,
+                index,
+                show_all,
+                tree_filter,
+                descends=descends,
+                long_format=long_format,
+            )
 
         # Choose the appropriate tree character
         if is_last_entry:
             tree_char = "└── "
-            next_prefix = prefix + "    "
+            next_prefix = level_prefix + "    "
         else:
             tree_char = "├── "
-            next_prefix = prefix + "│   "
-
-        try:
-            file_stat: stat_result = entry_path.lstat()
-        except OSError as os_error:
-            error_console.print(
-                f"[red]ls: cannot access '{entry_path}': {os_error.strerror}[/red]"
-            )
-            continue
+            next_prefix = level_prefix + "│   "
 
         # Create Rich Text object for tree display
         tree_text = Text()
-        tree_text.append(prefix, style="dim white")
+        tree_text.append(level_prefix, style="dim white")
         tree_text.append(tree_char, style="bright_black")
 
+        total_size = size_map.get(entry.path) if size_map is not None else None
+        if total_size is None and allocated and long_format:
+            total_size = get_usage(entry.lstat, allocated=True)
+
         if long_format:
-            # Add file info with styling
-            mode: str = stat.filemode(file_stat.st_mode)
-            nlink: int = file_stat.st_nlink
-            owner: str = pwd.getpwuid(file_stat.st_uid).pw_name
-            group: str = grp.getgrgid(file_stat.st_gid).gr_name
-            size_human: str = format_size_human_readable(file_stat.st_size)
-            mtime: str = time.strftime(
-                "%b %d %H:%M",
-                time.localtime(file_stat.st_mtime),
-            )
+            # Add file info and styled filename
+            tree_text.append_text(format_file_info(entry, total_size))
+        else:
+            # Add styled filename with icon
+            tree_text.append_text(format_filename_with_style(entry))
+            if total_size is not None:
+                size_human = format_size_human_readable(total_size).strip()
+                tree_text.append(f" ({size_human})", style="magenta")
 
-            # Style permissions
-            if mode.startswith("d"):
-                tree_text.append(mode, style="bold blue")
-            elif mode.startswith("l"):
-                tree_text.append(mode, style="cyan")
-            elif "x" in mode[7:]:
-                tree_text.append(mode, style="bold green")
-            else:
-                tree_text.append(mode, style="white")
+        yield tree_text
+
+        # Descend into subdirectories the filter doesn't stop at
+        if descends:
+            if children is None:
+                children = read_level(entry.path)
+            stack.append((children, 0, next_prefix, depth + 1))
+
+
+def revalidate_subdirectory(
+    entry: FileEntry,
+    index: MetadataIndex,
+    show_all: bool,
+    tree_filter: TreeFilter | None,
+    *,
+    descends: bool,
+    long_format: bool,
+) -> list[FileEntry] | None:
+    """Bring an indexed subdirectory's lstat up to date before its line is drawn.
+
+    The index serves it from the parent's row, which changes inside the
+    subdirectory don't invalidate. A subdirectory the tree goes into is read
+    here, taking the stat that revalidates it, and its entries are
+    returned; otherwise a long listing stats it again.
+    """
+    if descends:
+        return read_tree_level(
+            entry.path, show_all, index, tree_filter, listed_as=entry
+        )
+    if long_format and not stat.S_ISLNK(entry.lstat.st_mode):
+        from contextlib import suppress
 
-            tree_text.append(f" {nlink:>2} ", style="dim white")
-            tree_text.append(f"{owner} ", style="yellow")
-            tree_text.append(f"{group} ", style="blue")
-            tree_text.append(f"{size_human:>8} ", style="magenta")
-            tree_text.append(f"{mtime} ", style="green")
+        # If it fails, the cached lstat is shown
+        with suppress(OSError):
+            entry.lstat = os.lstat(entry.path)
+    return None
 
-        # Add styled filename with icon
-        style, icon = get_file_style_and_icon(entry_path)
-        tree_text.append(f"{icon} ", style="white")
-        tree_text.append(entry_path.name, style=style)
 
-        console.print(tree_text)
+def list_directory_tree(
+    path_obj: str | os.PathLike[str],
+    show_all: bool,
+    long_format: bool,
+    prefix: str = "",
+    size_map: Mapping[str, int] | None = None,
+    index: MetadataIndex | None = None,
+    jobs: int = 1,
+    tree_filter: TreeFilter | None = None,
+    allocated: bool = False,
+) -> None:
+    """Display directory contents in a tree-like format with Rich styling.
+
+    When ``size_map`` is given, directories show their cumulative size. With
+    ``jobs`` above 1 and no index, the tree is read by that many processes.
+    ``tree_filter`` limits the depth and leaves out excluded and pruned
+    subtrees. ``allocated`` shows disk usage rather than apparent sizes.
+    """
+    if jobs > 1 and index is None:
+        from .parallel import TreeReader
+
+        with TreeReader(path_obj, show_all, jobs, tree_filter) as reader:
+            print_in_batches(
+                iter_tree_lines(
+                    path_obj,
+                    show_all,
+                    long_format,
+                    prefix,
+                    size_map,
+                    reader=reader,
+                    tree_filter=tree_filter,
+                    allocated=allocated,
+                )
+            )
+        return
 
-        # Recursively display subdirectories
-        if entry_path.is_dir():
-            list_directory_tree(entry_path, show_all, long_format, next_prefix)
+    lines = iter_tree_lines(
+        path_obj,
+        show_all,
+        long_format,
+        prefix,
+        size_map,
+        index,
+        tree_filter=tree_filter,
+        allocated=allocated,
+    )
+    print_in_batches(lines)
 
 
-def list_directory_by_size(path_obj: Path, show_all: bool, limit: int) -> None:
-    """List entries in a directory sorted by size."""
+def list_directory_by_size(
+    path_obj: Path,
+    show_all: bool,
+    limit: int,
+    jobs: int = 1,
+    index: MetadataIndex | None = None,
+    gitignore: GitIgnore | None = None,
+    allocated: bool = False,
+) -> None:
+    """List entries in a directory sorted by size.
+
+    With ``gitignore``, ignored entries are neither listed nor counted. With
+    ``allocated``, entries are ranked by disk usage.
+    """
     try:
-        entries: list[Path] = sorted(path_obj.iterdir())
+        # Hidden files are filtered unless show_all is True
+        dir_entries = scan_directory(path_obj, show_all)
     except OSError as os_error:
-        error_console.print(
-            f"[red]ls: cannot access '{path_obj}': {os_error.strerror}[/red]"
-        )
+        print_access_error(path_obj, os_error)
         return
-
-    # Filter hidden files unless show_all is True
-    entries = [entry for entry in entries if show_all or not entry.name.startswith(".")]
+    if gitignore is not None:
+        from .filters import is_directory
+
+        directory = os.fspath(path_obj)
+        dir_entries = [
+            entry
+            for entry in dir_entries
+            if not gitignore.ignores(directory, entry.name, is_directory(entry))
+        ]
+    entries = load_entries(dir_entries)
+
+    # Walk every listed directory once, up to jobs at a time
+    size_map = get_size_map(
+        [entry.path for entry in entries if entry.is_dir],
+        jobs,
+        index,
+        gitignore,
+        allocated,
+    )
 
     # Create and display the size-sorted table
-    table = create_size_sorted_table(entries, limit)
-    console.print(table)
+    table = create_size_sorted_table(entries, limit, size_map, allocated)
+    get_console().print(table)
+
+
+def list_largest_files(
+    path_obj: Path,
+    show_all: bool,
+    limit: int,
+    gitignore: GitIgnore | None = None,
+    allocated: bool = False,
+) -> None:
+    """List the largest files anywhere below a directory."""
+    table = create_largest_files_table(path_obj, show_all, limit, gitignore, allocated)
+    get_console().print(table)
 
 
 if __name__ == "__main__":
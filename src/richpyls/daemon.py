@@ -0,0 +1,335 @@
+"""Background server and thin client that keep the CLI warm between runs.
+
+``richpyls --serve`` imports the CLI once and then answers requests on a
+Unix domain socket, one at a time, so imports and the owner/group name
+caches survive from one listing to the next. ``richpyls-client`` only uses
+the standard library: it forwards its arguments, working directory,
+environment and terminal details, and writes back the output as it is
+streamed. Without a running server it runs the CLI in-process instead.
+As requests are answered one at a time, forwarded runs can't use
+``--watch`` or ``--serve``, which would never finish.
+
+Both ends find the socket through ``RICHPYLS_SOCKET``, by default
+``$XDG_RUNTIME_DIR/richpyls.sock``.
+
+Messages are frames of a one-byte channel, a four-byte length and a
+payload: the request is a ``marshal`` frame, and the server answers with
+stdout and stderr frames followed by an exit frame carrying the exit code.
+The client imports nothing it doesn't need, since its startup time is the
+point of the exercise; ``marshal`` is built in where ``json`` pulls in
+``re``, and the socket only accepts the owner's connections. The client in
+turn only talks to a server running as its own user, since the request
+carries its whole environment.
+"""
+
+from __future__ import annotations
+
+import errno
+import io
+import marshal
+import os
+import socket
+import stat
+import struct
+import sys
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Buffer
+    from typing import Any
+
+REQUEST = 0
+STDOUT = 1
+STDERR = 2
+EXIT = 3
+
+_HEADER = struct.Struct("!BI")
+# The pid, uid and gid SO_PEERCRED reports
+_PEER_CREDENTIALS = struct.Struct("3i")
+
+
+def get_socket_path() -> str:
+    """Return the server socket path, honouring ``RICHPYLS_SOCKET``."""
+    configured = os.environ.get("RICHPYLS_SOCKET")
+    if configured:
+        return configured
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "richpyls.sock")
+    import tempfile
+
+    # Keep sockets of different users apart when there's no runtime dir
+    return os.path.join(tempfile.gettempdir(), f"richpyls-{os.getuid()}.sock")
+
+
+def send_frame(connection: socket.socket, channel: int, payload: bytes) -> None:
+    """Send one frame."""
+    connection.sendall(_HEADER.pack(channel, len(payload)) + payload)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    """Read exactly ``size`` bytes, raising ``EOFError`` if the peer hangs up."""
+    chunks: list[bytes] = []
+    while size:
+        chunk = connection.recv(min(size, 1 << 16))
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def receive_frame(connection: socket.socket) -> tuple[int, bytes]:
+    """Read one frame and return its channel and payload."""
+    channel, size = _HEADER.unpack(_receive_exactly(connection, _HEADER.size))
+    return channel, _receive_exactly(connection, size)
+
+
+class FrameWriter(io.RawIOBase):
+    """Binary stream that forwards every write to the client as a frame.
+
+    It reports the terminal status of the client's stream, so Rich and the
+    plain output fast path behave as they would in the client process.
+    """
+
+    def __init__(self, connection: socket.socket, channel: int, isatty: bool) -> None:
+        """Forward writes over ``connection`` on ``channel``."""
+        super().__init__()
+        self._connection = connection
+        self._channel = channel
+        self._isatty = isatty
+
+    @property
+    def name(self) -> str:
+        """Describe the stream, as file names do for real streams."""
+        return f"<richpyls client channel {self._channel}>"
+
+    def writable(self) -> bool:
+        """Return True: the stream only supports writing."""
+        return True
+
+    def isatty(self) -> bool:
+        """Return whether the client's stream is a terminal."""
+        return self._isatty
+
+    def write(self, data: Buffer) -> int:
+        """Send the bytes to the client right away."""
+        payload = bytes(data)
+        if payload:
+            send_frame(self._connection, self._channel, payload)
+        return len(payload)
+
+
+def open_frame_stream(
+    connection: socket.socket, channel: int, isatty: bool
+) -> io.TextIOWrapper:
+    """Return a text stream, like ``sys.stdout``, that writes frames."""
+    writer = FrameWriter(connection, channel, isatty)
+    return io.TextIOWrapper(writer, encoding="utf-8", write_through=True)
+
+
+def build_request(argv: list[str]) -> dict[str, Any]:
+    """Describe this process's invocation for the server."""
+    stdout_isatty = sys.stdout.isatty()
+    environ = dict(os.environ)
+    if stdout_isatty and "COLUMNS" not in environ:
+        # The server has no terminal to measure
+        environ["COLUMNS"] = str(os.get_terminal_size(sys.stdout.fileno()).columns)
+    return {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "environ": environ,
+        "stdout_isatty": stdout_isatty,
+        "stderr_isatty": sys.stderr.isatty(),
+    }
+
+
+def run_request(connection: socket.socket, request: dict[str, Any]) -> int:
+    """Run one forwarded invocation with its output sent over ``connection``.
+
+    The process-wide state a run depends on (working directory, environment,
+    standard streams and the Rich consoles) is switched to the client's for
+    the duration of the run and restored afterwards.
+    """
+    from .__main__ import FORWARDED, cli, get_console, get_error_console
+
+    saved_cwd = os.getcwd()
+    saved_environ = dict(os.environ)
+    saved_streams = sys.stdout, sys.stderr
+    sys.stdout = open_frame_stream(connection, STDOUT, request["stdout_isatty"])
+    sys.stderr = open_frame_stream(connection, STDERR, request["stderr_isatty"])
+    os.environ.clear()
+    os.environ.update(request["environ"])
+    # Consoles read the terminal size and colour settings when created
+    get_console.cache_clear()
+    get_error_console.cache_clear()
+
+    try:
+        os.chdir(request["cwd"])
+        cli.main(args=request["argv"], prog_name="richpyls", obj=FORWARDED)
+    except SystemExit as exit_request:
+        code = exit_request.code
+        return code if isinstance(code, int) else int(code is not None)
+    except Exception:  # noqa: BLE001 - report any failure to the client
+        import traceback
+
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout, sys.stderr = saved_streams
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        os.chdir(saved_cwd)
+        get_console.cache_clear()
+        get_error_console.cache_clear()
+    return 0
+
+
+def handle_connection(connection: socket.socket) -> None:
+    """Answer one client, ignoring clients that go away mid-request."""
+    try:
+        channel, payload = receive_frame(connection)
+        if channel != REQUEST:
+            return
+        code = run_request(connection, marshal.loads(payload))
+        send_frame(connection, EXIT, str(code).encode())
+    except (EOFError, OSError, ValueError):
+        # The client hung up or sent garbage; wait for the next one
+        return
+
+
+def remove_socket(path: str) -> None:
+    """Remove a socket left behind, if there is one.
+
+    Raises ``FileExistsError`` rather than delete anything else at the path.
+    """
+    try:
+        path_stat = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(path_stat.st_mode):
+        raise FileExistsError(errno.EEXIST, "not a socket, leaving it alone", path)
+    os.unlink(path)
+
+
+def serve(path: str | None = None) -> None:
+    """Listen on the socket and answer requests until interrupted."""
+    # Pay for the imports once, up front
+    from . import __main__  # noqa: F401
+
+    if path is None:
+        path = get_socket_path()
+    remove_socket(path)
+
+    # Bound under another name and moved into place once listening, so that
+    # clients never find a socket that refuses their connection
+    staging = f"{path}.{os.getpid()}"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        # Only the owner may connect
+        server.bind(staging)
+    finally:
+        os.umask(old_umask)
+    try:
+        server.listen()
+        os.replace(staging, path)
+    except OSError:
+        server.close()
+        remove_socket(staging)
+        raise
+
+    try:
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                handle_connection(connection)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        remove_socket(path)
+
+
+def get_server_uid(connection: socket.socket, path: str) -> int:
+    """Return the user the server on a connected socket runs as.
+
+    ``SO_PEERCRED`` asks the kernel; where it's missing, the owner of the
+    socket file is the best there is.
+    """
+    if hasattr(socket, "SO_PEERCRED"):
+        credentials = connection.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, _PEER_CREDENTIALS.size
+        )
+        _, uid, _ = _PEER_CREDENTIALS.unpack(credentials)
+        return uid
+    socket_stat = os.stat(path)
+    if not stat.S_ISSOCK(socket_stat.st_mode):
+        raise OSError(errno.ENOTSOCK, "not a socket", path)
+    return socket_stat.st_uid
+
+
+def connect(path: str) -> socket.socket:
+    """Connect to the server, raising ``OSError`` if none is listening.
+
+    Raises ``PermissionError`` if the server belongs to another user, who
+    must not see the environment a request carries.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+        if get_server_uid(connection, path) != os.getuid():
+            message = "server socket belongs to another user"
+            raise PermissionError(errno.EPERM, message, path)
+    except OSError:
+        connection.close()
+        raise
+    return connection
+
+
+def forward(connection: socket.socket, argv: list[str]) -> int:
+    """Run argv on the server and copy its output here.
+
+    Raises ``EOFError`` if the server hangs up before the exit frame, and
+    ``OSError`` if talking to it or writing the output fails.
+    """
+    send_frame(connection, REQUEST, marshal.dumps(build_request(argv)))
+    outputs = {STDOUT: sys.stdout, STDERR: sys.stderr}
+    while True:
+        channel, payload = receive_frame(connection)
+        if channel == EXIT:
+            return int(payload)
+        stream = outputs[channel]
+        stream.buffer.write(payload)
+        stream.flush()
+
+
+def main() -> None:
+    """Entry point of ``richpyls-client``.
+
+    Only a missing server makes the client run the CLI in-process; once a
+    request was sent, part of its output may already be written, so a
+    failure after that is reported rather than retried.
+    """
+    argv = sys.argv[1:]
+    try:
+        connection = connect(get_socket_path())
+    except OSError as os_error:
+        if isinstance(os_error, PermissionError):
+            sys.stderr.write(f"richpyls-client: not using the server: {os_error}\n")
+        # No usable server: do the work here
+        from .__main__ import cli
+
+        cli.main(args=argv, prog_name="richpyls")
+        return
+
+    with connection:
+        try:
+            code = forward(connection, argv)
+        except EOFError:
+            sys.stderr.write("richpyls-client: the server hung up mid-request\n")
+            code = 1
+        except OSError as os_error:
+            sys.stderr.write(f"richpyls-client: {os_error}\n")
+            code = 1
+    sys.exit(code)
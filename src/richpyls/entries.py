@@ -0,0 +1,125 @@
+"""Per-path metadata records shared by every renderer.
+
+A ``FileEntry`` is built from a single ``lstat()`` call. Its style, icon and
+long-listing fields are all derived from that one result, so renderers never
+go back to the filesystem for a path they have already seen.
+"""
+
+import os
+import stat
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Self
+
+from .styles import resolve_style_and_icon
+
+
+def format_size_human_readable(size: int) -> str:
+    """Convert file size to human-readable format."""
+    kilobyte = 1024.0
+    size_float = float(size)
+
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if size_float < kilobyte:
+            if unit == "B":
+                return f"{size_float:>3.0f}{unit}"
+            return f"{size_float:>6.1f}{unit}"
+        size_float /= kilobyte
+    return f"{size_float:>6.1f}PB"
+
+
+@lru_cache(maxsize=4096)
+def get_owner_name(uid: int) -> str:
+    """Resolve a uid to a user name, falling back to the numeric id."""
+    import pwd
+
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        # Orphaned uid with no passwd entry
+        return str(uid)
+
+
+@lru_cache(maxsize=4096)
+def get_group_name(gid: int) -> str:
+    """Resolve a gid to a group name, falling back to the numeric id."""
+    import grp
+
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        # Orphaned gid with no group entry
+        return str(gid)
+
+
+class LongFields(NamedTuple):
+    """Formatted columns of a long listing row."""
+
+    mode: str
+    nlink: int
+    owner: str
+    group: str
+    size: str
+    mtime: str
+
+
+def format_long_fields(file_stat: os.stat_result) -> LongFields:
+    """Format the long listing columns of a stat result."""
+    return LongFields(
+        mode=stat.filemode(file_stat.st_mode),
+        nlink=file_stat.st_nlink,
+        owner=get_owner_name(file_stat.st_uid),
+        group=get_group_name(file_stat.st_gid),
+        size=format_size_human_readable(file_stat.st_size),
+        mtime=time.strftime("%b %d %H:%M", time.localtime(file_stat.st_mtime)),
+    )
+
+
+class FileEntry:
+    """Metadata for one listed path, gathered with a single lstat() call.
+
+    The long listing fields are formatted on first use, so short listings
+    don't pay for owner lookups and time formatting.
+    """
+
+    __slots__ = ("_long_fields", "icon", "is_dir", "lstat", "name", "path", "style")
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        lstat: os.stat_result,
+        is_dir: bool,
+    ) -> None:
+        """Store the lstat result and resolve the style and icon from it."""
+        self.name = name
+        self.path = path
+        self.lstat = lstat
+        self.is_dir = is_dir
+        self.style, self.icon = resolve_style_and_icon(name, lstat.st_mode, is_dir)
+        self._long_fields: LongFields | None = None
+
+    @classmethod
+    def from_dir_entry(cls, entry: os.DirEntry[str]) -> Self:
+        """Build a record from a scanned entry, raising OSError on failure."""
+        lstat = entry.stat(follow_symlinks=False)
+        mode = lstat.st_mode
+        # Symlinks to directories are listed as directories
+        is_dir = entry.is_dir() if stat.S_ISLNK(mode) else stat.S_ISDIR(mode)
+        return cls(entry.name, entry.path, lstat, is_dir)
+
+    @classmethod
+    def from_path(cls, path: Path) -> Self:
+        """Build a record from a path given by the user, raising OSError on failure."""
+        lstat = path.lstat()
+        mode = lstat.st_mode
+        is_dir = path.is_dir() if stat.S_ISLNK(mode) else stat.S_ISDIR(mode)
+        return cls(path.name, str(path), lstat, is_dir)
+
+    @property
+    def long_fields(self) -> LongFields:
+        """Return the formatted long listing columns for this entry."""
+        if self._long_fields is None:
+            self._long_fields = format_long_fields(self.lstat)
+        return self._long_fields
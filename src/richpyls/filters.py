@@ -0,0 +1,104 @@
+"""Depth limits and name filters for the tree view.
+
+``-L``, ``--exclude``, ``--prune`` and ``--gitignore`` are decided from an
+entry's name, depth and type alone, before anything is stat'ed or read:
+excluded and ignored entries are dropped straight after the directory read,
+and directories that are pruned or at the depth limit are never opened.
+"""
+
+import fnmatch
+import os
+import re
+from collections.abc import Iterable
+
+from .gitignore import GitIgnore
+
+# Patterns starting with this are regular expressions rather than globs
+REGEX_PREFIX = "re:"
+
+
+def compile_patterns(patterns: Iterable[str]) -> re.Pattern[str] | None:
+    """Combine name patterns into one regex that matches a name if any does.
+
+    Globs must match the whole name; ``re:`` patterns may match anywhere in
+    it, like ``re.search``. Returns None when there are no patterns.
+    """
+    parts = [
+        f"(?s:.*?(?:{pattern.removeprefix(REGEX_PREFIX)}))"
+        if pattern.startswith(REGEX_PREFIX)
+        else fnmatch.translate(pattern)
+        for pattern in patterns
+    ]
+    if not parts:
+        return None
+    return re.compile("|".join(parts))
+
+
+def is_directory(entry: os.DirEntry[str]) -> bool:
+    """Return whether an entry is a directory, not following symlinks.
+
+    The type usually comes with the directory read; if it has to be looked
+    up and that fails, the entry counts as a file.
+    """
+    try:
+        return entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+class TreeFilter:
+    """Which entries a tree shows and which directories it descends into.
+
+    Depths count from 1 for the entries of the directory the tree starts
+    at. Instances hold nothing but compiled patterns and the ``--gitignore``
+    matcher, so they can be sent to worker processes.
+    """
+
+    __slots__ = ("_exclude", "_prune", "gitignore", "max_depth")
+
+    def __init__(
+        self,
+        exclude: Iterable[str] = (),
+        prune: Iterable[str] = (),
+        max_depth: int | None = None,
+        gitignore: GitIgnore | None = None,
+    ) -> None:
+        """Compile the ``--exclude`` and ``--prune`` patterns."""
+        self._exclude = compile_patterns(exclude)
+        self._prune = compile_patterns(prune)
+        self.max_depth = max_depth
+        self.gitignore = gitignore
+
+    def excludes(self, directory: str, name: str, is_dir: bool) -> bool:
+        """Return True if an entry is left out of the tree altogether."""
+        if self._exclude is not None and self._exclude.match(name) is not None:
+            return True
+        return self.gitignore is not None and self.gitignore.ignores(
+            directory, name, is_dir
+        )
+
+    def filter_entries(
+        self,
+        directory: str,
+        dir_entries: list[os.DirEntry[str]],
+    ) -> list[os.DirEntry[str]]:
+        """Return the scanned entries of a directory that the tree shows."""
+        if self._exclude is not None:
+            exclude = self._exclude
+            dir_entries = [
+                entry for entry in dir_entries if exclude.match(entry.name) is None
+            ]
+        if self.gitignore is not None:
+            ignores = self.gitignore.ignores
+            dir_entries = [
+                entry
+                for entry in dir_entries
+                if not ignores(directory, entry.name, is_directory(entry))
+            ]
+        return dir_entries
+
+    def descends(self, name: str, depth: int) -> bool:
+        """Return True if the tree goes into a directory shown at ``depth``."""
+        if self.max_depth is not None and depth >= self.max_depth:
+            return False
+        return self._prune is None or self._prune.match(name) is None
@@ -0,0 +1,221 @@
+"""``.gitignore`` matching for ``--gitignore``.
+
+Each ``.gitignore`` is compiled once into a single regular expression per
+entry kind, with its rules in reverse order, so the alternative that
+matches is the last rule of the file that applies, as in git. Directories
+are looked up by the path the walk reached them by; the files that apply to
+a directory are worked out when the walk first gets there, from those of
+its parent plus its own, and cached. A walk consults the matcher before it
+reads or stats an entry, so ignored subtrees are never opened.
+
+Supported are the usual pattern forms: ``*``, ``?``, character classes,
+``**`` as a leading, trailing or inner component, anchored and
+directory-only patterns, negation and escapes. Besides the ``.gitignore``
+files of the tree and of its parents up to the repository root, the
+repository's ``.git/info/exclude`` applies; ``.git`` itself is always
+ignored. A directory that is ignored is never descended into, so, as in
+git, negated rules can't bring back anything below it.
+"""
+
+import os
+import re
+from collections.abc import Iterable
+from typing import NamedTuple, Self
+
+IGNORE_FILE = ".gitignore"
+GIT_DIRECTORY = ".git"
+
+# A "*" never crosses a path separator
+_STAR = "[^/]*"
+
+
+def translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regex matching relative paths."""
+    parts: list[str] = []
+    position = 0
+    length = len(pattern)
+    while position < length:
+        char = pattern[position]
+        position += 1
+        if char == "*":
+            at_component_start = position == 1 or pattern[position - 2] == "/"
+            if pattern.startswith("*", position) and at_component_start:
+                if pattern.startswith("/", position + 1):
+                    # "**/": any number of leading directories, including none
+                    parts.append("(?:.*/)?")
+                    position += 2
+                    continue
+                if position + 1 == length:
+                    # Trailing "**": everything below
+                    parts.append(".*")
+                    break
+            while pattern.startswith("*", position):
+                position += 1
+            parts.append(_STAR)
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", position + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+                continue
+            members = pattern[position:end]
+            position = end + 1
+            if members.startswith("!"):
+                members = "^" + members[1:]
+            members = members.replace("\\", "\\\\").replace("[", "\\[")
+            parts.append(f"[{members}]")
+        elif char == "\\" and position < length:
+            parts.append(re.escape(pattern[position]))
+            position += 1
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+class Rule(NamedTuple):
+    """One line of a ``.gitignore``."""
+
+    regex: str
+    negated: bool
+    directory_only: bool
+
+
+def parse_rule(line: str) -> Rule | None:
+    """Parse one line of a ``.gitignore``, or return None for blanks and comments."""
+    line = line.rstrip("\r\n")
+    # Trailing spaces are dropped unless escaped
+    while line.endswith(" ") and not line.endswith("\\ "):
+        line = line[:-1]
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    directory_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A slash anywhere but at the end anchors the pattern to its directory
+    anchored = "/" in line
+    regex = translate(line.removeprefix("/"))
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return Rule(regex, negated, directory_only)
+
+
+class IgnoreRules:
+    """The compiled rules of one ignore file."""
+
+    __slots__ = ("_directories", "_files", "_negated")
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        """Compile the rules, the last one taking precedence."""
+        ordered = list(rules)[::-1]
+        self._negated = [rule.negated for rule in ordered]
+        # Each rule is group i + 1; directory-only rules never match files
+        self._directories = self._compile(rule.regex for rule in ordered)
+        self._files = self._compile(
+            "(?!)" if rule.directory_only else rule.regex for rule in ordered
+        )
+
+    @staticmethod
+    def _compile(regexes: Iterable[str]) -> re.Pattern[str]:
+        """Combine regexes into one whose matching group tells which matched."""
+        return re.compile("|".join(f"({regex})" for regex in regexes), re.DOTALL)
+
+    @classmethod
+    def read(cls, path: str) -> Self | None:
+        """Read an ignore file, returning None if it's missing or has no rules."""
+        try:
+            with open(path, encoding="utf-8", errors="surrogateescape") as file:  # noqa: PTH123
+                rules = [rule for line in file if (rule := parse_rule(line))]
+        except OSError:
+            return None
+        return cls(rules) if rules else None
+
+    def match(self, path: str, is_dir: bool) -> bool | None:
+        """Return whether the rules ignore a relative path, or None if none applies."""
+        pattern = self._directories if is_dir else self._files
+        match = pattern.fullmatch(path)
+        if match is None or match.lastindex is None:
+            return None
+        return not self._negated[match.lastindex - 1]
+
+
+# The ignore files that apply to a directory, innermost first, each with the
+# directory's path relative to the file's own directory ("" or ending in "/")
+type IgnoreChain = tuple[tuple[IgnoreRules, str], ...]
+
+
+class GitIgnore:
+    """Decide which entries of a walk the applicable ``.gitignore`` files ignore.
+
+    One instance serves any number of walks. Instances sent to worker
+    processes build their own cache there.
+    """
+
+    __slots__ = ("_chains",)
+
+    def __init__(self) -> None:
+        """Start with no ignore file read."""
+        self._chains: dict[str, IgnoreChain] = {}
+
+    def __reduce__(self) -> tuple[type[Self], tuple[()]]:
+        """Leave the cache behind when sent to another process."""
+        return type(self), ()
+
+    def ignores(self, directory: str, name: str, is_dir: bool) -> bool:
+        """Return True if the entry ``name`` of ``directory`` is ignored."""
+        if name == GIT_DIRECTORY:
+            return True
+        for rules, prefix in self._chain(directory):
+            ignored = rules.match(prefix + name, is_dir)
+            if ignored is not None:
+                return ignored
+        return False
+
+    def _chain(self, directory: str) -> IgnoreChain:
+        """Return the ignore files that apply to a directory, reading them once."""
+        chain = self._chains.get(directory)
+        if chain is not None:
+            return chain
+        parent, name = os.path.split(directory)
+        parent_chain = self._chains.get(parent) if name else None
+        if parent_chain is None:
+            # The first directory of a walk: look upwards for its repository
+            chain = self._find_chain(os.path.abspath(directory))  # noqa: PTH100
+        else:
+            chain = self._extend(parent_chain, name, directory)
+        self._chains[directory] = chain
+        return chain
+
+    def _find_chain(self, directory: str) -> IgnoreChain:
+        """Build the chain of a directory from its parents' ignore files."""
+        chain = self._chains.get(directory)
+        if chain is not None:
+            return chain
+        parent, name = os.path.split(directory)
+        git_path = os.path.join(directory, GIT_DIRECTORY)  # noqa: PTH118
+        if not name or os.path.exists(git_path):  # noqa: PTH110
+            # The repository root, or the filesystem root outside any repository
+            rules = IgnoreRules.read(os.path.join(git_path, "info", "exclude"))  # noqa: PTH118
+            chain = self._extend(() if rules is None else ((rules, ""),), "", directory)
+        else:
+            chain = self._extend(self._find_chain(parent), name, directory)
+        self._chains[directory] = chain
+        return chain
+
+    @staticmethod
+    def _extend(parent_chain: IgnoreChain, name: str, directory: str) -> IgnoreChain:
+        """Return the chain of a subdirectory ``name`` given its parent's."""
+        chain = tuple(
+            (rules, f"{prefix}{name}/" if name else prefix)
+            for rules, prefix in parent_chain
+        )
+        rules = IgnoreRules.read(os.path.join(directory, IGNORE_FILE))  # noqa: PTH118
+        if rules is not None:
+            chain = ((rules, ""), *chain)
+        return chain
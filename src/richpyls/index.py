@@ -0,0 +1,336 @@
+"""Persistent metadata index for repeat listings of large trees.
+
+The index is a SQLite database that stores, per directory, its mtime, the
+lstat results of its entries and the total size of the files directly inside
+it, both apparent and allocated. Files with several hard links are stored
+apart, since which directory counts them depends on the whole walk. A
+directory's mtime changes whenever an entry is added, removed or renamed in
+it, so a cached listing is reused for as long as that mtime is
+unchanged. Revalidating an unchanged tree then costs one ``stat()`` per
+directory instead of a directory read plus one ``stat()`` per entry.
+
+Only changes to the entry list touch a directory's mtime. The cached lstat
+of a file modified in place, and that of a subdirectory whose own entries
+changed, stay stale until something is added, removed or renamed next to
+them; callers take a subdirectory's lstat from the ``stat()`` that
+revalidates it instead (see ``get_listing``).
+"""
+
+import json
+import os
+import sqlite3
+import stat
+import time
+from collections.abc import Callable, Sequence
+from operator import itemgetter
+from pathlib import Path
+from types import TracebackType
+from typing import Any, NamedTuple, Self
+
+from .entries import FileEntry
+from .filters import is_directory
+from .sizes import InodeSet, SizeMap, fold_into_parents, get_usage
+
+SCHEMA_VERSION = 2
+
+# Listings of directories modified this recently (in seconds) are not stored,
+# since a change within the same timestamp tick would go unnoticed
+RACY_WINDOW = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    own_size INTEGER NOT NULL,
+    own_allocated INTEGER NOT NULL,
+    linked_files TEXT NOT NULL,
+    subdirectories TEXT NOT NULL,
+    entries TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+# One cached entry: name, is_dir, then the lstat fields we render from
+type EntryRecord = list[Any]
+# A file with several hard links: device, inode, size and allocated size
+type LinkedRecord = list[int]
+
+
+class DirectorySizes(NamedTuple):
+    """What a directory's files add to the size of the tree."""
+
+    own_size: int
+    own_allocated: int
+    linked_files: list[LinkedRecord]
+    subdirectories: list[str]
+
+
+def get_default_index_path() -> Path:
+    """Return the index location, honouring ``XDG_CACHE_HOME``."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "richpyls" / "index.sqlite3"
+
+
+def join_entry_path(directory: str, name: str) -> str:
+    """Join a directory and an entry name the way ``DirEntry.path`` does."""
+    if directory.endswith(os.sep):
+        return directory + name
+    return f"{directory}{os.sep}{name}"
+
+
+def encode_entry(name: str, lstat: os.stat_result, is_dir: bool) -> EntryRecord:
+    """Pack an entry's name and lstat result into a JSON-friendly record."""
+    return [
+        name,
+        is_dir,
+        lstat.st_mode,
+        lstat.st_ino,
+        lstat.st_dev,
+        lstat.st_nlink,
+        lstat.st_uid,
+        lstat.st_gid,
+        lstat.st_size,
+        lstat.st_atime,
+        lstat.st_mtime,
+        lstat.st_ctime,
+        lstat.st_blocks,
+    ]
+
+
+def decode_entry(directory: str, record: EntryRecord) -> FileEntry:
+    """Rebuild a FileEntry from a cached record without touching the disk."""
+    name, is_dir = record[0], record[1]
+    lstat = os.stat_result(record[2:12], {"st_blocks": record[12]})
+    return FileEntry(name, join_entry_path(directory, name), lstat, is_dir)
+
+
+class MetadataIndex:
+    """SQLite-backed cache of directory listings and sizes.
+
+    Use it as a context manager so pending writes are committed on exit.
+    """
+
+    __slots__ = ("_connection",)
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        """Wrap an open index database connection."""
+        self._connection = connection
+
+    @classmethod
+    def open(cls, path: Path | None = None) -> Self:
+        """Open (or create) the index database.
+
+        An index written by an incompatible version is discarded.
+        """
+        if path is None:
+            path = get_default_index_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(path)
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            connection.execute("DROP TABLE IF EXISTS directories")
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.execute(_SCHEMA)
+        return cls(connection)
+
+    def close(self) -> None:
+        """Commit pending writes and close the database."""
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self) -> Self:
+        """Return the index itself."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the index, keeping whatever was cached so far."""
+        self.close()
+
+    def get_listing(
+        self,
+        directory: str,
+        ignore: Callable[[str, str, bool], bool] | None = None,
+    ) -> tuple[os.stat_result, list[FileEntry]]:
+        """Return the current stat of a directory and its entries sorted by name.
+
+        The entries come from the index while the directory is unchanged, so
+        the lstat of a subdirectory among them may be out of date; the stat
+        returned here never is. Entries for which ``ignore(directory, name,
+        is_dir)`` is True are left out before they are stat'ed; a listing read
+        with any left out isn't complete, so it isn't stored. Raises
+        ``OSError`` if the directory can't be read.
+        """
+        key, dir_stat = self._stat_directory(directory)
+        row = self._connection.execute(
+            "SELECT mtime_ns, entries FROM directories WHERE path = ?", (key,)
+        ).fetchone()
+
+        if row is not None and row[0] == dir_stat.st_mtime_ns:
+            records = json.loads(row[1])
+            if ignore is not None:
+                records = [
+                    record
+                    for record in records
+                    if not ignore(directory, record[0], stat.S_ISDIR(record[2]))
+                ]
+        else:
+            _, records = self._scan(directory, key, dir_stat, ignore)
+
+        return dir_stat, [decode_entry(directory, record) for record in records]
+
+    def build_size_map(
+        self,
+        roots: Sequence[str],
+        *,
+        allocated: bool = False,
+    ) -> SizeMap:
+        """Build a size map like ``sizes.build_size_map``, reusing the index.
+
+        Every directory of the trees is still stat'ed to revalidate it, but
+        unchanged directories are neither read nor have their files stat'ed.
+        """
+        sizes: SizeMap = {}
+        parents: dict[str, str] = {}
+        seen = InodeSet()
+        # Which field of a linked file record to count
+        size_field = 3 if allocated else 2
+
+        for root in roots:
+            pending = [root]
+            while pending:
+                directory = pending.pop()
+                try:
+                    directory_sizes = self._get_sizes(directory)
+                except OSError:
+                    # Skip directories we can't access
+                    continue
+
+                own_size = (
+                    directory_sizes.own_allocated
+                    if allocated
+                    else directory_sizes.own_size
+                )
+                sizes[directory] = own_size + sum(
+                    linked[size_field]
+                    for linked in directory_sizes.linked_files
+                    if seen.add(linked[0], linked[1])
+                )
+                for name in directory_sizes.subdirectories:
+                    subdirectory = join_entry_path(directory, name)
+                    parents[subdirectory] = directory
+                    pending.append(subdirectory)
+
+        return fold_into_parents(sizes, parents)
+
+    def _stat_directory(self, directory: str) -> tuple[str, os.stat_result]:
+        """Return a directory's index key and its current stat result."""
+        path = Path(directory)
+        return str(path.absolute()), path.stat()
+
+    def _get_sizes(self, directory: str) -> DirectorySizes:
+        """Return the sizes of a directory's files and its real subdirectories."""
+        key, dir_stat = self._stat_directory(directory)
+        row = self._connection.execute(
+            "SELECT mtime_ns, own_size, own_allocated, linked_files, subdirectories "
+            "FROM directories WHERE path = ?",
+            (key,),
+        ).fetchone()
+
+        if row is not None and row[0] == dir_stat.st_mtime_ns:
+            return DirectorySizes(
+                row[1], row[2], json.loads(row[3]), json.loads(row[4])
+            )
+
+        directory_sizes, _ = self._scan(directory, key, dir_stat)
+        return directory_sizes
+
+    def _scan(
+        self,
+        directory: str,
+        key: str,
+        dir_stat: os.stat_result,
+        ignore: Callable[[str, str, bool], bool] | None = None,
+    ) -> tuple[DirectorySizes, list[EntryRecord]]:
+        """Read a directory from disk and store its listing in the index.
+
+        Entries ``ignore`` leaves out aren't stat'ed, and the listing isn't
+        stored if there were any.
+        """
+        own_size = own_allocated = 0
+        complete = True
+        linked_files: list[LinkedRecord] = []
+        subdirectories: list[str] = []
+        records: list[EntryRecord] = []
+
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                if ignore is not None and ignore(
+                    directory, entry.name, is_directory(entry)
+                ):
+                    complete = False
+                    continue
+                try:
+                    lstat = entry.stat(follow_symlinks=False)
+                    is_dir = entry.is_dir()
+                except OSError:
+                    # Skip entries we can't access
+                    continue
+
+                if stat.S_ISDIR(lstat.st_mode):
+                    subdirectories.append(entry.name)
+                elif stat.S_ISREG(lstat.st_mode) and lstat.st_nlink > 1:
+                    size = get_usage(lstat)
+                    allocated = get_usage(lstat, allocated=True)
+                    linked_files.append([lstat.st_dev, lstat.st_ino, size, allocated])
+                elif stat.S_ISREG(lstat.st_mode):
+                    own_size += get_usage(lstat)
+                    own_allocated += get_usage(lstat, allocated=True)
+                records.append(encode_entry(entry.name, lstat, is_dir))
+
+        directory_sizes = DirectorySizes(
+            own_size, own_allocated, linked_files, subdirectories
+        )
+        records.sort(key=itemgetter(0))
+        if complete and time.time() - dir_stat.st_mtime >= RACY_WINDOW:
+            self._store(key, dir_stat, directory_sizes, records)
+        return directory_sizes, records
+
+    def _store(
+        self,
+        key: str,
+        dir_stat: os.stat_result,
+        directory_sizes: DirectorySizes,
+        records: list[EntryRecord],
+    ) -> None:
+        """Replace a directory's row, dropping rows of removed subdirectories."""
+        row = self._connection.execute(
+            "SELECT subdirectories FROM directories WHERE path = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            subdirectories = directory_sizes.subdirectories
+            for name in set(json.loads(row[0])).difference(subdirectories):
+                removed = join_entry_path(key, name)
+                # Every descendant path sorts between "removed/" and "removed0"
+                self._connection.execute(
+                    "DELETE FROM directories "
+                    "WHERE path = ? OR (path >= ? AND path < ?)",
+                    (removed, removed + "/", removed + "0"),
+                )
+
+        self._connection.execute(
+            "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                dir_stat.st_mtime_ns,
+                directory_sizes.own_size,
+                directory_sizes.own_allocated,
+                json.dumps(directory_sizes.linked_files),
+                json.dumps(directory_sizes.subdirectories),
+                json.dumps(records, separators=(",", ":")),
+            ),
+        )
@@ -0,0 +1,51 @@
+"""Concurrent metadata gathering for high-latency filesystems.
+
+On network and FUSE mounts every ``lstat()`` waits a round trip, so reading
+entries one at a time is dominated by latency. ``gather_entries`` keeps up to
+``concurrency`` of those calls in flight from an asyncio event loop, using a
+thread pool of that size, and hands the results back in the order the
+entries were given.
+"""
+
+import asyncio
+import os
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+from .entries import FileEntry
+
+# Outcome of reading one entry: its record, or the error it raised
+type EntryResult = FileEntry | OSError
+
+
+def read_entry(entry: os.DirEntry[str]) -> EntryResult:
+    """Build the record of a scanned entry, returning the error on failure."""
+    try:
+        return FileEntry.from_dir_entry(entry)
+    except OSError as os_error:
+        return os_error
+
+
+async def _gather_entries(
+    entries: Sequence[os.DirEntry[str]],
+    concurrency: int,
+) -> list[EntryResult]:
+    """Read the entries on a bounded pool and wait for all of them."""
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            loop.run_in_executor(executor, read_entry, entry) for entry in entries
+        ]
+        return await asyncio.gather(*futures)
+
+
+def gather_entries(
+    entries: Sequence[os.DirEntry[str]],
+    concurrency: int,
+) -> list[EntryResult]:
+    """Read scanned entries with up to ``concurrency`` stat calls in flight.
+
+    Results are in the order of ``entries``, whatever order the calls
+    complete in.
+    """
+    return asyncio.run(_gather_entries(entries, concurrency))
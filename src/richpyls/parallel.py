@@ -0,0 +1,377 @@
+"""Process-pool directory walks for ``-j``.
+
+The Python-side bookkeeping of a walk (building records, sorting) holds the
+GIL, so threads stop helping once stat() calls are cheap. Here each task
+handed to a worker process reads a subtree depth first until it has read
+``SUBTREE_BUDGET`` entries, then returns compact results for the directories
+it read along with the subdirectories it didn't get to. Those go back on the
+pool's shared queue, so idle workers pick up the rest of a large subtree
+while small subtrees are read in a single task.
+
+Results come back in whatever order workers finish; callers put them in
+tree order themselves.
+"""
+
+import os
+import stat
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import partial
+from typing import NamedTuple, Self
+
+from .filters import TreeFilter
+from .gitignore import GitIgnore
+from .scanner import scan_directory, walk
+from .sizes import InodeSet, SizeMap, get_usage
+
+# Entries a task reads before handing the subdirectories it has left back
+SUBTREE_BUDGET = 2048
+
+# The lstat() fields, then the float times, which os.stat_result accepts back,
+# and st_blocks
+type StatFields = tuple[int | float, ...]
+
+
+class LevelEntry(NamedTuple):
+    """One entry of a directory read by a worker."""
+
+    name: str
+    is_dir: bool
+    lstat: StatFields
+
+
+class Level(NamedTuple):
+    """A directory as read by a worker: its sorted entries and any errors."""
+
+    entries: list[LevelEntry]
+    errors: list[OSError]
+
+
+def compact_stat(lstat: os.stat_result) -> StatFields:
+    """Return the fields of a stat result as a plain tuple, cheap to pickle."""
+    return (*lstat, lstat.st_atime, lstat.st_mtime, lstat.st_ctime, lstat.st_blocks)
+
+
+def expand_stat(fields: StatFields) -> os.stat_result:
+    """Rebuild a stat result from ``compact_stat`` fields."""
+    return os.stat_result(fields[:-1], {"st_blocks": fields[-1]})
+
+
+def tree_order(entry: LevelEntry) -> tuple[bool, str]:
+    """Sort key of the tree view: directories first, then by name."""
+    return not entry.is_dir, entry.name.lower()
+
+
+def read_level(
+    path: str,
+    show_all: bool,
+    tree_filter: TreeFilter | None = None,
+) -> Level:
+    """Read and stat one directory, sorted the way the tree view shows it.
+
+    Entries the filter excludes are dropped before they are stat'ed.
+    """
+    try:
+        dir_entries = scan_directory(path, show_all)
+    except OSError as os_error:
+        return Level([], [os_error])
+    if tree_filter is not None:
+        dir_entries = tree_filter.filter_entries(path, dir_entries)
+
+    entries: list[LevelEntry] = []
+    errors: list[OSError] = []
+    for dir_entry in dir_entries:
+        try:
+            lstat = dir_entry.stat(follow_symlinks=False)
+            mode = lstat.st_mode
+            # Symlinks to directories are listed and descended as directories
+            is_dir = dir_entry.is_dir() if stat.S_ISLNK(mode) else stat.S_ISDIR(mode)
+        except OSError as os_error:
+            errors.append(os_error)
+            continue
+        entries.append(LevelEntry(dir_entry.name, is_dir, compact_stat(lstat)))
+    entries.sort(key=tree_order)
+    return Level(entries, errors)
+
+
+# A directory of a tree still to be read, and the depth of its entries
+type TreeTask = tuple[str, int]
+
+
+def read_tree_subtree(
+    task: TreeTask,
+    show_all: bool,
+    budget: int,
+    tree_filter: TreeFilter | None = None,
+) -> tuple[list[tuple[str, Level]], list[TreeTask]]:
+    """Read the levels of a subtree until ``budget`` entries were read.
+
+    Only the directories the tree view descends into under ``tree_filter``
+    are read. Returns the levels read and the directories left for other
+    tasks, the latter in tree order.
+    """
+    levels: list[tuple[str, Level]] = []
+    pending = [task]
+    read = 0
+    while pending and read < budget:
+        directory, depth = pending.pop()
+        level = read_level(directory, show_all, tree_filter)
+        levels.append((directory, level))
+        read += len(level.entries) + 1
+        # Reversed, so the first subdirectory is read next
+        pending.extend(
+            (os.path.join(directory, entry.name), depth + 1)  # noqa: PTH118
+            for entry in reversed(level.entries)
+            if entry.is_dir
+            and (tree_filter is None or tree_filter.descends(entry.name, depth))
+        )
+    pending.reverse()
+    return levels, pending
+
+
+# A file with several hard links: its device, inode and size
+type LinkedFile = tuple[int, int, int]
+# A directory read for sizes: its path, depth below its root, the bytes of
+# its files with a single link, its files with several, and its parent
+type SizeLevel = tuple[str, int, int, list[LinkedFile], str | None]
+# A directory still to be read: its path, depth and parent
+type SizeTask = tuple[str, int, str | None]
+
+
+def sum_file_sizes(
+    entries: Iterable[os.DirEntry[str]],
+    allocated: bool,
+) -> tuple[int, list[LinkedFile]]:
+    """Add up the sizes of the regular files among some entries.
+
+    Files with several hard links are returned apart instead, so that the
+    caller, which sees every worker's results, can count each of them once.
+    """
+    size = 0
+    linked: list[LinkedFile] = []
+    for entry in entries:
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            lstat = entry.stat(follow_symlinks=False)
+        except OSError:
+            # Skip files we can't access
+            continue
+        if lstat.st_nlink > 1:
+            linked.append((lstat.st_dev, lstat.st_ino, get_usage(lstat, allocated)))
+        else:
+            size += get_usage(lstat, allocated)
+    return size, linked
+
+
+def read_size_subtree(
+    task: SizeTask,
+    budget: int,
+    gitignore: GitIgnore | None = None,
+    allocated: bool = False,
+) -> tuple[list[SizeLevel], list[SizeTask]]:
+    """Sum the file sizes of each directory of a subtree, up to ``budget``.
+
+    Directories are read as ``sizes.walk_sizes`` reads them, leaving out
+    what ``gitignore`` ignores. Returns the directories read and those left
+    for other tasks.
+    """
+    root, root_depth, root_parent = task
+    # Depth and parent of each directory found but not read yet
+    found: dict[str, tuple[int, str | None]] = {root: (root_depth, root_parent)}
+    levels: list[SizeLevel] = []
+    read = 0
+    ignore = None if gitignore is None else gitignore.ignores
+    for directory, subdirectories, others in walk(root, ignore=ignore):
+        depth, parent = found.pop(directory)
+        size, linked = sum_file_sizes(others, allocated)
+        levels.append((directory, depth, size, linked, parent))
+        for subdirectory in subdirectories:
+            found[subdirectory.path] = (depth + 1, directory)
+        read += len(subdirectories) + len(others) + 1
+        if read >= budget:
+            break
+    else:
+        # Anything left was unreadable
+        return levels, []
+    return levels, [(path, depth, parent) for path, (depth, parent) in found.items()]
+
+
+class SubtreePool[T, R]:
+    """Run subtree tasks on a process pool, queueing the tasks they hand back.
+
+    ``function`` takes a task and returns a list of results and a list of
+    further tasks. Iterating over the pool yields each batch of results as
+    its task finishes, until no task is left.
+    """
+
+    __slots__ = ("_executor", "_function", "_futures")
+
+    def __init__(
+        self,
+        function: Callable[[T], tuple[list[R], list[T]]],
+        tasks: Iterable[T],
+        jobs: int,
+    ) -> None:
+        """Start ``jobs`` worker processes and queue the initial tasks."""
+        self._function = function
+        self._executor = ProcessPoolExecutor(max_workers=jobs)
+        self._futures: set[Future[tuple[list[R], list[T]]]] = set()
+        for task in tasks:
+            self._submit(task)
+
+    def _submit(self, task: T) -> None:
+        """Queue one task."""
+        self._futures.add(self._executor.submit(self._function, task))
+
+    def __iter__(self) -> Iterator[list[R]]:
+        """Yield result batches as tasks finish, queueing their leftover tasks."""
+        while self._futures:
+            done, self._futures = wait(self._futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                results, tasks = future.result()
+                for task in tasks:
+                    self._submit(task)
+                yield results
+
+    def close(self) -> None:
+        """Stop the workers, dropping the tasks that haven't started."""
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> Self:
+        """Return the pool itself."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop the workers."""
+        self.close()
+
+
+class TreeReader:
+    """Read the levels of a tree in parallel and hand them out on request.
+
+    Workers read ahead of the caller; ``get`` waits only until the level it
+    is asked for has arrived, so a tree can be printed in order while the
+    rest of it is still being read. Each level is handed out once.
+    """
+
+    __slots__ = ("_batches", "_levels", "_pool")
+
+    def __init__(
+        self,
+        root: str | os.PathLike[str],
+        show_all: bool,
+        jobs: int,
+        tree_filter: TreeFilter | None = None,
+    ) -> None:
+        """Start reading the tree below ``root`` on ``jobs`` processes.
+
+        With a ``tree_filter``, only the levels the tree view shows are read.
+        """
+        function = partial(
+            read_tree_subtree,
+            show_all=show_all,
+            budget=SUBTREE_BUDGET,
+            tree_filter=tree_filter,
+        )
+        self._pool: SubtreePool[TreeTask, tuple[str, Level]] = SubtreePool(
+            function, [(os.fspath(root), 1)], jobs
+        )
+        self._batches = iter(self._pool)
+        self._levels: dict[str, Level] = {}
+
+    def get(self, path: str | os.PathLike[str]) -> Level:
+        """Return the level of a directory of the tree, waiting for it if needed."""
+        path = os.fspath(path)
+        while path not in self._levels:
+            batch = next(self._batches, None)
+            if batch is None:
+                message = f"{path!r} is not part of the tree being read"
+                raise KeyError(message)
+            self._levels.update(batch)
+        return self._levels.pop(path)
+
+    def close(self) -> None:
+        """Stop reading."""
+        self._pool.close()
+
+    def __enter__(self) -> Self:
+        """Return the reader itself."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop reading."""
+        self.close()
+
+
+def walk_sizes_parallel(
+    roots: Iterable[str],
+    jobs: int,
+    gitignore: GitIgnore | None = None,
+    *,
+    allocated: bool = False,
+) -> SizeMap:
+    """Build the cumulative size map of several trees on ``jobs`` processes.
+
+    The map is the same as ``sizes.build_size_map`` builds serially, except
+    that a file linked from several directories of one tree counts in the
+    first of them by path rather than the first read. That doesn't depend on
+    the order results arrive in, so every run gives the same map.
+    """
+    roots = list(roots)
+    function = partial(
+        read_size_subtree,
+        budget=SUBTREE_BUDGET,
+        gitignore=gitignore,
+        allocated=allocated,
+    )
+    tasks: list[SizeTask] = [(root, 0, None) for root in roots]
+    levels: list[tuple[str, int, str | None]] = []
+    linked_levels: list[tuple[str, list[LinkedFile]]] = []
+    sizes: SizeMap = {}
+    with SubtreePool(function, tasks, jobs) as pool:
+        for batch in pool:
+            for directory, depth, size, linked, parent in batch:
+                sizes[directory] = size
+                levels.append((directory, depth, parent))
+                if linked:
+                    linked_levels.append((directory, linked))
+
+    # Deepest first, so each subtree total is complete before it is added up
+    levels.sort(key=lambda level: level[1], reverse=True)
+    if linked_levels:
+        add_linked_sizes(sizes, linked_levels, levels, roots)
+    for directory, _, parent in levels:
+        if parent is not None:
+            sizes[parent] += sizes[directory]
+    return sizes
+
+
+def add_linked_sizes(
+    sizes: SizeMap,
+    linked_levels: list[tuple[str, list[LinkedFile]]],
+    levels: list[tuple[str, int, str | None]],
+    roots: list[str],
+) -> None:
+    """Add each hard-linked file to the first directory that links it.
+
+    Directories are taken in the order of their roots, then by path below
+    them. ``levels`` must be sorted deepest first.
+    """
+    root_index = {root: index for index, root in enumerate(roots)}
+    # The root each directory was reached from, shallowest first
+    directory_roots: dict[str, int] = {}
+    for directory, _, parent in reversed(levels):
+        directory_roots[directory] = (
+            root_index[directory] if parent is None else directory_roots[parent]
+        )
+    linked_levels.sort(
+        key=lambda level: (directory_roots[level[0]], level[0].split(os.sep))  # noqa: PTH206
+    )
+    seen = InodeSet()
+    for directory, linked in linked_levels:
+        sizes[directory] += sum(
+            linked_size
+            for device, inode, linked_size in linked
+            if seen.add(device, inode)
+        )
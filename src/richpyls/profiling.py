@@ -0,0 +1,160 @@
+"""Per-phase timing for the ``--profile`` option.
+
+Profiling works by swapping the functions that make up each phase for timed
+wrappers, and putting the originals back afterwards, so runs without
+``--profile`` pay nothing for it. Phases nest (building an entry resolves its
+style), and each phase is only charged for its own time, not for the time of
+the phases it calls into.
+"""
+
+import functools
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# Reported in this order
+PHASES = ("scan", "stat", "name resolution", "style lookup", "render")
+
+
+class Profiler:
+    """Accumulate exclusive time and call counts per phase."""
+
+    __slots__ = ("_local", "_lock", "_patches", "_started", "calls", "seconds")
+
+    def __init__(self) -> None:
+        """Start the wall clock with every phase at zero."""
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self._lock = threading.Lock()
+        # Per-thread stack of the child time of the phases in progress
+        self._local = threading.local()
+        self._patches: list[tuple[Any, str, Any]] = []
+        self._started = time.perf_counter()
+
+    def _enter(self) -> float:
+        """Open a phase on this thread and return its start time."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        return time.perf_counter()
+
+    def _exit(self, phase: str, start: float, calls: int = 1) -> None:
+        """Close the innermost phase and charge its exclusive time."""
+        elapsed = time.perf_counter() - start
+        stack = self._local.stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self._lock:
+            self.seconds[phase] += elapsed - children
+            self.calls[phase] += calls
+
+    def timed[**P, R](self, phase: str, function: Callable[P, R]) -> Callable[P, R]:
+        """Wrap a function so each call is charged to ``phase``."""
+
+        @functools.wraps(function)
+        def timed(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = self._enter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._exit(phase, start)
+
+        return timed
+
+    def timed_iterator[**P, Y](
+        self,
+        phase: str,
+        function: Callable[P, Iterator[Y]],
+    ) -> Callable[P, Iterator[Y]]:
+        """Wrap a generator function so producing each item is charged to ``phase``.
+
+        The time the caller spends on an item between two steps is not.
+        """
+
+        @functools.wraps(function)
+        def timed_iterator(*args: P.args, **kwargs: P.kwargs) -> Iterator[Y]:
+            iterator = function(*args, **kwargs)
+            while True:
+                start = self._enter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self._exit(phase, start, calls=0)
+                    return
+                except BaseException:
+                    self._exit(phase, start)
+                    raise
+                self._exit(phase, start)
+                yield item
+
+        return timed_iterator
+
+    def instrument(
+        self,
+        owner: object,
+        name: str,
+        phase: str,
+        *,
+        iterator: bool = False,
+    ) -> None:
+        """Replace ``owner.name`` with a timed wrapper until ``restore()``.
+
+        ``owner`` can be a module, a class or an instance. Pass ``iterator``
+        for generator functions.
+        """
+        original = vars(owner).get(name)
+        function = getattr(owner, name)
+        wrapper: Any = (
+            self.timed_iterator(phase, function)
+            if iterator
+            else self.timed(phase, function)
+        )
+        if isinstance(original, classmethod | staticmethod):
+            # The bound method already carries its class
+            wrapper = staticmethod(wrapper)
+        self._patches.append((owner, name, original))
+        setattr(owner, name, wrapper)
+
+    def restore(self) -> None:
+        """Put every instrumented function back, in reverse order."""
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+
+    def summary(self) -> dict[str, Any]:
+        """Return the wall time and the time and calls of each phase."""
+        wall = time.perf_counter() - self._started
+        phases = {
+            phase: {"seconds": self.seconds[phase], "calls": self.calls[phase]}
+            for phase in PHASES
+        }
+        # Worker threads can add up to more than the wall time
+        other = max(wall - sum(self.seconds.values()), 0.0)
+        return {"wall_seconds": wall, "other_seconds": other, "phases": phases}
+
+
+def format_summary(summary: dict[str, Any], output_format: str) -> str:
+    """Render a profile summary as an aligned text table or as JSON."""
+    if output_format == "json":
+        return json.dumps(summary)
+
+    wall = summary["wall_seconds"]
+    rows = [
+        (phase, values["seconds"], str(values["calls"]))
+        for phase, values in summary["phases"].items()
+    ]
+    rows.append(("other", summary["other_seconds"], ""))
+
+    lines = [f"{'phase':<16} {'seconds':>9} {'share':>6} {'calls':>9}"]
+    for phase, seconds, calls in rows:
+        share = seconds / wall if wall else 0.0
+        lines.append(f"{phase:<16} {seconds:>9.4f} {share:>6.1%} {calls:>9}")
+    lines.append(f"{'total':<16} {wall:>9.4f}")
+    return "\n".join(lines)
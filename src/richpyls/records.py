@@ -0,0 +1,65 @@
+"""Machine-readable listing formats for ``--format``.
+
+Records are written to the output stream one entry at a time, as soon as
+the entry has been stat'ed, without building any Rich objects. The mode,
+link count, owner and group reuse the long listing fields; the size is in
+bytes and the modification time is ISO 8601, since these are for parsers
+rather than people.
+"""
+
+import csv
+import json
+from datetime import datetime
+from typing import Any, TextIO
+
+from .entries import FileEntry
+
+FIELDS = ("name", "path", "mode", "nlink", "owner", "group", "size", "mtime")
+
+
+def get_record(entry: FileEntry) -> tuple[Any, ...]:
+    """Return the field values of one entry, in ``FIELDS`` order."""
+    fields = entry.long_fields
+    mtime = datetime.fromtimestamp(entry.lstat.st_mtime).astimezone()
+    return (
+        entry.name,
+        entry.path,
+        fields.mode,
+        fields.nlink,
+        fields.owner,
+        fields.group,
+        entry.lstat.st_size,
+        mtime.isoformat(timespec="seconds"),
+    )
+
+
+class RecordWriter:
+    """Write entries to a text stream as NDJSON, CSV or TSV records.
+
+    CSV and TSV output starts with a header row, written once however many
+    directories are listed.
+    """
+
+    __slots__ = ("_csv_writer", "_stream")
+
+    def __init__(self, output_format: str, stream: TextIO) -> None:
+        """Prepare to write records in ``output_format`` to ``stream``."""
+        self._stream = stream
+        self._csv_writer: Any = None
+        if output_format != "ndjson":
+            delimiter = "\t" if output_format == "tsv" else ","
+            self._csv_writer = csv.writer(
+                stream, delimiter=delimiter, lineterminator="\n"
+            )
+            self._csv_writer.writerow(FIELDS)
+
+    def write(self, entry: FileEntry) -> None:
+        """Write the record of one entry."""
+        record = get_record(entry)
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(record)
+        else:
+            line = json.dumps(
+                dict(zip(FIELDS, record, strict=True)), ensure_ascii=False
+            )
+            self._stream.write(line + "\n")
@@ -0,0 +1,85 @@
+"""Directory scanning layer built on os.scandir.
+
+Every listing mode reads directories through this module. ``os.scandir`` hands
+back ``DirEntry`` objects that already know their file type from the directory
+read and cache their ``stat()`` results, so callers should query the entries
+directly instead of building ``Path`` objects and stat'ing them again.
+"""
+
+import os
+from collections.abc import Callable, Iterator
+from operator import attrgetter
+from pathlib import Path
+
+# Anything the renderers can describe: a scanned entry or a path given on the CLI
+type ScanEntry = Path | os.DirEntry[str]
+
+_by_name = attrgetter("name")
+
+
+def scan_directory(
+    path: str | os.PathLike[str],
+    show_all: bool,
+) -> list[os.DirEntry[str]]:
+    """Read a directory once and return its entries sorted by name.
+
+    Entries starting with ``.`` are dropped unless ``show_all`` is True.
+    Raises ``OSError`` if the directory itself cannot be read.
+    """
+    with os.scandir(path) as scan:
+        entries = [
+            entry for entry in scan if show_all or not entry.name.startswith(".")
+        ]
+    entries.sort(key=_by_name)
+    return entries
+
+
+type WalkStep = tuple[str, list[os.DirEntry[str]], list[os.DirEntry[str]]]
+
+
+def walk(
+    path: str | os.PathLike[str],
+    on_error: Callable[[OSError], None] | None = None,
+    ignore: Callable[[str, str, bool], bool] | None = None,
+) -> Iterator[WalkStep]:
+    """Walk a tree top-down like ``os.walk``, but yield ``DirEntry`` objects.
+
+    Each step is ``(directory, subdirectories, other_entries)``. A directory
+    is always yielded before any of its subdirectories, and removing entries
+    from ``subdirectories`` prunes them from the walk. Symlinked directories
+    are not followed. Unreadable directories are skipped, after passing the
+    error to ``on_error`` if given. Entries for which ``ignore(directory,
+    name, is_dir)`` is True are left out as soon as they are read.
+    """
+    pending: list[str] = [os.fspath(path)]
+    while pending:
+        directory = pending.pop()
+        subdirectories: list[os.DirEntry[str]] = []
+        others: list[os.DirEntry[str]] = []
+        try:
+            with os.scandir(directory) as scan:
+                for entry in scan:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        # Skip entries whose type we can't determine
+                        continue
+                    if ignore is not None and ignore(directory, entry.name, is_dir):
+                        continue
+                    (subdirectories if is_dir else others).append(entry)
+        except OSError as os_error:
+            # Skip directories we can't access
+            if on_error is not None:
+                on_error(os_error)
+            continue
+
+        yield directory, subdirectories, others
+        pending.extend(entry.path for entry in subdirectories)
+
+
+def get_suffix(name: str) -> str:
+    """Return the lowercased extension of a file name, like ``Path.suffix``."""
+    index = name.rfind(".")
+    if 0 < index < len(name) - 1:
+        return name[index:].lower()
+    return ""
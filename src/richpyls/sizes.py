@@ -0,0 +1,288 @@
+"""Directory size aggregation shared by the size and tree listings.
+
+Sizes are counted like ``du``: symlinks aren't followed or counted, and a
+file with several hard links is counted once, the first time the walk
+meets it. Either the apparent size (``st_size``) or the space allocated on
+disk (``st_blocks`` 512-byte blocks) is counted.
+"""
+
+from __future__ import annotations
+
+import heapq
+from array import array
+from typing import TYPE_CHECKING
+
+from .scanner import walk
+
+if TYPE_CHECKING:
+    import os
+    from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+
+    from .gitignore import GitIgnore
+
+# Cumulative size of every directory in a walk, keyed by its path
+type SizeMap = dict[str, int]
+
+# st_blocks counts 512-byte units, whatever the filesystem's block size
+BLOCK_SIZE = 512
+
+# The hash table of an InodeSet starts this big and is kept at most half full
+_INODE_SET_CAPACITY = 1024
+# Odd 64-bit constants: one mixes the device into the inode number, the
+# other scatters the result, whose top bits pick the slot (Fibonacci hashing)
+_DEVICE_MULTIPLIER = 0xFF51AFD7ED558CCD
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_UINT64_MASK = (1 << 64) - 1
+
+
+class InodeSet:
+    """A set of (device, inode) pairs for telling hard links apart.
+
+    Pairs live in flat arrays of unsigned 64-bit integers with open
+    addressing. Once past its starting size the table is between a quarter
+    and half full, so a pair takes 34 to 68 bytes against some 170 for a
+    ``set`` of tuples, and trees with millions of linked files stay
+    affordable.
+    """
+
+    __slots__ = ("_count", "_devices", "_inodes", "_shift", "_used")
+
+    def __init__(self) -> None:
+        """Create an empty set."""
+        self._count = 0
+        self._allocate(_INODE_SET_CAPACITY)
+
+    def __len__(self) -> int:
+        """Return how many pairs the set holds."""
+        return self._count
+
+    def _allocate(self, capacity: int) -> None:
+        """Replace the table with an empty one of ``capacity`` slots."""
+        self._devices = array("Q", bytes(8 * capacity))
+        self._inodes = array("Q", bytes(8 * capacity))
+        self._used = bytearray(capacity)
+        # Keeps the top log2(capacity) bits of a 64-bit hash
+        self._shift = 65 - capacity.bit_length()
+
+    def add(self, device: int, inode: int) -> bool:
+        """Add a pair, returning False if it was already there."""
+        used = self._used
+        inodes = self._inodes
+        mask = len(used) - 1
+        # Inode numbers often share a stride, so their low bits can't be used
+        # as they are: hash the whole number into the slot
+        slot = (
+            (inode ^ device * _DEVICE_MULTIPLIER) * _HASH_MULTIPLIER & _UINT64_MASK
+        ) >> self._shift
+        while used[slot]:
+            if inodes[slot] == inode and self._devices[slot] == device:
+                return False
+            slot = (slot + 1) & mask
+        used[slot] = 1
+        self._devices[slot] = device
+        inodes[slot] = inode
+        self._count += 1
+        if 2 * self._count > mask:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        """Double the table, inserting the pairs again."""
+        old_devices, old_inodes, old_used = self._devices, self._inodes, self._used
+        self._allocate(2 * len(old_used))
+        devices, inodes, used = self._devices, self._inodes, self._used
+        mask = len(used) - 1
+        shift = self._shift
+        for slot in range(len(old_used)):
+            if not old_used[slot]:
+                continue
+            device = old_devices[slot]
+            inode = old_inodes[slot]
+            new_slot = (
+                (inode ^ device * _DEVICE_MULTIPLIER) * _HASH_MULTIPLIER & _UINT64_MASK
+            ) >> shift
+            while used[new_slot]:
+                new_slot = (new_slot + 1) & mask
+            used[new_slot] = 1
+            devices[new_slot] = device
+            inodes[new_slot] = inode
+
+
+def get_usage(lstat: os.stat_result, allocated: bool = False) -> int:
+    """Return the bytes a file counts for: its size, or its allocated space."""
+    return lstat.st_blocks * BLOCK_SIZE if allocated else lstat.st_size
+
+
+def get_file_size(
+    entry: os.DirEntry[str],
+    seen: InodeSet | None = None,
+    allocated: bool = False,
+) -> int:
+    """Return the size of a regular file entry, or 0 for anything else.
+
+    With ``seen``, a file with several hard links only counts the first
+    time; the other links count 0.
+    """
+    try:
+        if entry.is_file(follow_symlinks=False):
+            lstat = entry.stat(follow_symlinks=False)
+            if (
+                seen is not None
+                and lstat.st_nlink > 1
+                and not seen.add(lstat.st_dev, lstat.st_ino)
+            ):
+                return 0
+            return get_usage(lstat, allocated)
+    except OSError:
+        # Skip files we can't access
+        pass
+    return 0
+
+
+def fold_into_parents(sizes: SizeMap, parents: Mapping[str, str]) -> SizeMap:
+    """Turn per-directory sizes recorded top-down into cumulative sizes.
+
+    ``sizes`` must list parents before their children. Folding each directory
+    into its parent in reverse order is then a post-order aggregation: every
+    subtree total is complete before it is added upwards.
+    """
+    for directory in reversed(sizes):
+        parent = parents.get(directory)
+        if parent is not None:
+            sizes[parent] += sizes[directory]
+    return sizes
+
+
+def walk_sizes(
+    root: str,
+    gitignore: GitIgnore | None = None,
+    *,
+    allocated: bool = False,
+    seen: InodeSet | None = None,
+) -> SizeMap:
+    """Walk a tree once and return the cumulative size of every directory in it.
+
+    With ``gitignore``, ignored entries are neither read nor counted. Hard
+    links are told apart through ``seen``, shared between walks that must
+    count each file once; a new set is used if it isn't given.
+    """
+    sizes: SizeMap = {}
+    parents: dict[str, str] = {}
+
+    if seen is None:
+        seen = InodeSet()
+    ignore = None if gitignore is None else gitignore.ignores
+    for directory, subdirectories, others in walk(root, ignore=ignore):
+        sizes[directory] = sum(
+            get_file_size(entry, seen, allocated) for entry in others
+        )
+        for subdirectory in subdirectories:
+            parents[subdirectory.path] = directory
+
+    return fold_into_parents(sizes, parents)
+
+
+def iter_file_sizes(
+    path: str | os.PathLike[str],
+    show_all: bool,
+    on_error: Callable[[OSError], None] | None = None,
+    gitignore: GitIgnore | None = None,
+    *,
+    allocated: bool = False,
+) -> Iterator[tuple[os.DirEntry[str], int]]:
+    """Yield every regular file below a directory together with its size.
+
+    Hidden files and directories are skipped unless ``show_all`` is True;
+    hidden directories are pruned before they are read, and so are entries
+    ``gitignore`` ignores. Symlinks are neither followed nor counted, and a
+    file with several hard links is yielded under the first name found.
+    """
+    seen = InodeSet()
+    ignore = None if gitignore is None else gitignore.ignores
+    for _, subdirectories, others in walk(path, on_error, ignore):
+        if not show_all:
+            subdirectories[:] = [
+                entry for entry in subdirectories if not entry.name.startswith(".")
+            ]
+        for entry in others:
+            if not show_all and entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    lstat = entry.stat(follow_symlinks=False)
+                    if lstat.st_nlink == 1 or seen.add(lstat.st_dev, lstat.st_ino):
+                        yield entry, get_usage(lstat, allocated)
+            except OSError:
+                # Skip files we can't access
+                continue
+
+
+def build_size_map(
+    roots: Sequence[str],
+    jobs: int = 1,
+    gitignore: GitIgnore | None = None,
+    *,
+    allocated: bool = False,
+) -> SizeMap:
+    """Build one size map covering several directory trees.
+
+    Each root is walked exactly once, and a file linked from several of
+    them counts in the first only. With ``jobs`` above 1 the trees are
+    split across that many processes, a single large tree included. The
+    map is the same as a serial run, except that a file linked from several
+    directories of one tree counts in the first of them by path rather than
+    the first read. Entries ``gitignore`` ignores don't count.
+    """
+    if jobs > 1:
+        from .parallel import walk_sizes_parallel
+
+        return walk_sizes_parallel(roots, jobs, gitignore, allocated=allocated)
+
+    seen = InodeSet()
+    size_map: SizeMap = {}
+    for root in roots:
+        size_map.update(walk_sizes(root, gitignore, allocated=allocated, seen=seen))
+    return size_map
+
+
+class TopN[T]:
+    """Keep the ``limit`` largest items of a stream of (item, size) pairs.
+
+    A min-heap of at most ``limit`` pairs holds the current leaders, so memory
+    is O(limit) however many pairs are added. Ties keep the item that was
+    added first, matching a stable sort by descending size.
+    """
+
+    __slots__ = ("_counter", "_heap", "_limit")
+
+    def __init__(self, limit: int) -> None:
+        """Create an empty collector for the ``limit`` largest items."""
+        self._limit = limit
+        self._counter = 0
+        # (size, -insertion order, item): the heap top is the first to evict
+        self._heap: list[tuple[int, int, T]] = []
+
+    def __len__(self) -> int:
+        """Return how many items are currently kept."""
+        return len(self._heap)
+
+    def add(self, item: T, size: int) -> None:
+        """Offer one item to the ranking."""
+        if self._limit <= 0:
+            return
+        self._counter += 1
+        candidate = (size, -self._counter, item)
+        if len(self._heap) < self._limit:
+            heapq.heappush(self._heap, candidate)
+        elif candidate[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, candidate)
+
+    def extend(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """Offer every (item, size) pair of an iterable to the ranking."""
+        for item, size in pairs:
+            self.add(item, size)
+
+    def results(self) -> list[tuple[T, int]]:
+        """Return the kept (item, size) pairs, largest first."""
+        ranked = sorted(self._heap, key=lambda pair: pair[:2], reverse=True)
+        return [(item, size) for size, _, item in ranked]
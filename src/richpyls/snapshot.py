@@ -0,0 +1,287 @@
+"""Tree snapshots for ``--save-snapshot`` and ``--diff``.
+
+A snapshot holds one record per non-directory entry below a directory:
+its path relative to that directory, size, modification time, inode and
+mode. Records are written in tree order (a directory's entries sorted by
+name, each subdirectory's entries right after it), which is the order a
+walk produces them in without sorting anything. Two snapshots, or a
+snapshot and a live walk, can then be compared in a single merge pass that
+holds only one record of each side and one directory per level in memory.
+"""
+
+import os
+import struct
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from typing import BinaryIO, NamedTuple
+
+from .scanner import scan_directory
+from .sizes import TopN
+
+MAGIC = b"richpyls-snapshot 1\n"
+
+# size, mtime (ns), inode, mode and the length of the UTF-8 path that follows
+_RECORD = struct.Struct("<QqQIH")
+_CHUNK_SIZE = 1 << 20
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is malformed or out of order."""
+
+
+class SnapshotRecord(NamedTuple):
+    """One file of a snapshot."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    mode: int
+
+
+def iter_tree(
+    root: str | os.PathLike[str],
+    show_all: bool,
+    on_error: Callable[[OSError], None] | None = None,
+) -> Iterator[SnapshotRecord]:
+    """Walk a directory and yield a record per file, in tree order.
+
+    Symlinked directories are not followed. Unreadable entries and
+    directories are skipped, after passing the error to ``on_error`` if
+    given; an unreadable ``root`` raises ``OSError``.
+    """
+    # One iterator per directory level: its path prefix and its entries left
+    stack = [("", iter(scan_directory(root, show_all)))]
+    while stack:
+        prefix, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        path = prefix + entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((path + "/", iter(scan_directory(entry.path, show_all))))
+                continue
+            entry_stat = entry.stat(follow_symlinks=False)
+        except OSError as os_error:
+            if on_error is not None:
+                on_error(os_error)
+            continue
+        yield SnapshotRecord(
+            path,
+            entry_stat.st_size,
+            entry_stat.st_mtime_ns,
+            entry_stat.st_ino,
+            entry_stat.st_mode,
+        )
+
+
+def write_snapshot(stream: BinaryIO, records: Iterable[SnapshotRecord]) -> int:
+    """Write records to a binary stream and return how many were written."""
+    stream.write(MAGIC)
+    count = 0
+    for record in records:
+        path = os.fsencode(record.path)
+        header = _RECORD.pack(
+            record.size, record.mtime_ns, record.inode, record.mode, len(path)
+        )
+        stream.write(header + path)
+        count += 1
+    return count
+
+
+def read_snapshot(stream: BinaryIO) -> Iterator[SnapshotRecord]:
+    """Yield the records of a snapshot, raising SnapshotError if it's malformed.
+
+    The stream is read in large chunks that records are unpacked from in
+    place, rather than with two reads per record.
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        message = "not a richpyls snapshot"
+        raise SnapshotError(message)
+
+    encoding = sys.getfilesystemencoding()
+    errors = sys.getfilesystemencodeerrors()
+    unpack_from = _RECORD.unpack_from
+    header_size = _RECORD.size
+    buffer = b""
+    offset = 0
+    while True:
+        if len(buffer) - offset < header_size:
+            buffer = buffer[offset:] + stream.read(_CHUNK_SIZE)
+            offset = 0
+            if not buffer:
+                return
+            if len(buffer) < header_size:
+                message = "snapshot is truncated"
+                raise SnapshotError(message)
+        size, mtime_ns, inode, mode, length = unpack_from(buffer, offset)
+        end = offset + header_size + length
+        if end > len(buffer):
+            buffer = buffer[offset:] + stream.read(_CHUNK_SIZE)
+            offset = 0
+            end = header_size + length
+            if end > len(buffer):
+                message = "snapshot is truncated"
+                raise SnapshotError(message)
+        path = buffer[offset + header_size : end].decode(encoding, errors)
+        offset = end
+        yield SnapshotRecord(path, size, mtime_ns, inode, mode)
+
+
+def tree_key(path: str) -> str:
+    """Return the sort key of a relative path in tree order.
+
+    NUL can't appear in names and sorts before every other character, so
+    with it as the separator, plain string comparison puts a directory's
+    contents right after it and before its next sibling, as the walk does.
+    """
+    return path.replace("/", "\0")
+
+
+class Change(NamedTuple):
+    """A file that differs between two snapshots."""
+
+    path: str
+    old: SnapshotRecord | None
+    new: SnapshotRecord | None
+
+    @property
+    def delta(self) -> int:
+        """Return how many bytes the file grew by (negative if it shrank)."""
+        old_size = 0 if self.old is None else self.old.size
+        new_size = 0 if self.new is None else self.new.size
+        return new_size - old_size
+
+
+def _keyed(
+    records: Iterable[SnapshotRecord],
+) -> Iterator[tuple[str, SnapshotRecord]]:
+    """Pair records with their keys, raising SnapshotError if out of order."""
+    previous: str | None = None
+    for record in records:
+        key = tree_key(record.path)
+        if previous is not None and key <= previous:
+            message = f"snapshot is not in tree order at {record.path!r}"
+            raise SnapshotError(message)
+        previous = key
+        yield key, record
+
+
+def diff_records(
+    old: Iterable[SnapshotRecord],
+    new: Iterable[SnapshotRecord],
+) -> Iterator[Change]:
+    """Merge two tree-ordered record streams, yielding the files that changed.
+
+    A file changed if it was added, removed, or its size, modification time
+    or inode differ. Runs in linear time and constant memory.
+    """
+    old_records = _keyed(old)
+    new_records = _keyed(new)
+    old_item = next(old_records, None)
+    new_item = next(new_records, None)
+    while old_item is not None and new_item is not None:
+        (old_key, old_record), (new_key, new_record) = old_item, new_item
+        if old_key < new_key:
+            yield Change(old_record.path, old_record, None)
+            old_item = next(old_records, None)
+        elif new_key < old_key:
+            yield Change(new_record.path, None, new_record)
+            new_item = next(new_records, None)
+        else:
+            # Same path: compare size, mtime and inode
+            if old_record[1:4] != new_record[1:4]:
+                yield Change(new_record.path, old_record, new_record)
+            old_item = next(old_records, None)
+            new_item = next(new_records, None)
+
+    # At most one side has records left
+    if old_item is not None:
+        yield Change(old_item[1].path, old_item[1], None)
+        yield from (Change(record.path, record, None) for _, record in old_records)
+    if new_item is not None:
+        yield Change(new_item[1].path, None, new_item[1])
+        yield from (Change(record.path, None, record) for _, record in new_records)
+
+
+class DiffSummary:
+    """The largest additions, removals and growth among a stream of changes.
+
+    Growth is also added up per directory. Since changes arrive in tree
+    order, a directory's total is complete as soon as a change outside it
+    shows up, so only the directories on the current path are held.
+    """
+
+    __slots__ = (
+        "_deltas",
+        "_directory",
+        "added",
+        "changed_count",
+        "grown",
+        "grown_directories",
+        "removed",
+    )
+
+    def __init__(self, limit: int) -> None:
+        """Keep the ``limit`` largest entries of each kind."""
+        self.added: TopN[Change] = TopN(limit)
+        self.removed: TopN[Change] = TopN(limit)
+        self.grown: TopN[Change] = TopN(limit)
+        self.grown_directories: TopN[str] = TopN(limit)
+        self.changed_count = 0
+        # Components of the directory of the last change, and the growth so
+        # far of the root and of each directory on the way down to it
+        self._directory: list[str] = []
+        self._deltas = [0]
+
+    @property
+    def total_delta(self) -> int:
+        """Return the growth of the whole tree, once ``finish()`` was called."""
+        return self._deltas[0]
+
+    def add(self, change: Change) -> None:
+        """Account for one change."""
+        self.changed_count += 1
+        if change.old is None:
+            self.added.add(change, change.delta)
+        elif change.new is None:
+            self.removed.add(change, -change.delta)
+        elif change.delta > 0:
+            self.grown.add(change, change.delta)
+
+        parents = change.path.split("/")[:-1]
+        directory = self._directory
+        common = 0
+        for part, open_part in zip(parents, directory, strict=False):
+            if part != open_part:
+                break
+            common += 1
+        while len(directory) > common:
+            self._close_directory()
+        directory.extend(parents[common:])
+        self._deltas.extend([0] * (len(parents) - common))
+        self._deltas[-1] += change.delta
+
+    def _close_directory(self) -> None:
+        """Rank the innermost open directory and pass its growth to its parent."""
+        delta = self._deltas.pop()
+        if delta > 0:
+            self.grown_directories.add("/".join(self._directory), delta)
+        self._directory.pop()
+        self._deltas[-1] += delta
+
+    def finish(self) -> None:
+        """Close the directories still open once every change is in."""
+        while self._directory:
+            self._close_directory()
+
+
+def summarize_changes(changes: Iterable[Change], limit: int) -> DiffSummary:
+    """Summarize a stream of changes, keeping ``limit`` entries of each kind."""
+    summary = DiffSummary(limit)
+    for change in changes:
+        summary.add(change)
+    summary.finish()
+    return summary
@@ -0,0 +1,134 @@
+"""File type styles and icons.
+
+Extensions are resolved through one flat ``extension -> (style, icon)`` dict
+built when the module is imported, so a lookup costs the same however many
+categories exist. Users can add categories in
+``$XDG_CONFIG_HOME/richpyls/config.toml`` (``~/.config`` by default)::
+
+    [file_types.data]
+    extensions = [".parquet", ".feather"]
+    style = "cyan"
+    icon = "🧮"
+"""
+
+import os
+import stat
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from .scanner import get_suffix
+
+type Style = tuple[str, str]
+
+# Built-in categories: (extensions, (style, icon))
+FILE_TYPES: tuple[tuple[tuple[str, ...], Style], ...] = (
+    # Python files
+    ((".py", ".pyx", ".pyi"), ("green", "🐍")),
+    # Configuration files
+    ((".toml", ".json", ".yaml", ".yml", ".ini", ".cfg", ".conf"), ("yellow", "⚙️")),
+    # Documentation files
+    ((".md", ".rst", ".txt", ".doc", ".docx", ".pdf"), ("magenta", "📄")),
+    # Archive files
+    ((".zip", ".tar", ".gz", ".bz2", ".xz", ".7z", ".rar"), ("red", "📦")),
+    # Image files
+    (
+        (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".ico"),
+        ("bright_magenta", "🖼️"),
+    ),
+)
+
+DIRECTORY_STYLE: Style = ("bold blue", "📁")
+SYMLINK_STYLE: Style = ("cyan", "🔗")
+EXECUTABLE_STYLE: Style = ("bold green", "⚡")
+HIDDEN_STYLE: Style = ("dim white", "🫣")
+DEFAULT_STYLE: Style = ("white", "📄")
+
+# Flattened lookup table, one key per extension
+EXTENSION_STYLES: dict[str, Style] = {
+    extension: style for extensions, style in FILE_TYPES for extension in extensions
+}
+
+
+def register_file_type(extensions: Iterable[str], style: str, icon: str) -> None:
+    """Add or override the style and icon of some extensions."""
+    for extension in extensions:
+        normalized = extension.lower()
+        if not normalized.startswith("."):
+            normalized = f".{normalized}"
+        EXTENSION_STYLES[normalized] = (style, icon)
+
+
+class ConfigError(ValueError):
+    """Raised when the file types config file is malformed."""
+
+    def __init__(self, path: Path, problem: str) -> None:
+        """Describe what is wrong with the config file at ``path``."""
+        super().__init__(f"{path}: {problem}")
+
+
+def get_default_config_path() -> Path:
+    """Return the config file location, honouring ``XDG_CONFIG_HOME``."""
+    config_home = os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    return Path(config_home) / "richpyls" / "config.toml"
+
+
+def parse_file_type(category: dict[str, Any]) -> tuple[list[str], str, str]:
+    """Return the extensions, style and icon of one config category.
+
+    Raises ``KeyError`` or ``TypeError`` if the category is malformed.
+    """
+    extensions = category["extensions"]
+    if isinstance(extensions, str) or not isinstance(extensions, list):
+        raise TypeError(extensions)
+    style = category.get("style", DEFAULT_STYLE[0])
+    icon = category.get("icon", DEFAULT_STYLE[1])
+    return [str(extension) for extension in extensions], str(style), str(icon)
+
+
+def load_file_types_config(path: Path | None = None) -> int:
+    """Register the file type categories of a config file, if it exists.
+
+    Returns the number of categories added. Raises ``ConfigError`` or
+    ``tomllib.TOMLDecodeError`` (both ``ValueError``) when it is malformed.
+    """
+    if path is None:
+        path = get_default_config_path()
+    try:
+        config_file = path.open("rb")
+    except FileNotFoundError:
+        return 0
+
+    # Only runs that have a config file pay for the TOML parser
+    import tomllib
+
+    with config_file:
+        config = tomllib.load(config_file)
+
+    categories = config.get("file_types", {})
+    if not isinstance(categories, dict):
+        raise ConfigError(path, "[file_types] must be a table")
+
+    for name, category in categories.items():
+        try:
+            extensions, style, icon = parse_file_type(category)
+        except (KeyError, TypeError, AttributeError) as error:
+            raise ConfigError(path, f"invalid file type {name!r}") from error
+        register_file_type(extensions, style, icon)
+
+    return len(categories)
+
+
+def resolve_style_and_icon(name: str, mode: int, is_dir: bool) -> Style:
+    """Get Rich style and icon for a file from its name and lstat mode."""
+    if is_dir:
+        return DIRECTORY_STYLE
+    if stat.S_ISLNK(mode):
+        return SYMLINK_STYLE
+    if mode & stat.S_IXUSR:  # Executable
+        return EXECUTABLE_STYLE
+    if name.startswith("."):  # Hidden files
+        return HIDDEN_STYLE
+
+    # Check file extension
+    return EXTENSION_STYLES.get(get_suffix(name), DEFAULT_STYLE)
@@ -0,0 +1,241 @@
+"""Incremental directory listings for ``--watch``, driven by Linux inotify.
+
+A ``DirectoryWatch`` reads the directory once, then asks the kernel for the
+names that were created, deleted, renamed or modified and stats only those,
+so keeping a listing current costs in proportion to the churn rather than to
+the size of the directory. inotify is reached through ``ctypes``; on systems
+without it, opening a watch raises ``OSError``.
+"""
+
+import ctypes
+import errno
+import os
+import select
+import struct
+import time
+from bisect import bisect_left, insort
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import NamedTuple, Self
+
+from .entries import FileEntry
+from .scanner import scan_directory
+
+# Event bits from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+# The watched directory itself went away
+GONE_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+# Turns the scanned entries of the directory into records
+type EntryLoader = Callable[[list[os.DirEntry[str]]], list[FileEntry]]
+
+
+class Event(NamedTuple):
+    """One inotify event."""
+
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+def parse_events(buffer: bytes) -> Iterator[Event]:
+    """Decode the events in a buffer read from an inotify descriptor."""
+    offset = 0
+    while offset < len(buffer):
+        wd, mask, cookie, length = _EVENT.unpack_from(buffer, offset)
+        offset += _EVENT.size
+        # Names are NUL padded to an aligned length
+        name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+        offset += length
+        yield Event(wd, mask, cookie, name)
+
+
+def _check(result: int) -> int:
+    """Raise the C library's errno as ``OSError`` when a call fails."""
+    if result < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+class Inotify:
+    """A thin wrapper around an inotify file descriptor."""
+
+    __slots__ = ("_add_watch", "fd")
+
+    def __init__(self) -> None:
+        """Open a new inotify instance, raising OSError if there's no inotify."""
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            init = libc.inotify_init1
+            self._add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError(errno.ENOSYS, "inotify is not available") from None
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = _check(init(IN_CLOEXEC))
+
+    def add_watch(self, path: str | os.PathLike[str], mask: int) -> int:
+        """Watch a path for the events in ``mask`` and return the watch id."""
+        return _check(self._add_watch(self.fd, os.fsencode(path), mask))
+
+    def read_events(self, timeout: float | None = None) -> list[Event]:
+        """Return the pending events, waiting up to ``timeout`` for some."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        return list(parse_events(os.read(self.fd, _READ_SIZE)))
+
+    def close(self) -> None:
+        """Close the descriptor, which drops all its watches."""
+        os.close(self.fd)
+
+    def __enter__(self) -> Self:
+        """Return the instance itself."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the descriptor."""
+        self.close()
+
+
+def load_serially(dir_entries: list[os.DirEntry[str]]) -> list[FileEntry]:
+    """Stat scanned entries one by one, dropping those that vanished."""
+    entries = []
+    for dir_entry in dir_entries:
+        try:
+            entries.append(FileEntry.from_dir_entry(dir_entry))
+        except OSError:
+            continue
+    return entries
+
+
+class DirectoryWatch:
+    """The entries of one directory, kept current from inotify events.
+
+    The watch is in place before the directory is first read, so nothing
+    that changes while it's being read is missed.
+    """
+
+    __slots__ = ("_entries", "_inotify", "_load", "_names", "_path", "_show_all")
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        show_all: bool,
+        load: EntryLoader = load_serially,
+    ) -> None:
+        """Start watching ``path`` and read its entries.
+
+        Raises ``OSError`` if inotify is unavailable or the directory can't
+        be watched or read.
+        """
+        self._path = Path(path)
+        self._show_all = show_all
+        self._load = load
+        self._entries: dict[str, FileEntry] = {}
+        # Sorted, so listings stay in scan_directory order
+        self._names: list[str] = []
+        self._inotify = Inotify()
+        try:
+            self._inotify.add_watch(self._path, WATCH_MASK)
+            self.rescan()
+        except OSError:
+            self._inotify.close()
+            raise
+
+    @property
+    def entries(self) -> list[FileEntry]:
+        """Return the current entries, sorted by name."""
+        entries = self._entries
+        return [entries[name] for name in self._names]
+
+    def rescan(self) -> None:
+        """Read the whole directory again."""
+        loaded = self._load(scan_directory(self._path, self._show_all))
+        self._entries = {entry.name: entry for entry in loaded}
+        self._names = sorted(self._entries)
+
+    def refresh(self, names: set[str]) -> None:
+        """Stat the named entries again, adding, updating or dropping them."""
+        for name in names:
+            if not self._show_all and name.startswith("."):
+                continue
+            try:
+                entry = FileEntry.from_path(self._path / name)
+            except OSError:
+                entry = None
+            if entry is None:
+                if self._entries.pop(name, None) is not None:
+                    del self._names[bisect_left(self._names, name)]
+            elif self._entries.setdefault(name, entry) is entry:
+                insort(self._names, name)
+            else:
+                self._entries[name] = entry
+
+    def update(self, interval: float) -> None:
+        """Wait for changes and apply them.
+
+        Events are collected for ``interval`` seconds after the first one,
+        so a file being written refreshes at most once per interval. Raises
+        ``FileNotFoundError`` if the directory is removed or moved away.
+        """
+        events = self._inotify.read_events()
+        deadline = time.monotonic() + interval
+        while (remaining := deadline - time.monotonic()) > 0:
+            events.extend(self._inotify.read_events(remaining))
+
+        names: set[str] = set()
+        overflowed = False
+        for event in events:
+            if event.mask & GONE_MASK:
+                message = "watched directory is gone"
+                raise FileNotFoundError(errno.ENOENT, message, str(self._path))
+            if event.mask & IN_Q_OVERFLOW:
+                overflowed = True
+            elif event.name:
+                names.add(event.name)
+
+        if overflowed:
+            # The kernel dropped events, so only a full read is accurate
+            self.rescan()
+        else:
+            self.refresh(names)
+
+    def close(self) -> None:
+        """Stop watching the directory."""
+        self._inotify.close()
+
+    def __enter__(self) -> Self:
+        """Return the watch itself."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop watching the directory."""
+        self.close()
@@ -0,0 +1,13 @@
+import pytest
+
+from richpyls.entries import get_group_name, get_owner_name
+
+
+@pytest.fixture(autouse=True)
+def clear_name_caches():
+    # Owner/group names are cached per process; start each test from scratch
+    get_owner_name.cache_clear()
+    get_group_name.cache_clear()
+    yield
+    get_owner_name.cache_clear()
+    get_group_name.cache_clear()
@@ -0,0 +1,183 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from richpyls import daemon
+from richpyls.daemon import (
+    STDOUT,
+    connect,
+    get_socket_path,
+    open_frame_stream,
+    receive_frame,
+    send_frame,
+)
+
+CLIENT = "from richpyls.daemon import main; main()"
+
+
+def _environ(socket_path, **extra):
+    environ = {**os.environ, "RICHPYLS_SOCKET": str(socket_path)}
+    environ.pop("FORCE_COLOR", None)
+    environ.update(extra)
+    return environ
+
+
+def _run(command, cwd, socket_path, **extra):
+    return subprocess.run(  # noqa: S603 - runs our own CLI
+        [sys.executable, *command],
+        capture_output=True,
+        text=True,
+        check=False,
+        cwd=cwd,
+        env=_environ(socket_path, **extra),
+    )
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Start a server on a socket in tmp_path and return the socket path."""
+    socket_path = tmp_path / "s.sock"
+    process = subprocess.Popen(  # noqa: S603 - runs our own CLI
+        [sys.executable, "-m", "richpyls", "--serve"],
+        env=_environ(socket_path),
+    )
+    deadline = time.monotonic() + 10
+    while not socket_path.exists():
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    # The socket only appears once the server accepts connections
+    connect(str(socket_path)).close()
+    yield socket_path
+    process.terminate()
+    process.wait(timeout=10)
+
+
+@pytest.fixture
+def listed_dir(tmp_path):
+    listed = tmp_path / "listed"
+    listed.mkdir()
+    (listed / "notes.txt").write_text("hello")
+    (listed / "script.py").write_text("print()")
+    (listed / "sub").mkdir()
+    return listed
+
+
+@pytest.mark.parametrize("args", [[], ["-l"], ["-t"], ["--format", "csv"]])
+def test_client_output_matches_a_local_run(server, listed_dir, args):
+    local = _run(["-m", "richpyls", *args], listed_dir, server)
+    forwarded = _run(["-c", CLIENT, *args], listed_dir, server)
+
+    assert forwarded.returncode == local.returncode == 0
+    assert forwarded.stdout == local.stdout
+
+
+def test_client_forwards_the_environment(server, listed_dir):
+    result = _run(["-c", CLIENT], listed_dir, server, FORCE_COLOR="1")
+
+    assert "\x1b[" in result.stdout
+    assert "notes.txt" in result.stdout
+
+
+def test_client_reports_errors_and_exit_code(server, listed_dir):
+    result = _run(["-c", CLIENT, "missing"], listed_dir, server)
+
+    assert result.returncode == 2
+    assert result.stdout == ""
+    assert "missing" in result.stderr
+
+
+def test_server_keeps_serving_after_a_client_hangs_up(server, listed_dir):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(server))
+        connection.sendall(b"\x00")
+
+    result = _run(["-c", CLIENT], listed_dir, server)
+    assert "notes.txt" in result.stdout
+
+
+@pytest.mark.parametrize("option", ["--watch", "--serve"])
+def test_server_refuses_endless_runs(server, listed_dir, option):
+    refused = _run(["-c", CLIENT, option, "."], listed_dir, server)
+    after = _run(["-c", CLIENT], listed_dir, server)
+
+    assert refused.returncode == 2
+    assert "richpyls-client" in refused.stderr
+    assert after.returncode == 0
+    assert "notes.txt" in after.stdout
+
+
+def test_client_does_not_rerun_after_a_partial_response(tmp_path, listed_dir):
+    socket_path = tmp_path / "fake.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as fake_server:
+        fake_server.bind(str(socket_path))
+        fake_server.listen()
+
+        def answer_partially():
+            connection, _ = fake_server.accept()
+            with connection:
+                receive_frame(connection)
+                send_frame(connection, STDOUT, b"PARTIAL FROM SERVER\n")
+
+        thread = threading.Thread(target=answer_partially)
+        thread.start()
+        result = _run(["-c", CLIENT], listed_dir, socket_path)
+        thread.join()
+
+    assert result.returncode == 1
+    assert result.stdout == "PARTIAL FROM SERVER\n"
+    assert "hung up" in result.stderr
+
+
+def test_client_refuses_servers_of_other_users(server, monkeypatch):
+    real_uid = os.getuid()
+    monkeypatch.setattr(daemon.os, "getuid", lambda: real_uid + 1)
+
+    with pytest.raises(PermissionError, match="another user"):
+        connect(str(server))
+
+
+def test_client_runs_locally_without_a_server(tmp_path, listed_dir):
+    result = _run(["-c", CLIENT], listed_dir, tmp_path / "none.sock")
+
+    assert result.returncode == 0
+    assert "notes.txt" in result.stdout
+
+
+def test_frame_stream_sends_each_write():
+    server_end, client_end = socket.socketpair()
+    with server_end, client_end:
+        writer = open_frame_stream(server_end, STDOUT, isatty=True)
+        writer.write("one\n")
+        writer.write("")
+        writer.write("twö\n")
+        writer.buffer.write(b"bytes\n")
+
+        assert writer.isatty()
+        assert receive_frame(client_end) == (STDOUT, b"one\n")
+        assert receive_frame(client_end) == (STDOUT, "twö\n".encode())
+        assert receive_frame(client_end) == (STDOUT, b"bytes\n")
+
+
+def test_socket_path_defaults(monkeypatch, tmp_path):
+    monkeypatch.delenv("RICHPYLS_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert get_socket_path() == str(tmp_path / "richpyls.sock")
+
+    monkeypatch.setenv("RICHPYLS_SOCKET", str(tmp_path / "custom.sock"))
+    assert get_socket_path() == str(tmp_path / "custom.sock")
+
+
+def test_server_keeps_files_that_are_not_sockets(tmp_path):
+    precious = tmp_path / "precious.txt"
+    precious.write_text("keep me")
+
+    result = _run(["-m", "richpyls", "--serve"], tmp_path, precious)
+
+    assert result.returncode == 1
+    assert "not a socket" in result.stderr
+    assert precious.read_text() == "keep me"
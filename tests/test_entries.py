@@ -0,0 +1,91 @@
+import grp
+import os
+import pwd
+
+from richpyls.entries import (
+    FileEntry,
+    LongFields,
+    get_group_name,
+    get_owner_name,
+    resolve_style_and_icon,
+)
+
+
+def _scan(path):
+    with os.scandir(path) as scan:
+        return {entry.name: FileEntry.from_dir_entry(entry) for entry in scan}
+
+
+def test_from_dir_entry_resolves_style_and_icon(tmp_path):
+    (tmp_path / "script.py").write_text("print()")
+    (tmp_path / "subdir").mkdir()
+    (tmp_path / "dir_link").symlink_to(tmp_path / "subdir")
+    (tmp_path / "broken").symlink_to(tmp_path / "missing")
+
+    entries = _scan(tmp_path)
+
+    assert (entries["script.py"].style, entries["script.py"].icon) == ("green", "🐍")
+    assert entries["subdir"].is_dir
+    # Symlinks to directories are listed as directories, broken ones as links
+    assert entries["dir_link"].is_dir
+    assert entries["broken"].icon == "🔗"
+    assert not entries["broken"].is_dir
+
+
+def test_entry_keeps_lstat_result(tmp_path):
+    target = tmp_path / "target.txt"
+    target.write_text("x" * 100)
+    link = tmp_path / "link.txt"
+    link.symlink_to(target)
+
+    entry = FileEntry.from_path(link)
+    assert entry.lstat.st_ino == link.lstat().st_ino
+    assert entry.path == str(link)
+
+
+def test_long_fields_are_formatted_once(tmp_path):
+    file_path = tmp_path / "data.bin"
+    file_path.write_bytes(b"x" * 2048)
+
+    entry = FileEntry.from_path(file_path)
+    fields = entry.long_fields
+    assert isinstance(fields, LongFields)
+    assert fields.size == "   2.0KB"
+    assert fields.mode.startswith("-")
+    assert entry.long_fields is fields
+
+
+def test_resolve_style_and_icon_without_filesystem():
+    assert resolve_style_and_icon("notes.md", 0o100644, is_dir=False) == (
+        "magenta",
+        "📄",
+    )
+    assert resolve_style_and_icon("run", 0o100755, is_dir=False) == ("bold green", "⚡")
+    assert resolve_style_and_icon(".env", 0o100644, is_dir=False) == ("dim white", "🫣")
+    assert resolve_style_and_icon("src", 0o040755, is_dir=True) == ("bold blue", "📁")
+
+
+def test_owner_and_group_names_are_cached(monkeypatch):
+    calls = []
+
+    def fake_getpwuid(uid):
+        calls.append(uid)
+        return type("u", (), {"pw_name": f"user{uid}"})()
+
+    monkeypatch.setattr(pwd, "getpwuid", fake_getpwuid)
+
+    assert get_owner_name(1000) == "user1000"
+    assert get_owner_name(1000) == "user1000"
+    assert get_owner_name(1001) == "user1001"
+    assert calls == [1000, 1001]
+
+
+def test_unknown_ids_fall_back_to_numbers(monkeypatch):
+    def missing(_id):
+        raise KeyError(_id)
+
+    monkeypatch.setattr(pwd, "getpwuid", missing)
+    monkeypatch.setattr(grp, "getgrgid", missing)
+
+    assert get_owner_name(424242) == "424242"
+    assert get_group_name(434343) == "434343"
@@ -0,0 +1,109 @@
+import os
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from richpyls import parallel
+from richpyls.__main__ import cli, iter_tree_lines
+from richpyls.filters import TreeFilter, compile_patterns
+from richpyls.parallel import TreeReader
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    for directory in ("src/pkg/deep", "node_modules/lib", "build", "docs"):
+        (root / directory).mkdir(parents=True)
+    (root / "src" / "pkg" / "deep" / "core.py").write_text("x")
+    (root / "src" / "pkg" / "module.pyc").write_text("x")
+    (root / "node_modules" / "lib" / "index.js").write_text("x")
+    (root / "build" / "out.o").write_text("x")
+    (root / "docs" / "guide.md").write_text("x")
+    (root / "setup.py").write_text("x")
+    return root
+
+
+def _names(root, tree_filter, **kwargs):
+    return [
+        line.plain.split()[-1]
+        for line in iter_tree_lines(
+            root, show_all=False, long_format=False, tree_filter=tree_filter, **kwargs
+        )
+    ]
+
+
+def test_globs_match_whole_names_and_regexes_anywhere():
+    pattern = compile_patterns(["*.pyc", "re:^node_"])
+
+    assert pattern is not None
+    assert pattern.match("module.pyc")
+    assert not pattern.match("module.pyc.bak")
+    assert pattern.match("node_modules")
+    assert not pattern.match("my_node_modules")
+    assert compile_patterns([]) is None
+
+
+def test_max_depth_limits_levels(tree):
+    names = _names(tree, TreeFilter(max_depth=2))
+
+    assert "pkg" in names
+    assert "deep" not in names
+    assert "lib" in names
+    assert "index.js" not in names
+
+
+def test_exclude_and_prune(tree):
+    tree_filter = TreeFilter(exclude=["*.pyc", "re:^node_"], prune=["build"])
+    names = _names(tree, tree_filter)
+
+    assert "module.pyc" not in names
+    assert "node_modules" not in names
+    assert "lib" not in names
+    # Pruned directories are listed, but not their contents
+    assert "build" in names
+    assert "out.o" not in names
+    assert "core.py" in names
+
+
+def test_filtered_subtrees_are_never_read(tree, monkeypatch):
+    scanned = []
+    real_scandir = os.scandir
+
+    def tracking_scandir(path):
+        scanned.append(Path(path).name)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", tracking_scandir)
+    tree_filter = TreeFilter(exclude=["node_modules"], prune=["build"], max_depth=2)
+    _names(tree, tree_filter)
+
+    assert sorted(scanned) == ["docs", "root", "src"]
+
+
+def test_parallel_reader_applies_the_same_filter(tree, monkeypatch):
+    monkeypatch.setattr(parallel, "SUBTREE_BUDGET", 2)
+    tree_filter = TreeFilter(exclude=["*.md"], prune=["node_modules"], max_depth=3)
+
+    with TreeReader(tree, show_all=False, jobs=2, tree_filter=tree_filter) as reader:
+        parallel_names = _names(tree, tree_filter, reader=reader)
+
+    assert parallel_names == _names(tree, tree_filter)
+
+
+def test_cli_tree_filters(tree):
+    result = CliRunner().invoke(
+        cli, ["-t", "-L", "1", "--exclude", "*.py", "--prune", "docs", str(tree)]
+    )
+
+    assert result.exit_code == 0
+    assert "src" in result.output
+    assert "setup.py" not in result.output
+    assert "pkg" not in result.output
+
+
+def test_cli_rejects_invalid_regex(tree):
+    result = CliRunner().invoke(cli, ["-t", "--exclude", "re:(", str(tree)])
+
+    assert result.exit_code == 2
+    assert "invalid pattern" in result.output
@@ -0,0 +1,144 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from richpyls import parallel
+from richpyls.__main__ import cli
+from richpyls.gitignore import GitIgnore, IgnoreRules, parse_rule
+from richpyls.sizes import build_size_map, iter_file_sizes
+
+
+def _rules(*lines):
+    return IgnoreRules(rule for line in lines if (rule := parse_rule(line)))
+
+
+@pytest.mark.parametrize(
+    ("lines", "path", "is_dir", "expected"),
+    [
+        (["*.log"], "sub/app.log", False, True),
+        (["*.log", "!keep.log"], "keep.log", False, False),
+        (["build/"], "sub/build", True, True),
+        (["build/"], "build", False, None),
+        (["/top"], "sub/top", False, None),
+        (["doc/*.txt"], "doc/a.txt", False, True),
+        (["doc/*.txt"], "doc/sub/a.txt", False, None),
+        (["a/**/b"], "a/x/y/b", False, True),
+        (["**/cache"], "deep/cache", True, True),
+        (["out/**"], "out/file", False, True),
+        (["[Tt]emp"], "Temp", True, True),
+        (["\\#notes", "# comment", ""], "#notes", False, True),
+    ],
+)
+def test_rules_follow_git_semantics(lines, path, is_dir, expected):
+    assert _rules(*lines).match(path, is_dir) is expected
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    (root / ".git" / "info").mkdir(parents=True)
+    (root / ".git" / "info" / "exclude").write_text("secret.txt\n")
+    (root / ".gitignore").write_text("build/\n*.pyc\n")
+    for directory in ("src/pkg", "build/lib", "docs"):
+        (root / directory).mkdir(parents=True)
+    (root / "src" / ".gitignore").write_text("generated/\n!keep.pyc\n")
+    (root / "src" / "generated").mkdir()
+    (root / "src" / "generated" / "big.bin").write_bytes(b"x" * 5000)
+    (root / "src" / "pkg" / "core.py").write_text("x" * 10)
+    (root / "src" / "pkg" / "core.pyc").write_text("x" * 20)
+    (root / "src" / "keep.pyc").write_text("x" * 30)
+    (root / "build" / "lib" / "out.o").write_bytes(b"x" * 9000)
+    (root / "docs" / "secret.txt").write_text("x")
+    (root / "README.md").write_text("x" * 40)
+    return root
+
+
+def test_nested_files_and_parent_rules_apply(repo):
+    gitignore = GitIgnore()
+    src = str(repo / "src")
+
+    assert gitignore.ignores(str(repo), "build", is_dir=True)
+    assert gitignore.ignores(src, "generated", is_dir=True)
+    assert not gitignore.ignores(src, "keep.pyc", is_dir=False)
+    assert gitignore.ignores(str(repo / "src" / "pkg"), "core.pyc", is_dir=False)
+    assert gitignore.ignores(str(repo / "docs"), "secret.txt", is_dir=False)
+    assert gitignore.ignores(str(repo), ".git", is_dir=True)
+    # Starting below the repository root still picks up the root's rules
+    assert GitIgnore().ignores(str(repo / "src" / "pkg"), "x.pyc", is_dir=False)
+
+
+def test_ignored_directories_are_never_read(repo, monkeypatch):
+    scanned = []
+    real_scandir = os.scandir
+
+    def tracking_scandir(path):
+        scanned.append(Path(path).name)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", tracking_scandir)
+    sizes = build_size_map([str(repo)], gitignore=GitIgnore())
+
+    assert "build" not in scanned
+    assert "generated" not in scanned
+    ignore_files = sum(path.stat().st_size for path in repo.rglob(".gitignore"))
+    assert sizes[str(repo)] == 10 + 30 + 40 + ignore_files
+
+
+def test_parallel_sizes_match_serial(repo, monkeypatch):
+    monkeypatch.setattr(parallel, "SUBTREE_BUDGET", 2)
+    roots = [str(repo)]
+
+    assert build_size_map(roots, jobs=2, gitignore=GitIgnore()) == build_size_map(
+        roots, gitignore=GitIgnore()
+    )
+
+
+def test_largest_files_skip_ignored(repo):
+    names = [
+        entry.name
+        for entry, _ in iter_file_sizes(repo, show_all=True, gitignore=GitIgnore())
+    ]
+
+    assert sorted(names) == [
+        ".gitignore",
+        ".gitignore",
+        "README.md",
+        "core.py",
+        "keep.pyc",
+    ]
+
+
+@pytest.mark.parametrize("args", [["-t"], ["-t", "-j", "2"], ["-s", "10"]])
+def test_cli_gitignore(repo, args):
+    runner = CliRunner()
+    plain = runner.invoke(cli, [*args, str(repo)])
+    ignoring = runner.invoke(cli, [*args, "--gitignore", str(repo)])
+
+    assert ignoring.exit_code == 0
+    assert "build" in plain.output
+    assert "build" not in ignoring.output
+    assert "README.md" in ignoring.output
+
+
+def test_tree_matches_git(repo):
+    try:
+        for command in (["init", "-q"], ["ls-files", "--others", "--exclude-standard"]):
+            result = subprocess.run(  # noqa: S603
+                ["git", *command],  # noqa: S607
+                cwd=repo,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("git isn't available")
+    expected = {Path(path).name for path in result.stdout.split()}
+
+    output = CliRunner().invoke(cli, ["-t", "-a", "--gitignore", str(repo)]).output
+    shown = {line.split()[-1] for line in output.splitlines()}
+
+    assert expected <= shown
+    assert not {"out.o", "big.bin", "core.pyc", "secret.txt"} & shown
@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("rich", "rich.table", "asyncio", "sqlite3", "tomllib")
+
+
+def _imported_after(tmp_path, code):
+    """Run code in a fresh interpreter and return which heavy modules it loaded."""
+    script = (
+        "import json, sys\n"
+        f"{code}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run(  # noqa: S603 - runs our own snippet
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=tmp_path,
+    )
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+def _run_cli(*args):
+    return (
+        "from richpyls import cli\n"
+        "try:\n"
+        f"    cli({list(args)!r})\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+
+
+def test_import_does_not_load_the_cli(tmp_path):
+    code = "import richpyls; assert 'richpyls.__main__' not in sys.modules"
+    assert _imported_after(tmp_path, code) == set()
+
+
+@pytest.mark.parametrize("args", [[], ["--format", "ndjson"], ["--version"]])
+def test_scripted_runs_skip_rich(tmp_path, args):
+    (tmp_path / "file.txt").write_text("x")
+    assert _imported_after(tmp_path, _run_cli(*args)) == set()
+
+
+def test_tables_load_rich_table_only_when_needed(tmp_path):
+    (tmp_path / "file.txt").write_text("x")
+    assert "rich.table" in _imported_after(tmp_path, _run_cli("-l"))
+    assert "rich.table" not in _imported_after(tmp_path, _run_cli("-t"))
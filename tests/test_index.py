@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from richpyls.__main__ import iter_tree_lines
+from richpyls.filters import TreeFilter
+from richpyls.index import MetadataIndex
+from richpyls.sizes import build_size_map
+
+
+def _age(*directories):
+    # Push mtimes out of the racy window so listings get stored
+    past = time.time() - 3600
+    for directory in directories:
+        os.utime(directory, (past, past))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "deep").mkdir(parents=True)
+    (root / "b").mkdir()
+    (root / "top.bin").write_bytes(b"x" * 10)
+    (root / "a" / "mid.bin").write_bytes(b"x" * 100)
+    (root / "a" / "deep" / "low.bin").write_bytes(b"x" * 1000)
+    (root / "b" / "other.bin").write_bytes(b"x" * 5)
+    _age(root, root / "a", root / "a" / "deep", root / "b")
+    return root
+
+
+@pytest.fixture
+def index(tmp_path):
+    with MetadataIndex.open(tmp_path / "cache" / "index.sqlite3") as opened:
+        yield opened
+
+
+def _count_scandir(monkeypatch):
+    scanned = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path="."):
+        scanned.append(os.fspath(path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    return scanned
+
+
+def test_size_map_matches_direct_walk(tree, index):
+    root = str(tree)
+    assert index.build_size_map([root]) == build_size_map([root])
+    # Served from the index the second time round
+    assert index.build_size_map([root]) == build_size_map([root])
+
+
+def test_unchanged_directories_are_not_read_again(tree, index, monkeypatch):
+    index.build_size_map([str(tree)])
+
+    scanned = _count_scandir(monkeypatch)
+    sizes = index.build_size_map([str(tree)])
+    _, entries = index.get_listing(str(tree / "a"))
+
+    assert scanned == []
+    assert sizes[str(tree)] == 1115
+    assert [entry.name for entry in entries] == ["deep", "mid.bin"]
+    assert entries[0].is_dir
+    assert entries[1].lstat.st_size == 100
+
+
+def test_ignored_entries_are_left_out_before_they_are_read(tree, index, monkeypatch):
+    def ignore(_directory, name, _is_dir):
+        return name == "mid.bin"
+
+    _, entries = index.get_listing(str(tree / "a"), ignore)
+    assert [entry.name for entry in entries] == ["deep"]
+
+    # The partial listing wasn't stored, so a full one reads the directory
+    scanned = _count_scandir(monkeypatch)
+    _, entries = index.get_listing(str(tree / "a"))
+    assert scanned == [str(tree / "a")]
+    assert [entry.name for entry in entries] == ["deep", "mid.bin"]
+
+    # A stored listing is filtered without reading the directory again
+    _, entries = index.get_listing(str(tree / "a"), ignore)
+    assert scanned == [str(tree / "a")]
+    assert [entry.name for entry in entries] == ["deep"]
+
+
+def test_changed_directory_is_rescanned(tree, index, monkeypatch):
+    index.build_size_map([str(tree)])
+
+    (tree / "a" / "deep" / "new.bin").write_bytes(b"x" * 4000)
+    scanned = _count_scandir(monkeypatch)
+    sizes = index.build_size_map([str(tree)])
+
+    assert scanned == [str(tree / "a" / "deep")]
+    assert sizes[str(tree / "a")] == 5100
+    assert sizes[str(tree)] == 5115
+
+
+def test_removed_subdirectories_are_dropped(tree, tmp_path):
+    path = tmp_path / "index.sqlite3"
+    with MetadataIndex.open(path) as index:
+        index.build_size_map([str(tree)])
+
+        (tree / "a" / "deep" / "low.bin").unlink()
+        (tree / "a" / "deep").rmdir()
+        _age(tree / "a")
+        assert index.build_size_map([str(tree)])[str(tree)] == 115
+
+    connection = sqlite3.connect(path)
+    paths = {row[0] for row in connection.execute("SELECT path FROM directories")}
+    connection.close()
+    assert str(tree / "a") in paths
+    assert str(tree / "a" / "deep") not in paths
+
+
+def test_recent_directories_are_not_stored(tmp_path, index, monkeypatch):
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+    (fresh / "file.bin").write_bytes(b"x")
+
+    index.build_size_map([str(fresh)])
+    scanned = _count_scandir(monkeypatch)
+    index.build_size_map([str(fresh)])
+
+    assert scanned == [str(fresh)]
+
+
+def test_incompatible_index_is_discarded(tmp_path):
+    path = tmp_path / "index.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE directories (path TEXT)")
+    connection.execute("PRAGMA user_version = 999")
+    connection.commit()
+    connection.close()
+
+    with MetadataIndex.open(path) as index:
+        assert index.build_size_map([str(tmp_path / "missing")]) == {}
+
+
+def test_hard_links_are_counted_once(tmp_path, index):
+    root = tmp_path / "linked"
+    for name in ("a", "b"):
+        (root / name).mkdir(parents=True)
+    (root / "a" / "data.bin").write_bytes(b"x" * 100)
+    (root / "b" / "data.bin").hardlink_to(root / "a" / "data.bin")
+    _age(root, root / "a", root / "b")
+
+    for _ in range(2):
+        # Once from disk, once from the index
+        assert index.build_size_map([str(root)])[str(root)] == 100
+        allocated = index.build_size_map([str(root)], allocated=True)
+        assert allocated[str(root)] == (root / "a" / "data.bin").stat().st_blocks * 512
+
+
+def _long_tree(root, **kwargs):
+    lines = iter_tree_lines(root, show_all=False, long_format=True, **kwargs)
+    return [line.plain for line in lines]
+
+
+@pytest.mark.parametrize("max_depth", [None, 1])
+def test_tree_shows_current_subdirectory_metadata(tree, index, max_depth):
+    tree_filter = None if max_depth is None else TreeFilter(max_depth=max_depth)
+    _long_tree(tree, index=index, tree_filter=tree_filter)
+
+    # Changes the subdirectory's mtime and link count, but not its parent's
+    (tree / "b" / "new.bin").write_bytes(b"x")
+    (tree / "b" / "nested").mkdir()
+
+    assert _long_tree(tree, index=index, tree_filter=tree_filter) == _long_tree(
+        tree, tree_filter=tree_filter
+    )
@@ -0,0 +1,74 @@
+import os
+import time
+
+from richpyls.entries import FileEntry
+from richpyls.metadata import gather_entries
+
+
+class SlowEntry:
+    """Stand-in for os.DirEntry whose stat() takes a while, like on NFS."""
+
+    def __init__(self, entry, delay, error=None):
+        self._entry = entry
+        self._delay = delay
+        self._error = error
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, **kwargs):
+        """Delegate to the wrapped entry."""
+        return self._entry.is_dir(**kwargs)
+
+    def stat(self, **kwargs):
+        """Wait, then stat or fail."""
+        time.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+        return self._entry.stat(**kwargs)
+
+
+def _scan(path):
+    with os.scandir(path) as scan:
+        return sorted(scan, key=lambda entry: entry.name)
+
+
+def test_results_keep_the_order_of_the_entries(tmp_path):
+    for number in range(8):
+        (tmp_path / f"file{number}").write_text("x" * number)
+    # Later entries finish first
+    entries = [
+        SlowEntry(entry, 0.01 * (8 - number))
+        for number, entry in enumerate(_scan(tmp_path))
+    ]
+
+    results = gather_entries(entries, concurrency=8)
+
+    assert all(isinstance(result, FileEntry) for result in results)
+    assert [result.name for result in results] == [f"file{n}" for n in range(8)]
+    assert [result.lstat.st_size for result in results] == list(range(8))
+
+
+def test_errors_are_returned_in_place(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / name).write_text(name)
+    error = PermissionError(13, "Permission denied")
+    a, b, c = _scan(tmp_path)
+
+    results = gather_entries(
+        [SlowEntry(a, 0), SlowEntry(b, 0, error), SlowEntry(c, 0)], concurrency=2
+    )
+
+    assert results[1] is error
+    assert [results[0].name, results[2].name] == ["a", "c"]
+
+
+def test_stat_calls_overlap(tmp_path):
+    for number in range(20):
+        (tmp_path / f"file{number}").write_text("x")
+    entries = [SlowEntry(entry, 0.05) for entry in _scan(tmp_path)]
+
+    started = time.perf_counter()
+    gather_entries(entries, concurrency=20)
+
+    # One at a time this would take a second
+    assert time.perf_counter() - started < 0.5
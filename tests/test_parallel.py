@@ -0,0 +1,101 @@
+import pytest
+from click.testing import CliRunner
+
+from richpyls import parallel
+from richpyls.__main__ import cli, iter_tree_lines
+from richpyls.parallel import (
+    TreeReader,
+    read_tree_subtree,
+    walk_sizes_parallel,
+)
+from richpyls.sizes import build_size_map, walk_sizes
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A few levels of mixed-case names, hidden entries and a directory link."""
+    root = tmp_path / "root"
+    for top in ("Alpha", "beta", ".hidden", "gamma"):
+        for sub in ("one", "Two", "three"):
+            directory = root / top / sub
+            directory.mkdir(parents=True)
+            for number in range(3):
+                (directory / f"file{number}.py").write_text("x" * number)
+        (root / top / "README.md").write_text("readme")
+    (root / "top.txt").write_text("top")
+    (root / "link").symlink_to(root / "beta")
+    return root
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    """Split subtrees after a couple of entries, to exercise the hand-back."""
+    monkeypatch.setattr(parallel, "SUBTREE_BUDGET", 2)
+
+
+def _plain_lines(root, show_all, **kwargs):
+    return [
+        line.plain
+        for line in iter_tree_lines(root, show_all=show_all, long_format=True, **kwargs)
+    ]
+
+
+@pytest.mark.usefixtures("small_budget")
+@pytest.mark.parametrize("show_all", [False, True])
+def test_parallel_tree_matches_serial_order(tree, show_all):
+    with TreeReader(tree, show_all, jobs=3) as reader:
+        parallel_lines = _plain_lines(tree, show_all, reader=reader)
+
+    assert parallel_lines == _plain_lines(tree, show_all)
+    assert any("link" in line for line in parallel_lines)
+
+
+def test_subtree_task_hands_back_unread_directories_in_order(tree):
+    levels, pending = read_tree_subtree((str(tree), 1), show_all=False, budget=1)
+
+    assert [directory for directory, _ in levels] == [str(tree)]
+    assert pending == [
+        (str(tree / name), 2) for name in ("Alpha", "beta", "gamma", "link")
+    ]
+
+
+@pytest.mark.usefixtures("small_budget")
+def test_parallel_sizes_match_serial(tree, tmp_path):
+    other = tmp_path / "other"
+    (other / "nested").mkdir(parents=True)
+    (other / "nested" / "data.bin").write_bytes(b"x" * 100)
+    roots = [str(tree), str(other)]
+
+    expected = {}
+    for root in roots:
+        expected.update(walk_sizes(root))
+
+    assert walk_sizes_parallel(roots, jobs=3) == expected
+    assert build_size_map(roots, jobs=2) == expected
+
+
+@pytest.mark.parametrize("args", [["-t"], ["-ta", "--dir-sizes"], ["-tl"]])
+def test_cli_jobs_gives_the_same_tree(tree, args):
+    runner = CliRunner()
+    serial = runner.invoke(cli, [*args, str(tree)])
+    parallel_run = runner.invoke(cli, [*args, "-j", "3", str(tree)])
+
+    assert parallel_run.exit_code == serial.exit_code == 0
+    assert parallel_run.output == serial.output
+
+
+@pytest.mark.usefixtures("small_budget")
+def test_parallel_sizes_credit_hard_links_by_path(tmp_path):
+    original = tmp_path / "original.bin"
+    original.write_bytes(b"x" * 1000)
+    names = [f"d{number:02}" for number in range(12)]
+    for name in reversed(names):
+        (tmp_path / "tree" / name).mkdir(parents=True)
+        (tmp_path / "tree" / name / "linked.bin").hardlink_to(original)
+    root = tmp_path / "tree"
+
+    runs = [walk_sizes_parallel([str(root)], jobs=4) for _ in range(5)]
+
+    assert all(sizes == runs[0] for sizes in runs)
+    assert runs[0][str(root / names[0])] == 1000
+    assert runs[0][str(root)] == 1000
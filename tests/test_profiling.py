@@ -0,0 +1,108 @@
+import json
+import types
+
+import pytest
+
+from richpyls import profiling
+from richpyls.profiling import PHASES, Profiler, format_summary
+
+
+class FakeClock:
+    """Stands in for the time module; time only passes when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        """Return the current fake time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Let ``seconds`` pass at once."""
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(profiling, "time", fake)
+    return fake
+
+
+def test_nested_phases_are_charged_exclusive_time(clock):
+    module = types.SimpleNamespace()
+
+    def inner():
+        clock.sleep(0.02)
+
+    def outer():
+        clock.sleep(0.01)
+        module.inner()
+
+    module.inner = inner
+
+    module.outer = outer
+    profiler = Profiler()
+    profiler.instrument(module, "inner", "stat")
+    profiler.instrument(module, "outer", "scan")
+
+    module.outer()
+    module.outer()
+
+    assert profiler.calls["scan"] == 2
+    assert profiler.calls["stat"] == 2
+    assert profiler.seconds["scan"] == pytest.approx(0.02)
+    assert profiler.seconds["stat"] == pytest.approx(0.04)
+
+
+def test_iterators_are_charged_per_item(clock):
+    module = types.SimpleNamespace()
+
+    def produce():
+        for number in range(3):
+            clock.sleep(0.01)
+            yield number
+
+    module.produce = produce
+    profiler = Profiler()
+    profiler.instrument(module, "produce", "scan", iterator=True)
+
+    consumed = []
+    for number in module.produce():
+        clock.sleep(0.01)
+        consumed.append(number)
+
+    assert consumed == [0, 1, 2]
+    assert profiler.calls["scan"] == 3
+    assert profiler.seconds["scan"] == pytest.approx(0.03)
+
+
+def test_restore_puts_originals_back():
+    class Record:
+        @classmethod
+        def build(cls):
+            return cls()
+
+    instance = types.SimpleNamespace(print=print)
+    original_print = instance.print
+    profiler = Profiler()
+    profiler.instrument(Record, "build", "stat")
+    profiler.instrument(instance, "print", "render")
+
+    assert isinstance(Record.build(), Record)
+    assert profiler.calls["stat"] == 1
+
+    profiler.restore()
+    assert isinstance(vars(Record)["build"], classmethod)
+    assert instance.print is original_print
+
+
+def test_format_summary_text_and_json():
+    summary = Profiler().summary()
+
+    lines = format_summary(summary, "text").splitlines()
+    assert [line.split()[0] for line in lines[1:-1]] == [
+        *(phase.split()[0] for phase in PHASES),
+        "other",
+    ]
+    assert json.loads(format_summary(summary, "json")) == summary
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from richpyls.entries import FileEntry
+from richpyls.records import FIELDS, RecordWriter, get_record
+
+
+@pytest.fixture
+def entry(tmp_path):
+    file_path = tmp_path / "report, final.txt"
+    file_path.write_bytes(b"x" * 2048)
+    os.utime(file_path, (1_700_000_000, 1_700_000_000))
+    return FileEntry.from_path(file_path)
+
+
+def test_record_uses_raw_size_and_iso_time(entry):
+    record = dict(zip(FIELDS, get_record(entry), strict=True))
+
+    assert record["name"] == "report, final.txt"
+    assert record["mode"] == entry.long_fields.mode
+    assert record["size"] == 2048
+    assert datetime.fromisoformat(record["mtime"]).timestamp() == 1_700_000_000
+
+
+def test_ndjson_writes_one_object_per_line(entry):
+    stream = io.StringIO()
+    writer = RecordWriter("ndjson", stream)
+    writer.write(entry)
+    writer.write(entry)
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["path"] == entry.path
+
+
+@pytest.mark.parametrize(("output_format", "delimiter"), [("csv", ","), ("tsv", "\t")])
+def test_delimited_formats_write_a_header_once(entry, output_format, delimiter):
+    stream = io.StringIO()
+    writer = RecordWriter(output_format, stream)
+    writer.write(entry)
+    writer.write(entry)
+
+    rows = list(csv.reader(io.StringIO(stream.getvalue()), delimiter=delimiter))
+    assert rows[0] == list(FIELDS)
+    assert len(rows) == 3
+    assert rows[1][0] == "report, final.txt"
+    assert rows[1][6] == "2048"
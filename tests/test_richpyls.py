@@ -1,11 +1,15 @@
 import grp
+import json
+import os
 import pwd
 import stat
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
 import pytest
 from click.testing import CliRunner
+from rich.console import Console
 
 from richpyls import cli
 
@@ -67,6 +71,43 @@ class DummyStat:
         self.st_mtime = mtime
 
 
+class FailingEntry:
+    """Stand-in for os.DirEntry whose stat() calls fail with a given error."""
+
+    def __init__(self, entry, error):
+        self._entry = entry
+        self._error = error
+
+    def __getattr__(self, name):
+        """Delegate everything but stat() to the wrapped entry."""
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        """Return the wrapped entry's path."""
+        return self._entry.path
+
+    def stat(self, **_kwargs):
+        """Fail like a file that vanished or became unreadable."""
+        raise self._error
+
+
+def scandir_with_failures(failures):
+    """Build an os.scandir replacement that fails stat() for the named entries."""
+    real_scandir = os.scandir
+
+    @contextmanager
+    def fake_scandir(path="."):
+        with real_scandir(path) as scan:
+            yield [
+                FailingEntry(entry, failures[entry.name])
+                if entry.name in failures
+                else entry
+                for entry in scan
+            ]
+
+    return fake_scandir
+
+
 @pytest.fixture(autouse=True)
 def fixed_metadata(monkeypatch):
     # Use fixed metadata for long listing
@@ -127,16 +168,16 @@ def test_long_directory(tmp_path, monkeypatch):
 
 
 def test_directory_access_error(tmp_path, monkeypatch):
-    """Test error handling when directory cannot be accessed during iterdir()"""
+    """Test error handling when directory cannot be accessed during scandir()"""
     monkeypatch.chdir(tmp_path)
     test_dir = tmp_path / "test_dir"
     test_dir.mkdir()
 
-    # Mock iterdir to raise OSError
-    def mock_iterdir(self):
+    # Mock scandir to raise OSError
+    def mock_scandir(path="."):
         raise OSError(13, "Permission denied")
 
-    monkeypatch.setattr(Path, "iterdir", mock_iterdir)
+    monkeypatch.setattr(os, "scandir", mock_scandir)
 
     runner = CliRunner()
     result = runner.invoke(cli, ["test_dir"])
@@ -153,14 +194,9 @@ def test_file_stat_error_in_long_format(tmp_path, monkeypatch):
     (test_dir / "file1.txt").write_text("content1")
     (test_dir / "file2.txt").write_text("content2")
 
-    # Mock lstat to fail for specific files
-    def mock_lstat(self):
-        if "file1.txt" in str(self):
-            raise OSError(2, "No such file or directory")
-        # Return dummy stat for other files
-        return DummyStat(mode=0, nlink=1, uid=1000, gid=1000, size=8, mtime=0)
-
-    monkeypatch.setattr(Path, "lstat", mock_lstat)
+    # Make stat fail for specific files
+    failures = {"file1.txt": OSError(2, "No such file or directory")}
+    monkeypatch.setattr(os, "scandir", scandir_with_failures(failures))
 
     runner = CliRunner()
     result = runner.invoke(cli, ["-l", "test_dir"])
@@ -191,6 +227,24 @@ def test_single_file_stat_error_in_long_format(tmp_path, monkeypatch):
     assert "Permission denied" in result.output
 
 
+def test_long_listing_with_orphaned_owner(tmp_path, monkeypatch):
+    """Test long listing falls back to numeric ids for unknown owners"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "orphan.txt").write_text("content")
+
+    def missing_user(uid):
+        raise KeyError(uid)
+
+    monkeypatch.setattr(pwd, "getpwuid", missing_user)
+    uid = (tmp_path / "orphan.txt").lstat().st_uid
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-l"])
+    assert result.exit_code == 0
+    assert str(uid) in result.output
+    assert "📁 Directory Listing" in result.output
+
+
 def test_directory_with_inaccessible_files(tmp_path, monkeypatch):
     """Test directory listing with some inaccessible files in long format"""
     monkeypatch.chdir(tmp_path)
@@ -199,13 +253,9 @@ def test_directory_with_inaccessible_files(tmp_path, monkeypatch):
     (test_dir / "accessible.txt").write_text("content")
     (test_dir / "inaccessible.txt").write_text("content")
 
-    # Mock lstat to fail only for inaccessible.txt
-    def selective_mock_lstat(self):
-        if "inaccessible.txt" in str(self):
-            raise OSError(13, "Permission denied")
-        return DummyStat(mode=0, nlink=1, uid=1000, gid=1000, size=7, mtime=0)
-
-    monkeypatch.setattr(Path, "lstat", selective_mock_lstat)
+    # Make stat fail only for inaccessible.txt
+    failures = {"inaccessible.txt": OSError(13, "Permission denied")}
+    monkeypatch.setattr(os, "scandir", scandir_with_failures(failures))
 
     runner = CliRunner()
     result = runner.invoke(cli, ["-l", "mixed_dir"])
@@ -462,6 +512,7 @@ def test_file_extension_variations(tmp_path, monkeypatch):
 def test_format_file_info_function(tmp_path, monkeypatch):
     """Test the format_file_info function directly for better coverage."""
     from richpyls.__main__ import format_file_info
+    from richpyls.entries import FileEntry
 
     monkeypatch.chdir(tmp_path)
 
@@ -469,11 +520,11 @@ def test_format_file_info_function(tmp_path, monkeypatch):
     test_file = tmp_path / "test.txt"
     test_file.write_text("test content")
 
-    # Get file stat
-    file_stat = test_file.stat()
+    # Build the entry record
+    entry = FileEntry.from_path(test_file)
 
     # Test format_file_info function
-    result = format_file_info(file_stat, "test.txt")
+    result = format_file_info(entry)
 
     # Check that it returns a Rich Text object
     from rich.text import Text
@@ -647,6 +698,7 @@ def test_tree_format_single_file(tmp_path, monkeypatch):
 def test_format_file_info_with_different_users(tmp_path, monkeypatch):
     """Test format_file_info with different user/group scenarios."""
     from richpyls.__main__ import format_file_info
+    from richpyls.entries import FileEntry
 
     monkeypatch.chdir(tmp_path)
 
@@ -654,11 +706,11 @@ def test_format_file_info_with_different_users(tmp_path, monkeypatch):
     test_file = tmp_path / "test_ownership.txt"
     test_file.write_text("test")
 
-    # Get the file stat
-    file_stat = test_file.stat()
+    # Build the entry record
+    entry = FileEntry.from_path(test_file)
 
     # Test the function
-    result = format_file_info(file_stat, "test_ownership.txt")
+    result = format_file_info(entry)
 
     # Verify it's a Rich Text object and contains filename
     from rich.text import Text
@@ -676,33 +728,37 @@ def test_specific_coverage_functions(tmp_path, monkeypatch):
     """Test specific functions that need coverage improvement."""
     from rich.text import Text
 
-    from richpyls.__main__ import format_file_info, get_file_style_and_icon
+    from richpyls.__main__ import format_file_info
+    from richpyls.entries import FileEntry
+    from richpyls.styles import resolve_style_and_icon
 
     monkeypatch.chdir(tmp_path)
 
-    # Test get_file_style_and_icon with different file types
+    # Test resolve_style_and_icon with different file types
     test_file = tmp_path / "test.py"
     test_file.write_text("print('hello')")
 
-    style, icon = get_file_style_and_icon(test_file)
+    style, icon = resolve_style_and_icon(
+        test_file.name, test_file.lstat().st_mode, is_dir=False
+    )
     assert icon == "🐍"  # Python file icon
     assert isinstance(style, str)
 
     # Test format_file_info function
-    file_stat = test_file.stat()
-    result = format_file_info(file_stat, "test.py")
+    result = format_file_info(FileEntry.from_path(test_file))
     assert isinstance(result, Text)
 
     # Test with directory
     test_dir = tmp_path / "test_dir"
     test_dir.mkdir()
 
-    dir_style, dir_icon = get_file_style_and_icon(test_dir)
+    dir_style, dir_icon = resolve_style_and_icon(
+        test_dir.name, test_dir.lstat().st_mode, is_dir=True
+    )
     assert dir_icon == "📁"
 
     # Test format_file_info with directory
-    dir_stat = test_dir.stat()
-    dir_result = format_file_info(dir_stat, "test_dir")
+    dir_result = format_file_info(FileEntry.from_path(test_dir))
     assert isinstance(dir_result, Text)
 
 
@@ -750,6 +806,7 @@ def test_format_file_info_permission_styling(tmp_path, monkeypatch):
     from rich.text import Text
 
     from richpyls.__main__ import format_file_info
+    from richpyls.entries import FileEntry
 
     monkeypatch.chdir(tmp_path)
 
@@ -758,8 +815,7 @@ def test_format_file_info_permission_styling(tmp_path, monkeypatch):
     regular_file.write_text("content")
 
     # Test format_file_info with regular file
-    stat_result = regular_file.stat()
-    result = format_file_info(stat_result, "regular.txt")
+    result = format_file_info(FileEntry.from_path(regular_file))
     assert isinstance(result, Text)
     result_str = str(result)
     assert "regular.txt" in result_str
@@ -770,8 +826,7 @@ def test_format_file_info_permission_styling(tmp_path, monkeypatch):
         executable_file.write_text("#!/bin/bash\necho hello")
         executable_file.chmod(0o755)
 
-        exec_stat = executable_file.stat()
-        exec_result = format_file_info(exec_stat, "executable.sh")
+        exec_result = format_file_info(FileEntry.from_path(executable_file))
         assert isinstance(exec_result, Text)
 
     except (OSError, PermissionError):
@@ -782,8 +837,7 @@ def test_format_file_info_permission_styling(tmp_path, monkeypatch):
     test_dir = tmp_path / "testdir"
     test_dir.mkdir()
 
-    dir_stat = test_dir.stat()
-    dir_result = format_file_info(dir_stat, "testdir")
+    dir_result = format_file_info(FileEntry.from_path(test_dir))
     assert isinstance(dir_result, Text)
 
     # Create symlink if supported
@@ -791,10 +845,10 @@ def test_format_file_info_permission_styling(tmp_path, monkeypatch):
         symlink_file = tmp_path / "symlink.txt"
         symlink_file.symlink_to(regular_file)
 
-        # Use lstat to get symlink info
-        symlink_stat = symlink_file.lstat()
-        symlink_result = format_file_info(symlink_stat, "symlink.txt")
+        # The entry record keeps the symlink's own lstat info
+        symlink_result = format_file_info(FileEntry.from_path(symlink_file))
         assert isinstance(symlink_result, Text)
+        assert "🔗 symlink.txt" in str(symlink_result)
 
     except (OSError, NotImplementedError):
         # Symlinks may not be supported
@@ -1019,3 +1073,364 @@ def test_sort_by_size_error_handling(tmp_path, monkeypatch):
     result = runner.invoke(cli, ["-s", "5"])
     assert result.exit_code == 0
     assert "accessible.txt" in result.output
+
+
+def test_sort_by_size_with_jobs(tmp_path, monkeypatch):
+    """Test that parallel directory sizing gives the same table as serial."""
+    monkeypatch.chdir(tmp_path)
+
+    for i in range(5):
+        subdir = tmp_path / f"dir_{i}"
+        subdir.mkdir()
+        (subdir / "content.txt").write_text("x" * (i * 100))
+    (tmp_path / "file.txt").write_text("x" * 250)
+
+    runner = CliRunner()
+    serial = runner.invoke(cli, ["-s", "6"])
+    parallel = runner.invoke(cli, ["-s", "6", "--jobs", "4"])
+    assert serial.exit_code == 0
+    assert parallel.exit_code == 0
+    assert parallel.output == serial.output
+
+    result = runner.invoke(cli, ["-s", "3", "-j", "0"])
+    assert result.exit_code != 0
+
+
+def test_tree_format_with_dir_sizes(tmp_path, monkeypatch):
+    """Test tree view shows cumulative directory sizes with --dir-sizes."""
+    monkeypatch.chdir(tmp_path)
+    nested = tmp_path / "outer" / "inner"
+    nested.mkdir(parents=True)
+    (tmp_path / "outer" / "a.bin").write_bytes(b"x" * 1024)
+    (nested / "b.bin").write_bytes(b"x" * 1024)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-t", "--dir-sizes"])
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert any("outer (2.0KB)" in line for line in lines)
+    assert any("inner (1.0KB)" in line for line in lines)
+
+    result = runner.invoke(cli, ["-t"])
+    assert "(2.0KB)" not in result.output
+
+
+def test_tree_format_deeper_than_recursion_limit(tmp_path, monkeypatch):
+    """Test tree view walks trees deeper than the interpreter recursion limit."""
+    import sys
+
+    from richpyls.__main__ import iter_tree_lines
+
+    monkeypatch.chdir(tmp_path)
+    depth = 400
+    deep = Path("n/" * depth)
+    deep.mkdir(parents=True)
+    (deep / "bottom.txt").write_text("x")
+
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(depth)
+    try:
+        lines = list(iter_tree_lines(".", show_all=False, long_format=False))
+    finally:
+        sys.setrecursionlimit(old_limit)
+
+    assert len(lines) == depth + 1
+    assert lines[-1].plain.endswith("└── 📄 bottom.txt")
+
+
+def test_iter_tree_lines_reads_directories_lazily(tmp_path, monkeypatch):
+    """Test tree lines are produced before later directories are read."""
+    import richpyls.__main__ as main
+
+    monkeypatch.chdir(tmp_path)
+    for name in ("a_dir", "b_dir"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "file.txt").write_text("x")
+
+    read = []
+    real_read_tree_level = main.read_tree_level
+
+    def tracking_read_tree_level(path, show_all, index=None, tree_filter=None):
+        read.append(os.fspath(path))
+        return real_read_tree_level(path, show_all, index, tree_filter)
+
+    monkeypatch.setattr(main, "read_tree_level", tracking_read_tree_level)
+
+    lines = main.iter_tree_lines(".", show_all=False, long_format=False)
+    first = next(lines)
+    assert "a_dir" in first.plain
+    assert read == ["."]
+
+    rest = [line.plain for line in lines]
+    assert read == [".", "./a_dir", "./b_dir"]
+    assert rest[-1].endswith("📄 file.txt")
+
+
+def test_sort_by_size_recursive(tmp_path, monkeypatch):
+    """Test -s N -R ranks individual files across the whole tree."""
+    monkeypatch.chdir(tmp_path)
+    nested = tmp_path / "a" / "b"
+    nested.mkdir(parents=True)
+    (tmp_path / "top.txt").write_text("x" * 10)
+    (tmp_path / "a" / "mid.txt").write_text("x" * 300)
+    (nested / "deep.txt").write_text("x" * 500)
+    (tmp_path / ".cache").mkdir()
+    (tmp_path / ".cache" / "huge.bin").write_text("x" * 5000)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["-s", "2", "-R"])
+    assert result.exit_code == 0
+    output = result.output
+    assert "📊 Top 2 Largest Files" in output
+    assert "a/b/deep.txt" in output
+    assert "a/mid.txt" in output
+    assert "top.txt" not in output
+    assert "huge.bin" not in output
+    assert output.index("deep.txt") < output.index("mid.txt")
+
+    # Hidden directories are only searched with -a
+    result = runner.invoke(cli, ["-s", "1", "-R", "-a"])
+    assert result.exit_code == 0
+    assert ".cache/huge.bin" in result.output
+
+
+@pytest.mark.parametrize("extra_args", [[], ["-R"], ["-j", "2"]])
+def test_disk_usage_ranks_sparse_files_by_allocated_space(
+    tmp_path, monkeypatch, extra_args
+):
+    """Test --disk-usage ranks by st_blocks rather than st_size."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "images").mkdir()
+    with (tmp_path / "images" / "vm.img").open("wb") as image:
+        image.truncate(1 << 30)
+    (tmp_path / "data.bin").write_bytes(os.urandom(200_000))
+
+    runner = CliRunner()
+    apparent = runner.invoke(cli, ["-s", "1", *extra_args])
+    allocated = runner.invoke(cli, ["-s", "1", "--disk-usage", *extra_args])
+
+    assert apparent.exit_code == allocated.exit_code == 0
+    assert "data.bin" not in apparent.output
+    assert "data.bin" in allocated.output
+    assert "by Disk Usage" in allocated.output
+
+
+def test_disk_usage_tree_sizes(tmp_path):
+    """Test -t --disk-usage shows allocated sizes, also from worker processes."""
+    (tmp_path / "sub").mkdir()
+    with (tmp_path / "sub" / "sparse.img").open("wb") as image:
+        image.truncate(1 << 30)
+
+    runner = CliRunner()
+    apparent = runner.invoke(cli, ["-tl", "--dir-sizes", str(tmp_path)])
+    allocated = runner.invoke(
+        cli, ["-tl", "--dir-sizes", "--disk-usage", str(tmp_path)]
+    )
+    parallel = runner.invoke(
+        cli, ["-tl", "--dir-sizes", "--disk-usage", "-j", "2", str(tmp_path)]
+    )
+
+    assert "1.0GB" in apparent.output
+    assert "GB" not in allocated.output
+    assert parallel.output == allocated.output
+
+
+def test_index_gives_same_listings(tmp_path, monkeypatch):
+    """Test --index output matches a direct walk for -s and -t."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    work = tmp_path / "work"
+    (work / "sub").mkdir(parents=True)
+    (work / "sub" / "data.txt").write_text("x" * 700)
+    (work / "small.txt").write_text("x" * 10)
+    monkeypatch.chdir(work)
+
+    runner = CliRunner()
+    for args in (["-s", "5"], ["-t", "--dir-sizes"], ["-tl"]):
+        expected = runner.invoke(cli, args)
+        first = runner.invoke(cli, [*args, "--index"])
+        second = runner.invoke(cli, [*args, "--index"])
+        assert expected.exit_code == 0
+        assert first.output == expected.output
+        assert second.output == expected.output
+
+    assert (tmp_path / "cache" / "richpyls" / "index.sqlite3").exists()
+
+
+def test_invalid_config_file_warns_and_lists(tmp_path, monkeypatch):
+    """Test a broken config file is reported without stopping the listing."""
+    (tmp_path / "richpyls").mkdir()
+    (tmp_path / "richpyls" / "config.toml").write_text("not toml [", encoding="utf-8")
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    (tmp_path / "a.txt").write_text("a")
+    monkeypatch.chdir(tmp_path)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, [])
+
+    assert result.exit_code == 0
+    assert "📄 a.txt" in result.output
+
+
+def test_profile_reports_phases_on_stderr(tmp_path, monkeypatch):
+    """Test --profile keeps stdout intact and restores the instrumented code."""
+    import richpyls.__main__
+
+    (tmp_path / "a.py").write_text("a")
+    (tmp_path / "sub").mkdir()
+    monkeypatch.chdir(tmp_path)
+    original_print = richpyls.__main__.get_console().print
+
+    runner = CliRunner()
+    expected = runner.invoke(cli, ["-l"])
+    result = runner.invoke(cli, ["-l", "--profile", "--profile-format", "json"])
+
+    assert result.exit_code == 0
+    assert result.stdout == expected.stdout
+    profile = json.loads(result.stderr)
+    assert profile["phases"]["scan"]["calls"] == 1
+    assert profile["phases"]["stat"]["calls"] == 2
+    assert profile["phases"]["name resolution"]["calls"] == 4
+    assert richpyls.__main__.get_console().print == original_print
+    assert "render" in runner.invoke(cli, ["--profile"]).stderr
+
+
+def test_format_streams_records_without_rich(tmp_path, monkeypatch):
+    """Test --format writes plain records for directories and files."""
+    import richpyls.__main__
+
+    (tmp_path / "b.txt").write_text("bb")
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / ".hidden").write_text("h")
+    monkeypatch.chdir(tmp_path)
+
+    def no_rich(*_args, **_kwargs):
+        pytest.fail("--format must not render through Rich")
+
+    monkeypatch.setattr(richpyls.__main__, "get_console", no_rich)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--format", "ndjson", ".", "b.txt"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [record["name"] for record in records] == ["a.txt", "b.txt", "b.txt"]
+    assert records[1]["size"] == 2
+
+    result = runner.invoke(cli, ["--format", "csv", "-a"])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[0].startswith("name,path,mode")
+    assert len(result.output.splitlines()) == 4
+
+
+def test_format_rejects_tree_and_size_modes():
+    """Test --format only applies to plain listings."""
+    runner = CliRunner()
+    for args in (["-t"], ["-s", "3"]):
+        result = runner.invoke(cli, ["--format", "csv", *args])
+        assert result.exit_code == 2
+        assert "--format" in result.output
+
+
+def test_redirected_listing_skips_rich_text(tmp_path, monkeypatch):
+    """Test short listings bypass Text objects when stdout isn't a terminal."""
+    import richpyls.__main__
+
+    long_name = "n" * 120 + ".py"
+    (tmp_path / long_name).write_text("x")
+    (tmp_path / "a.txt").write_text("a")
+    monkeypatch.chdir(tmp_path)
+
+    def no_text(*_args, **_kwargs):
+        pytest.fail("redirected listings must not build Text objects")
+
+    runner = CliRunner()
+    with monkeypatch.context() as patch:
+        patch.setattr(richpyls.__main__, "format_filename_with_style", no_text)
+        result = runner.invoke(cli, [".", "a.txt"])
+    assert result.exit_code == 0
+    # Names are never wrapped at the console width
+    assert result.output.splitlines() == [
+        ".:",
+        "📄 a.txt",
+        f"🐍 {long_name}",
+        "",
+        "a.txt:",
+        "📄 a.txt",
+        "",
+    ]
+
+    # Terminals keep the styled path
+    monkeypatch.setattr(richpyls.__main__, "is_plain_output", lambda: False)
+    result = runner.invoke(cli, ["a.txt"])
+    assert result.output.splitlines() == ["📄 a.txt"]
+
+
+def test_long_listing_of_huge_directory_is_paged(tmp_path, monkeypatch):
+    """Test -l streams big directories as fixed-width pages of one table."""
+    import richpyls.__main__
+
+    for number in range(5):
+        (tmp_path / f"file{number}.txt").write_text("x" * number)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(richpyls.__main__, "LONG_LISTING_PAGING_THRESHOLD", 4)
+    monkeypatch.setattr(richpyls.__main__, "LONG_LISTING_PAGE_SIZE", 2)
+    wide_console = Console(width=120)
+    monkeypatch.setattr(richpyls.__main__, "get_console", lambda: wide_console)
+
+    pages = []
+    create_page = richpyls.__main__.create_long_listing_page
+
+    def recording_create_page(entries, owner_width, group_width, first_page):
+        pages.append(([entry.name for entry in entries], first_page))
+        return create_page(entries, owner_width, group_width, first_page)
+
+    monkeypatch.setattr(
+        richpyls.__main__, "create_long_listing_page", recording_create_page
+    )
+
+    result = CliRunner().invoke(cli, ["-l"])
+
+    assert result.exit_code == 0
+    assert pages == [
+        (["file0.txt", "file1.txt"], True),
+        (["file2.txt", "file3.txt"], False),
+        (["file4.txt"], False),
+    ]
+    assert result.output.count("Directory Listing") == 1
+    assert result.output.count("Permissions") == 1
+    rows = [line for line in result.output.splitlines() if "📄 file" in line]
+    assert len(rows) == 5
+    # Every page puts the column separators in the same places
+    assert len({tuple(i for i, c in enumerate(row) if c == "│") for row in rows}) == 1
+
+
+def test_stat_concurrency_gives_same_listings(tmp_path, monkeypatch):
+    """Test --stat-concurrency keeps the sorted output of a serial run."""
+    import richpyls.__main__
+
+    for number in range(30):
+        (tmp_path / f"file{number:02d}.txt").write_text("x" * number)
+    (tmp_path / "sub").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(richpyls.__main__, "STAT_CHUNK_SIZE", 7)
+
+    runner = CliRunner()
+    for args in ([], ["-l"], ["--format", "csv"]):
+        expected = runner.invoke(cli, args)
+        result = runner.invoke(cli, [*args, "--stat-concurrency", "8"])
+        assert result.exit_code == 0
+        assert result.output == expected.output
+
+
+def test_stat_concurrency_reports_unreadable_entries(tmp_path, monkeypatch):
+    """Test errors from concurrent stat calls are reported like serial ones."""
+    (tmp_path / "broken.txt").write_text("x")
+    (tmp_path / "fine.txt").write_text("x")
+    monkeypatch.chdir(tmp_path)
+    failures = {"broken.txt": OSError(13, "Permission denied")}
+    monkeypatch.setattr(os, "scandir", scandir_with_failures(failures))
+
+    result = CliRunner().invoke(cli, ["--stat-concurrency", "4"])
+
+    assert result.exit_code == 0
+    assert "ls: cannot access './broken.txt': Permission denied" in result.output
+    assert result.output.splitlines()[-1] == "📄 fine.txt"
@@ -0,0 +1,37 @@
+from richpyls.scanner import get_suffix, scan_directory, walk
+
+
+def test_scan_directory_sorts_and_filters_hidden(tmp_path):
+    (tmp_path / "b.txt").write_text("b")
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / ".hidden").write_text("h")
+
+    names = [entry.name for entry in scan_directory(tmp_path, show_all=False)]
+    assert names == ["a.txt", "b.txt"]
+
+    names = [entry.name for entry in scan_directory(tmp_path, show_all=True)]
+    assert names == [".hidden", "a.txt", "b.txt"]
+
+
+def test_walk_visits_subtree_without_following_symlinks(tmp_path):
+    nested = tmp_path / "one" / "two"
+    nested.mkdir(parents=True)
+    (tmp_path / "top.txt").write_text("x")
+    (nested / "deep.txt").write_text("y")
+    (tmp_path / "loop").symlink_to(tmp_path)
+
+    names = sorted(entry.name for _, _, others in walk(tmp_path) for entry in others)
+    # The symlinked directory is yielded as an entry but never descended into
+    assert names == ["deep.txt", "loop", "top.txt"]
+
+
+def test_walk_skips_unreadable_root(tmp_path):
+    assert list(walk(tmp_path / "missing")) == []
+
+
+def test_get_suffix_matches_pathlib():
+    assert get_suffix("archive.TAR") == ".tar"
+    assert get_suffix("data.tar.gz") == ".gz"
+    assert get_suffix(".bashrc") == ""
+    assert get_suffix("trailing.") == ""
+    assert get_suffix("plain") == ""
@@ -0,0 +1,185 @@
+import os
+
+import pytest
+
+from richpyls.sizes import (
+    BLOCK_SIZE,
+    InodeSet,
+    TopN,
+    build_size_map,
+    iter_file_sizes,
+    walk_sizes,
+)
+
+
+def _make_dirs(tmp_path):
+    paths = []
+    for i in range(6):
+        directory = tmp_path / f"dir{i}"
+        (directory / "nested").mkdir(parents=True)
+        (directory / "file.bin").write_bytes(b"x" * (i * 10))
+        (directory / "nested" / "deep.bin").write_bytes(b"y" * i)
+        paths.append(str(directory))
+    return paths
+
+
+def test_walk_sizes_counts_nested_files(tmp_path):
+    paths = _make_dirs(tmp_path)
+    assert walk_sizes(paths[3])[paths[3]] == 33
+    assert walk_sizes(str(tmp_path / "missing")) == {}
+
+
+def test_walk_sizes_aggregates_every_directory(tmp_path):
+    paths = _make_dirs(tmp_path)
+    (tmp_path / "top.bin").write_bytes(b"z" * 7)
+
+    sizes = walk_sizes(str(tmp_path))
+
+    assert sizes[str(tmp_path)] == 7 + sum(i * 11 for i in range(6))
+    assert sizes[paths[4]] == 44
+    assert sizes[f"{paths[4]}/nested"] == 4
+
+
+def test_walk_sizes_visits_each_directory_once(tmp_path, monkeypatch):
+    _make_dirs(tmp_path)
+    scanned = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(os.fspath(path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    walk_sizes(str(tmp_path))
+
+    # The root, six directories and their nested children
+    assert len(scanned) == 13
+    assert len(set(scanned)) == 13
+
+
+def test_build_size_map_parallel_matches_serial(tmp_path):
+    paths = _make_dirs(tmp_path)
+
+    serial = build_size_map(paths, jobs=1)
+    parallel = build_size_map(paths, jobs=4)
+
+    assert [serial[path] for path in paths] == [i * 11 for i in range(6)]
+    assert parallel == serial
+
+
+def test_top_n_matches_stable_sort_with_ties():
+    pairs = [(f"item{i}", (i * 7919) % 20) for i in range(500)]
+
+    top = TopN(25)
+    top.extend(pairs)
+
+    expected = sorted(pairs, key=lambda pair: pair[1], reverse=True)[:25]
+    assert top.results() == expected
+
+
+def test_top_n_memory_is_bounded_by_limit():
+    top = TopN(3)
+    top.extend((n, n) for n in range(100_000))
+
+    assert len(top) == 3
+    assert top.results() == [(99_999, 99_999), (99_998, 99_998), (99_997, 99_997)]
+
+
+def test_top_n_with_no_room():
+    top = TopN(0)
+    top.add("a", 10)
+    assert top.results() == []
+
+
+def test_iter_file_sizes_skips_symlinks_and_hidden(tmp_path):
+    (tmp_path / "data.bin").write_bytes(b"x" * 40)
+    (tmp_path / "link.bin").symlink_to(tmp_path / "data.bin")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "secret.bin").write_bytes(b"x" * 90)
+
+    pairs = iter_file_sizes(tmp_path, show_all=False)
+    visible = {entry.name: size for entry, size in pairs}
+    assert visible == {"data.bin": 40}
+
+    pairs = iter_file_sizes(tmp_path, show_all=True)
+    everything = {entry.name: size for entry, size in pairs}
+    assert everything == {"data.bin": 40, "secret.bin": 90}
+
+
+def test_iter_file_sizes_reports_unreadable_root(tmp_path):
+    errors = []
+    pairs = iter_file_sizes(
+        tmp_path / "missing", show_all=False, on_error=errors.append
+    )
+    assert list(pairs) == []
+    assert len(errors) == 1
+    assert isinstance(errors[0], FileNotFoundError)
+
+
+@pytest.fixture
+def linked_tree(tmp_path):
+    """Two directories sharing a hard-linked file, plus a symlink."""
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "a" / "shared.bin").write_bytes(b"x" * 1000)
+    (tmp_path / "b" / "shared.bin").hardlink_to(tmp_path / "a" / "shared.bin")
+    (tmp_path / "b" / "own.bin").write_bytes(b"x" * 10)
+    (tmp_path / "b" / "symlink.bin").symlink_to(tmp_path / "a" / "shared.bin")
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_hard_links_are_counted_once(linked_tree, jobs):
+    sizes = build_size_map([str(linked_tree)], jobs=jobs)
+
+    assert sizes[str(linked_tree)] == 1010
+    # Each directory has its own copy, but only one of them counts it
+    assert sizes[str(linked_tree / "a")] + sizes[str(linked_tree / "b")] == 1010
+
+
+def test_hard_links_are_counted_once_across_roots(linked_tree):
+    roots = [str(linked_tree / "a"), str(linked_tree / "b")]
+
+    sizes = build_size_map(roots)
+
+    assert sizes == {roots[0]: 1000, roots[1]: 10}
+
+
+def test_iter_file_sizes_yields_linked_files_once(linked_tree):
+    names = [entry.name for entry, _ in iter_file_sizes(linked_tree, show_all=False)]
+
+    assert sorted(names) == ["own.bin", "shared.bin"]
+
+
+def test_allocated_sizes_count_blocks(tmp_path):
+    sparse = tmp_path / "sparse.img"
+    with sparse.open("wb") as file:
+        file.truncate(10 * 1024 * 1024)
+    allocated = sparse.stat().st_blocks * BLOCK_SIZE
+
+    assert walk_sizes(str(tmp_path))[str(tmp_path)] == 10 * 1024 * 1024
+    assert walk_sizes(str(tmp_path), allocated=True)[str(tmp_path)] == allocated
+    assert build_size_map([str(tmp_path)], jobs=2, allocated=True) == {
+        str(tmp_path): allocated
+    }
+
+
+def test_inode_set_grows_and_rejects_duplicates():
+    seen = InodeSet()
+    pairs = [(device, inode) for device in (1, 2**63) for inode in range(3000)]
+
+    assert all(seen.add(*pair) for pair in pairs)
+    assert not any(seen.add(*pair) for pair in pairs)
+    assert len(seen) == len(pairs)
+
+
+@pytest.mark.parametrize("stride", [1, 4096, 2**20])
+def test_inode_set_spreads_strided_inodes(stride):
+    seen = InodeSet()
+    inodes = [1000 + number * stride for number in range(20000)]
+
+    assert all(seen.add(2049, inode) for inode in inodes)
+    assert not any(seen.add(2049, inode) for inode in inodes)
+    # Probing stays short: no long run of occupied slots builds up
+    runs = bytes(seen._used).split(b"\0")  # noqa: SLF001
+    assert max(len(run) for run in runs) < 100
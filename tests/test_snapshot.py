@@ -0,0 +1,167 @@
+import io
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from richpyls.__main__ import cli
+from richpyls.snapshot import (
+    SnapshotError,
+    SnapshotRecord,
+    diff_records,
+    iter_tree,
+    read_snapshot,
+    summarize_changes,
+    write_snapshot,
+)
+
+
+def _record(path, size, inode=1):
+    return SnapshotRecord(path, size, 0, inode, 0o100644)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a-b").mkdir()
+    (root / "a" / "b" / "deep.txt").write_text("x" * 10)
+    (root / "a" / "z.txt").write_text("x" * 20)
+    (root / "a-b" / "other.txt").write_text("x" * 30)
+    (root / "top.txt").write_text("x" * 40)
+    (root / ".hidden").write_text("x")
+    return root
+
+
+def test_walk_is_in_tree_order(tree):
+    paths = [record.path for record in iter_tree(tree, show_all=False)]
+
+    # A directory's contents come before its next sibling, even one whose
+    # name sorts before "/"
+    assert paths == ["a/b/deep.txt", "a/z.txt", "a-b/other.txt", "top.txt"]
+    assert ".hidden" in [record.path for record in iter_tree(tree, show_all=True)]
+
+
+def test_snapshot_round_trip(tree):
+    records = list(iter_tree(tree, show_all=True))
+    stream = io.BytesIO()
+
+    assert write_snapshot(stream, records) == len(records)
+    stream.seek(0)
+    assert list(read_snapshot(stream)) == records
+
+
+def test_snapshot_keeps_undecodable_names(tmp_path):
+    name = os.fsdecode(b"caf\xe9.txt")
+    (tmp_path / name).write_text("x")
+    stream = io.BytesIO()
+    write_snapshot(stream, iter_tree(tmp_path, show_all=False))
+    stream.seek(0)
+
+    assert [record.path for record in read_snapshot(stream)] == [name]
+
+
+@pytest.mark.parametrize(
+    ("data", "problem"),
+    [(b"not a snapshot", "not a richpyls"), (b"richpyls-snapshot 1\n\x01", "trunc")],
+)
+def test_malformed_snapshots_are_rejected(data, problem):
+    with pytest.raises(SnapshotError, match=problem):
+        list(read_snapshot(io.BytesIO(data)))
+
+
+def test_diff_reports_added_removed_and_changed_files():
+    old = [_record("a/x", 1), _record("a/y", 5), _record("b", 3)]
+    new = [_record("a/y", 9), _record("a-c", 4), _record("b", 3)]
+
+    changes = {change.path: change.delta for change in diff_records(old, new)}
+
+    assert changes == {"a/x": -1, "a/y": 4, "a-c": 4}
+
+
+def test_diff_rejects_unsorted_input():
+    records = [_record("b", 1), _record("a", 1)]
+    with pytest.raises(SnapshotError, match="tree order"):
+        list(diff_records(records, []))
+
+
+def test_summary_ranks_changes_and_adds_up_directories():
+    old = [_record("logs/old.log", 100), _record("logs/app.log", 10)]
+    new = [
+        _record("data/big.bin", 500),
+        _record("data/nested/more.bin", 50),
+        _record("logs/app.log", 70),
+        _record("top.txt", 5),
+    ]
+    old.sort(key=lambda record: record.path)
+
+    summary = summarize_changes(diff_records(old, new), limit=10)
+
+    assert [(change.path, size) for change, size in summary.added.results()] == [
+        ("data/big.bin", 500),
+        ("data/nested/more.bin", 50),
+        ("top.txt", 5),
+    ]
+    assert [(c.path, size) for c, size in summary.removed.results()] == [
+        ("logs/old.log", 100)
+    ]
+    assert [(c.path, size) for c, size in summary.grown.results()] == [
+        ("logs/app.log", 60)
+    ]
+    # logs lost 40 bytes overall, so it didn't grow
+    assert summary.grown_directories.results() == [
+        ("data", 550),
+        ("data/nested", 50),
+    ]
+    assert summary.changed_count == 5
+    assert summary.total_delta == 515
+
+
+def test_cli_diff_against_live_tree_and_snapshot(tree, tmp_path):
+    runner = CliRunner()
+    old_snapshot = tmp_path / "old.snap"
+    result = runner.invoke(cli, ["--save-snapshot", str(old_snapshot), str(tree)])
+    assert result.exit_code == 0
+    assert "Saved 4 files" in result.output
+
+    (tree / "a" / "z.txt").write_text("x" * 2000)
+    (tree / "top.txt").unlink()
+    (tree / "new.py").write_text("x" * 5000)
+
+    live = runner.invoke(cli, ["--diff", str(old_snapshot), str(tree)])
+    assert live.exit_code == 0
+    for expected in ["Added", "new.py", "Removed", "top.txt", "Grown", "z.txt"]:
+        assert expected in live.output
+    assert "3 changed files" in live.output
+
+    new_snapshot = tmp_path / "new.snap"
+    runner.invoke(cli, ["--save-snapshot", str(new_snapshot), str(tree)])
+    offline = runner.invoke(
+        cli, ["--diff", str(old_snapshot), "-s", "1", str(new_snapshot)]
+    )
+    assert offline.exit_code == 0
+    assert "Top 1 Added Files" in offline.output
+    assert "3 changed files" in offline.output
+
+
+def test_cli_diff_rejects_other_files(tmp_path):
+    (tmp_path / "plain.txt").write_text("hello")
+    result = CliRunner().invoke(
+        cli, ["--diff", str(tmp_path / "plain.txt"), str(tmp_path)]
+    )
+
+    assert result.exit_code == 1
+    assert "invalid snapshot" in result.output
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["--save-snapshot", "out.snap", "-t"], ["--diff", "README.md", "--watch"]],
+)
+def test_cli_snapshot_options_reject_other_modes(args, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "README.md").write_text("# readme")
+    result = CliRunner().invoke(cli, args)
+
+    assert result.exit_code == 2
+    assert "can't be combined" in result.output
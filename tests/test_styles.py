@@ -0,0 +1,78 @@
+import pytest
+
+from richpyls import styles
+from richpyls.styles import (
+    DEFAULT_STYLE,
+    ConfigError,
+    load_file_types_config,
+    register_file_type,
+    resolve_style_and_icon,
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_styles(monkeypatch):
+    # Registrations mutate the module-level table; give each test its own copy
+    monkeypatch.setattr(styles, "EXTENSION_STYLES", dict(styles.EXTENSION_STYLES))
+
+
+def _lookup(name):
+    return resolve_style_and_icon(name, 0o100644, is_dir=False)
+
+
+def test_every_builtin_extension_is_flattened():
+    for extensions, style in styles.FILE_TYPES:
+        for extension in extensions:
+            assert styles.EXTENSION_STYLES[extension] == style
+    assert _lookup("archive.TAR.GZ") == ("red", "📦")
+    assert _lookup("Makefile") == DEFAULT_STYLE
+
+
+def test_register_file_type_normalizes_extensions():
+    register_file_type(["parquet", ".WHL"], "cyan", "🧮")
+
+    assert _lookup("data.parquet") == ("cyan", "🧮")
+    assert _lookup("pkg-1.0.whl") == ("cyan", "🧮")
+
+
+def test_config_file_adds_and_overrides_categories(tmp_path, monkeypatch):
+    config = tmp_path / "richpyls" / "config.toml"
+    config.parent.mkdir()
+    config.write_text(
+        "[file_types.data]\n"
+        'extensions = [".parquet", ".feather"]\n'
+        'style = "cyan"\n'
+        'icon = "🧮"\n'
+        "\n"
+        "[file_types.python]\n"
+        'extensions = [".py"]\n'
+        'style = "bright_green"\n',
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+
+    assert load_file_types_config() == 2
+    assert _lookup("table.feather") == ("cyan", "🧮")
+    # Omitted keys fall back to the default icon
+    assert _lookup("main.py") == ("bright_green", DEFAULT_STYLE[1])
+
+
+def test_missing_config_file_is_ignored(tmp_path):
+    assert load_file_types_config(tmp_path / "missing.toml") == 0
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "file_types = 3\n",
+        '[file_types.data]\nstyle = "cyan"\n',
+        '[file_types.data]\nextensions = ".parquet"\n',
+        "[file_types]\ndata = 1\n",
+    ],
+)
+def test_malformed_config_raises(tmp_path, content):
+    config = tmp_path / "config.toml"
+    config.write_text(content, encoding="utf-8")
+
+    with pytest.raises(ConfigError):
+        load_file_types_config(config)
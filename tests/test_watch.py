@@ -0,0 +1,124 @@
+import struct
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+import richpyls.__main__
+from richpyls.__main__ import cli
+from richpyls.entries import FileEntry
+from richpyls.watch import IN_CREATE, IN_DELETE, DirectoryWatch, Event, parse_events
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+
+
+def _names(watch):
+    return [entry.name for entry in watch.entries]
+
+
+def test_parse_events_strips_name_padding():
+    buffer = struct.pack("iIII", 1, IN_CREATE, 0, 16) + b"new.txt".ljust(16, b"\0")
+    buffer += struct.pack("iIII", 1, IN_DELETE, 0, 0)
+
+    assert list(parse_events(buffer)) == [
+        Event(1, IN_CREATE, 0, "new.txt"),
+        Event(1, IN_DELETE, 0, ""),
+    ]
+
+
+def test_watch_applies_creations_changes_and_deletions(tmp_path):
+    (tmp_path / "b.txt").write_text("x")
+    with DirectoryWatch(tmp_path, show_all=False) as watch:
+        assert _names(watch) == ["b.txt"]
+
+        (tmp_path / "a.txt").write_text("x")
+        (tmp_path / "c").mkdir()
+        watch.update(0.01)
+        assert _names(watch) == ["a.txt", "b.txt", "c"]
+        assert watch.entries[2].is_dir
+
+        (tmp_path / "b.txt").write_text("longer")
+        watch.update(0.01)
+        assert watch.entries[1].lstat.st_size == len("longer")
+
+        (tmp_path / "a.txt").rename(tmp_path / "d.txt")
+        (tmp_path / "c").rmdir()
+        watch.update(0.01)
+        assert _names(watch) == ["b.txt", "d.txt"]
+
+
+def test_watch_only_restats_changed_entries(tmp_path, monkeypatch):
+    for number in range(50):
+        (tmp_path / f"file{number:02}").write_text("x")
+    with DirectoryWatch(tmp_path, show_all=False) as watch:
+        stat_calls = []
+        original = FileEntry.from_path
+        monkeypatch.setattr(
+            FileEntry,
+            "from_path",
+            lambda path: stat_calls.append(path.name) or original(path),
+        )
+        (tmp_path / "file07").write_text("changed")
+        watch.update(0.01)
+        monkeypatch.undo()
+
+    assert stat_calls == ["file07"]
+    assert len(watch.entries) == 50
+
+
+def test_watch_hides_dot_files_unless_asked(tmp_path):
+    with (
+        DirectoryWatch(tmp_path, show_all=False) as hidden,
+        DirectoryWatch(tmp_path, show_all=True) as shown,
+    ):
+        (tmp_path / ".secret").write_text("x")
+        hidden.update(0.01)
+        shown.update(0.01)
+
+        assert _names(hidden) == []
+        assert _names(shown) == [".secret"]
+
+
+def test_watch_reports_a_removed_directory(tmp_path):
+    watched = tmp_path / "watched"
+    watched.mkdir()
+    with DirectoryWatch(watched, show_all=False) as watch:
+        watched.rmdir()
+        with pytest.raises(FileNotFoundError):
+            watch.update(0.01)
+
+
+def test_cli_watch_shows_updates(tmp_path, monkeypatch):
+    (tmp_path / "first.txt").write_text("x")
+    original_update = DirectoryWatch.update
+    updates = []
+
+    def update(self, interval):
+        if updates:
+            raise KeyboardInterrupt
+        updates.append(interval)
+        (tmp_path / "second.txt").write_text("x")
+        original_update(self, interval)
+
+    monkeypatch.setattr(DirectoryWatch, "update", update)
+    result = CliRunner().invoke(cli, ["--watch", str(tmp_path)])
+
+    assert result.exit_code == 0
+    assert updates == [richpyls.__main__.WATCH_REFRESH_INTERVAL]
+    assert "first.txt" in result.output
+    assert "second.txt" in result.output
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["-t"], ["-s", "3"], ["--format", "csv"], ["README.md"], [".", "."]],
+)
+def test_cli_watch_rejects_other_modes_and_paths(args, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "README.md").write_text("# readme")
+    result = CliRunner().invoke(cli, ["--watch", *args])
+
+    assert result.exit_code == 2
+    assert "--watch" in result.output